@@ -0,0 +1,323 @@
+"""Benchmarks of the rendering hot paths.
+
+Run `python benchmark.py --output results.json` to save the results, and
+`python benchmark.py --baseline results.json` to compare a later version against them. The exit code is 1 if any
+benchmark is slower or uses more memory than the baseline by more than the tolerance, or if a module exceeds its
+import budget.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+from unittest import mock
+import numpy as np
+import numba
+from numba import njit
+
+import cache
+import render
+from fractal import EscapeTimeFractal
+from fractal_generator import generate_escape_time, generate_escape_time_batch
+from interesting_region import find_interesting_region, max_var_segment
+
+
+@njit
+def mandelbrot(z, c):
+    return z * z + c
+
+
+@njit
+def burning_ship(z, c):
+    return (abs(z.real) + 1j * abs(z.imag)) ** 2 + c
+
+
+@njit
+def julia(z, c, k):
+    return z * z + k
+
+
+def mandelbrot_numpy(z, c):
+    return z * z + c
+
+
+def burning_ship_numpy(z, c):
+    return (np.abs(z.real) + 1j * np.abs(z.imag)) ** 2 + c
+
+
+FORMULAS = {'mandelbrot': (mandelbrot_numpy, mandelbrot), 'burning_ship': (burning_ship_numpy, burning_ship)}
+RE_LIM, IM_LIM = (-2., 1.), (-1.5, 1.5)
+# Maximum import time in seconds (on top of importing numpy) of the modules used by headless workers, which must not
+# import LAZY_MODULES: those are only imported when plotting or the numba engine is used
+IMPORT_BUDGETS = {'fractal_generator': 0.1, 'fractal': 0.1, 'frame_reuse': 0.1, 'tiled': 0.15, 'render': 0.15}
+LAZY_MODULES = ('matplotlib', 'numba')
+
+
+@dataclass
+class Benchmark:
+    name: str
+    # Called without arguments; the first call is not timed, so that compilation is not included
+    function: Callable[[], object]
+    # Number of points processed by each call
+    pixels: int
+    # Number of et_function evaluations of each call, if the benchmark iterates a fractal
+    pixel_iterations: Optional[int] = None
+    # Number of animation frames rendered by each call, if the benchmark renders an animation
+    frames: Optional[int] = None
+
+
+def measure(benchmark: Benchmark, repeat: int) -> Dict[str, float]:
+    """Runs a benchmark and measures its time and peak memory.
+
+    Parameters
+    ----------
+    benchmark : Benchmark
+        The benchmark.
+    repeat : int
+        Number of timed calls. The fastest call is reported, since slower calls are slowed down by other processes.
+
+    Returns
+    ----------
+    result : dict
+        The time of the fastest call in seconds, the throughput and the peak memory allocated during a call in bytes.
+    """
+    benchmark.function()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        benchmark.function()
+        times.append(time.perf_counter() - start)
+
+    # Measured in a separate call, since tracing the allocations slows the code down
+    tracemalloc.start()
+    try:
+        benchmark.function()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = min(times)
+    result = dict(seconds=seconds, pixels_per_second=benchmark.pixels / seconds, peak_memory_bytes=peak_memory)
+    if benchmark.pixel_iterations is not None:
+        result['pixel_iterations_per_second'] = benchmark.pixel_iterations / seconds
+    if benchmark.frames is not None:
+        result['seconds_per_frame'] = seconds / benchmark.frames
+    return result
+
+
+def _pixel_iterations(iterations: int, resolution: int, formula: str) -> int:
+    # An escaped point with iteration count i has been iterated i times, and a bounded point iterations times
+    iteration_counts, _ = generate_escape_time(RE_LIM, IM_LIM, iterations, resolution, FORMULAS[formula][1],
+                                               engine='numba')
+    return int(iteration_counts.sum())
+
+
+def _auto_zoom_frames(frames: int, iterations: int, resolution: int, engine: str):
+    et_function = mandelbrot if engine == 'numba' else mandelbrot_numpy
+    # Encoding is replaced by a function that does nothing, so only computation and region search are measured
+    with mock.patch.object(render, '_frame_encoder', lambda *args: lambda plane, extent: None), \
+            contextlib.redirect_stdout(io.StringIO()):
+        render.auto_zoom(RE_LIM, IM_LIM, iterations, resolution, et_function, 'benchmark.mp4', frames, 1.5,
+                         'twilight', engine=engine)
+
+
+def benchmarks(quick: bool = False) -> List[Benchmark]:
+    """Creates the benchmarks.
+
+    Parameters
+    ----------
+    quick : bool, optional
+        Whether to use smaller sizes, e.g. for a quick check during development. Default is False.
+
+    Returns
+    ----------
+    benchmarks : list of Benchmark
+        The benchmarks, with unique names.
+    """
+    resolutions = (128, 256) if quick else (256, 512, 1024)
+    iteration_counts = (50, 200) if quick else (100, 500)
+    result = []
+    for formula, (numpy_function, numba_function) in FORMULAS.items():
+        for resolution in resolutions:
+            for iterations in iteration_counts:
+                work = _pixel_iterations(iterations, resolution, formula)
+                for engine in ('numpy', 'compact', 'numba'):
+                    et_function = numba_function if engine == 'numba' else numpy_function
+                    result.append(Benchmark(
+                        f'generate_escape_time[{formula}-{engine}-{resolution}-{iterations}]',
+                        lambda et_function=et_function, engine=engine, resolution=resolution, iterations=iterations:
+                            generate_escape_time(RE_LIM, IM_LIM, iterations, resolution, et_function, engine=engine),
+                        resolution ** 2, work))
+
+    resolution, iterations = resolutions[-1], iteration_counts[0]
+    fractal = EscapeTimeFractal(RE_LIM, IM_LIM, resolution, iterations, mandelbrot_numpy)
+    result.append(Benchmark(f'EscapeTimeFractal.generate_escape_time[mandelbrot-{resolution}-{iterations}]',
+                            lambda: fractal.generate_escape_time((), {}), resolution ** 2,
+                            _pixel_iterations(iterations, resolution, 'mandelbrot')))
+
+    for resolution in resolutions:
+        iterations = iteration_counts[-1]
+        plane, _ = generate_escape_time(RE_LIM, IM_LIM, iterations, resolution, mandelbrot, engine='numba')
+        result.append(Benchmark(f'find_interesting_region[{resolution}]',
+                                lambda plane=plane, iterations=iterations: find_interesting_region(plane, 1.5, iterations),
+                                resolution ** 2))
+        result.append(Benchmark(f'max_var_segment[{resolution}]',
+                                lambda plane=plane: max_var_segment(plane, 1.5), resolution ** 2))
+
+    frames, resolution, iterations = 32, resolutions[0], iteration_counts[0]
+    constants = [0.7885 * np.exp(2j * np.pi * frame / frames) for frame in range(frames)]
+    result.append(Benchmark(f'generate_escape_time[julia-numba-{resolution}-{iterations}-{frames}frames]',
+                            lambda: [generate_escape_time(RE_LIM, IM_LIM, iterations, resolution, julia, k,
+                                                          engine='numba') for k in constants],
+                            frames * resolution ** 2, frames=frames))
+    result.append(Benchmark(f'generate_escape_time_batch[julia-numba-{resolution}-{iterations}-{frames}frames]',
+                            lambda: generate_escape_time_batch(RE_LIM, IM_LIM, iterations, resolution, julia,
+                                                               [(k,) for k in constants], engine='numba'),
+                            frames * resolution ** 2, frames=frames))
+
+    frames, resolution, iterations = 3, resolutions[0], iteration_counts[-1]
+    for engine in ('numpy', 'numba'):
+        result.append(Benchmark(f'auto_zoom[{engine}-{resolution}-{iterations}-{frames}frames]',
+                                lambda engine=engine: _auto_zoom_frames(frames, iterations, resolution, engine),
+                                frames * resolution ** 2, frames=frames))
+    return result
+
+
+def measure_import(module: str, repeat: int) -> Dict[str, object]:
+    """Measures the import time of a module in new processes, so that nothing has been imported before.
+
+    Parameters
+    ----------
+    module : str
+        Name of the module.
+    repeat : int
+        Number of processes. The fastest import is reported.
+
+    Returns
+    ----------
+    result : dict
+        The import time in seconds on top of importing numpy, and the `LAZY_MODULES` that were imported.
+    """
+    code = (f'import json, sys, time; import numpy; start = time.perf_counter(); import {module}; '
+            f'seconds = time.perf_counter() - start; '
+            f'print(json.dumps(dict(seconds=seconds, lazy_modules=[name for name in {LAZY_MODULES!r} '
+            f'if name in sys.modules])))')
+    results = [json.loads(subprocess.run([sys.executable, '-c', code], capture_output=True, check=True, text=True,
+                                         cwd=os.path.dirname(os.path.abspath(__file__))).stdout)
+               for _ in range(repeat)]
+    return min(results, key=lambda result: result['seconds'])
+
+
+def check_import_budgets(imports: Dict[str, Dict[str, object]]) -> List[str]:
+    """Checks the results of `measure_import` against `IMPORT_BUDGETS` and `LAZY_MODULES`.
+
+    Parameters
+    ----------
+    imports : dict
+        The results of `measure_import` by module name.
+
+    Returns
+    ----------
+    violations : list of str
+        Description of each module that is imported too slowly or imports a module it must not import.
+    """
+    violations = []
+    for module, result in sorted(imports.items()):
+        if result['seconds'] > IMPORT_BUDGETS[module]:
+            violations.append(f'{module}: import took {result["seconds"]:.3f} s, the budget is '
+                              f'{IMPORT_BUDGETS[module]:.3f} s')
+        if result['lazy_modules']:
+            violations.append(f'{module}: imports {", ".join(result["lazy_modules"])}')
+    return violations
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float = 0.1) -> List[str]:
+    """Compares results with a baseline.
+
+    Parameters
+    ----------
+    results : dict
+        The results of `measure` by benchmark name.
+    baseline : dict
+        Earlier results of `measure` by benchmark name.
+    tolerance : float, optional
+        Relative increase in time or peak memory that is not counted as a regression. Default is 0.1.
+
+    Returns
+    ----------
+    regressions : list of str
+        Description of each benchmark that is slower or uses more memory than in the baseline.
+    """
+    regressions = []
+    for name in sorted(results.keys() & baseline.keys()):
+        for metric in ('seconds', 'peak_memory_bytes'):
+            old, new = baseline[name][metric], results[name][metric]
+            if new > old * (1 + tolerance):
+                regressions.append(f'{name}: {metric} increased from {old:.4g} to {new:.4g} ({new / old - 1:+.0%})')
+    return regressions
+
+
+def environment() -> Dict[str, str]:
+    """Returns the versions and platform that the benchmarks were run on."""
+    return dict(python=platform.python_version(), numpy=np.__version__, numba=numba.__version__,
+                platform=platform.platform(), processor=platform.processor(), threads=str(numba.get_num_threads()))
+
+
+def main(arguments: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks of the rendering hot paths.')
+    parser.add_argument('--output', help='JSON file that the results are written to')
+    parser.add_argument('--baseline', help='JSON file with earlier results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='relative increase in time or memory that is not a regression (default 0.1)')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timed calls of each benchmark (default 5)')
+    parser.add_argument('--filter', default='', help='only run the benchmarks whose name contains this string')
+    parser.add_argument('--quick', action='store_true', help='use smaller sizes')
+    options = parser.parse_args(arguments)
+
+    # Cached results would make every call after the first one free
+    cache.set_default_cache(None)
+    results = {}
+    for benchmark in benchmarks(options.quick):
+        if options.filter not in benchmark.name:
+            continue
+        result = results[benchmark.name] = measure(benchmark, options.repeat)
+        throughput = (f"{result['pixel_iterations_per_second']:.3g} pixel-iterations/s"
+                      if 'pixel_iterations_per_second' in result else f"{result['pixels_per_second']:.3g} pixels/s")
+        print(f"{benchmark.name:<65} {result['seconds'] * 1e3:10.2f} ms  {throughput:>28}  "
+              f"{result['peak_memory_bytes'] / 2**20:8.1f} MiB")
+
+    imports = {}
+    for module in IMPORT_BUDGETS:
+        if options.filter in f'import[{module}]':
+            result = imports[module] = measure_import(module, options.repeat)
+            print(f"{f'import[{module}]':<65} {result['seconds'] * 1e3:10.2f} ms  "
+                  f"{'budget ' + format(IMPORT_BUDGETS[module] * 1e3, '.0f') + ' ms':>28}")
+    violations = check_import_budgets(imports)
+    if violations:
+        print('\n'.join(['Import budget violations:'] + violations))
+
+    if options.output:
+        with open(options.output, 'w') as file:
+            json.dump(dict(environment=environment(), results=results, imports=imports), file, indent=2)
+
+    if options.baseline:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline['results'], options.tolerance)
+        if baseline.get('environment') != environment():
+            print('Warning: the baseline was measured in a different environment:', baseline.get('environment'))
+        print('\n'.join(['Regressions:'] + regressions) if regressions else 'No regressions')
+        return 1 if regressions or violations else 0
+    return 1 if violations else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,210 @@
+import json
+import os
+import time
+import numpy as np
+from numba import njit, prange, get_num_threads
+from typing import Tuple, Union
+from files import atomic_write
+
+
+# The points c are sampled in this square, outside of which every orbit escapes immediately
+SAMPLING_LIM = (-2., 2.)
+# Probability that a Metropolis step proposes a new point anywhere instead of a point close to the current one
+LARGE_MUTATION_PROBABILITY = 0.2
+
+
+def in_known_interior(c: np.ndarray) -> np.ndarray:
+    """Checks which points lie in the main cardioid or the period-2 bulb of the Mandelbrot set, where the orbits
+    never escape.
+
+    Parameters
+    ----------
+    c : numpy.ndarray
+        The points.
+
+    Returns
+    ----------
+    interior : numpy.ndarray
+        Boolean array with the same shape as c.
+    """
+    x, y = c.real, c.imag
+    q = (x - 0.25) ** 2 + y ** 2
+    return (q * (q + x - 0.25) <= 0.25 * y ** 2) | ((x + 1) ** 2 + y ** 2 <= 1 / 16)
+
+
+@njit(nogil=True, cache=True)
+def _escape_count(c: complex, iterations: int) -> int:
+    z = c
+    for i in range(iterations):
+        if z.real * z.real + z.imag * z.imag >= 4.:
+            return i
+        z = z * z + c
+    return iterations
+
+
+@njit(nogil=True, cache=True)
+def _traced(count: int, iterations: int, min_iterations: int, anti: bool) -> bool:
+    if anti:
+        return count == iterations
+    return min_iterations <= count < iterations
+
+
+@njit(nogil=True, cache=True)
+def _orbit_hits(c: complex, count: int, view: Tuple[float, float, float, float], histogram: np.ndarray,
+                weight: float, add: bool) -> int:
+    # Counts the points of the orbit (before it escapes) that lie in the view and adds weight to their pixels if add
+    re_min, im_min, re_scale, im_scale = view
+    height, width = histogram.shape
+    hits = 0
+    z = c
+    for _ in range(count):
+        column = (z.real - re_min) * re_scale
+        row = (z.imag - im_min) * im_scale
+        if 0 <= column < width and 0 <= row < height:
+            hits += 1
+            if add:
+                histogram[int(row), int(column)] += weight
+        z = z * z + c
+    return hits
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def _trace_uniform(c_values: np.ndarray, iterations: int, min_iterations: int, anti: bool,
+                   view: Tuple[float, float, float, float], histograms: np.ndarray):
+    workers = histograms.shape[0]
+    # Each worker adds to its own histogram, so that no two threads write to the same memory
+    for worker in prange(workers):
+        for index in range(worker, c_values.size, workers):
+            c = c_values[index]
+            count = _escape_count(c, iterations)
+            if _traced(count, iterations, min_iterations, anti):
+                _orbit_hits(c, count, view, histograms[worker], np.uint64(1), True)
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def _trace_metropolis(states: np.ndarray, counts: np.ndarray, contributions: np.ndarray, large_mutations: np.ndarray,
+                      small_mutations: np.ndarray, uniforms: np.ndarray, iterations: int, min_iterations: int,
+                      anti: bool, view: Tuple[float, float, float, float], histograms: np.ndarray):
+    workers = histograms.shape[0]
+    for worker in prange(workers):
+        c, count, contribution = states[worker], counts[worker], contributions[worker]
+        for step in range(uniforms.shape[1]):
+            if uniforms[worker, step, 0] < LARGE_MUTATION_PROBABILITY:
+                proposal = large_mutations[worker, step]
+            else:
+                proposal = c + small_mutations[worker, step]
+            proposal_count = _escape_count(proposal, iterations)
+            proposal_contribution = 0
+            if _traced(proposal_count, iterations, min_iterations, anti):
+                proposal_contribution = _orbit_hits(proposal, proposal_count, view, histograms[worker], 0., False)
+            # The proposals are symmetric, so the acceptance probability is the ratio of the contributions
+            if proposal_contribution > 0 and (contribution == 0 or
+                                              uniforms[worker, step, 1] * contribution < proposal_contribution):
+                c, count, contribution = proposal, proposal_count, proposal_contribution
+            if contribution > 0:
+                # Points are visited with a probability proportional to their contribution, which the weight undoes
+                _orbit_hits(c, count, view, histograms[worker], 1. / contribution, True)
+        states[worker], counts[worker], contributions[worker] = c, count, contribution
+
+
+def _save_checkpoint(filename: str, **state):
+    # An interrupted save never destroys the previous checkpoint
+    with atomic_write(filename) as file:
+        np.savez(file, **state)
+
+
+def buddhabrot(re_lim: Tuple[float, float], im_lim: Tuple[float, float], resolution: Union[int, Tuple[int, int]],
+               iterations: int, samples: int, min_iterations: int = 0, anti: bool = False, importance: bool = False,
+               batch_size: int = 2**20, seed: int = None, checkpoint: str = None,
+               checkpoint_interval: float = 600.) -> np.ndarray:
+    """Renders the Buddhabrot: the density of the orbits z -> z**2 + c of the points c that escape.
+    The points c are sampled in batches that are traced in parallel on all cores, each core adding to its own
+    histogram. The histograms are merged after each batch.
+
+    Parameters
+    ----------
+    re_lim : tuple of float
+        The lower and upper limit of the real axis of the image.
+    im_lim : tuple of float
+        The lower and upper limit of the imaginary axis of the image.
+    resolution : int or tuple of int
+        Number of pixels along each axis of the image, or (width, height) for a non-square image.
+    iterations : int
+        Maximum number of iterations.
+    samples : int
+        Number of points c that are sampled (Metropolis steps if importance is True).
+    min_iterations : int, optional
+        Orbits that escape after fewer iterations are not traced. Default is 0.
+    anti : bool, optional
+        Whether to trace the orbits that do not escape instead (the anti-Buddhabrot). Default is False.
+    importance : bool, optional
+        Whether to sample the points c with the Metropolis algorithm, with a probability proportional to the number of
+        points of their orbit that lie in the image. This is much faster for zoomed-in images, where most orbits miss
+        the image. Otherwise, the points are sampled uniformly and points in the main cardioid and period-2 bulb
+        (which never escape) are skipped without tracing. Default is False.
+    batch_size : int, optional
+        Number of samples per batch. Default is 2**20.
+    seed : int, optional
+        Seed of the random numbers. Default is a random seed.
+    checkpoint : str, optional
+        Name of a .npz file that the accumulated histogram is saved to every checkpoint_interval seconds and at the
+        end. If the file exists, the render continues from it, so that a long render can be stopped and resumed.
+    checkpoint_interval : float, optional
+        Seconds between checkpoints. Default is 600.
+
+    Returns
+    ----------
+    histogram : numpy.ndarray
+        Number of orbit points in each pixel, with shape (height, width) and the first row at im_lim[0]. uint64 if
+        importance is False, and float64 (relative density) if importance is True.
+    """
+    width, height = (resolution, resolution) if np.isscalar(resolution) else resolution
+    view = (float(re_lim[0]), float(im_lim[0]), width / (re_lim[1] - re_lim[0]), height / (im_lim[1] - im_lim[0]))
+    parameters = json.dumps(dict(re_lim=list(map(float, re_lim)), im_lim=list(map(float, im_lim)),
+                                 resolution=[width, height], iterations=iterations, min_iterations=min_iterations,
+                                 anti=anti, importance=importance, batch_size=batch_size))
+    workers = get_num_threads()
+    dtype = np.float64 if importance else np.uint64
+
+    histogram = np.zeros((height, width), dtype=np.float64 if importance else np.uint64)
+    done = 0
+    entropy = np.random.SeedSequence(seed).entropy
+    states = np.random.default_rng(entropy).uniform(*SAMPLING_LIM, (workers, 2)) @ np.array([1, 1j])
+    counts = np.zeros(workers, dtype=np.int64)
+    contributions = np.zeros(workers, dtype=np.int64)
+    if checkpoint is not None and os.path.exists(checkpoint):
+        with np.load(checkpoint) as state:
+            if str(state['parameters']) != parameters:
+                raise ValueError(f'the checkpoint {checkpoint} was made with other parameters: {state["parameters"]}')
+            histogram, done, entropy = state['histogram'], int(state['done']), int(str(state['entropy']))
+            if state['states'].size == workers:
+                states, counts, contributions = state['states'], state['counts'], state['contributions']
+
+    histograms = np.zeros((workers, height, width), dtype=dtype)
+    last_checkpoint = time.time()
+    while done < samples:
+        size = min(batch_size, samples - done)
+        # Seeded by the batch, so that a resumed render continues with the same random numbers
+        rng = np.random.default_rng([entropy, done // batch_size])
+        if importance:
+            steps = -(-size // workers)
+            large_mutations = rng.uniform(*SAMPLING_LIM, (workers, steps, 2)) @ np.array([1, 1j])
+            small_mutations = rng.normal(0, 0.05 * max(re_lim[1] - re_lim[0], im_lim[1] - im_lim[0]),
+                                         (workers, steps, 2)) @ np.array([1, 1j])
+            _trace_metropolis(states, counts, contributions, large_mutations, small_mutations,
+                              rng.random((workers, steps, 2)), iterations, min_iterations, anti, view, histograms)
+        else:
+            c_values = rng.uniform(*SAMPLING_LIM, (size, 2)) @ np.array([1, 1j])
+            if not anti:
+                c_values = c_values[~in_known_interior(c_values)]
+            _trace_uniform(c_values, iterations, min_iterations, anti, view, histograms)
+        histogram += histograms.sum(axis=0, dtype=histogram.dtype)
+        histograms[:] = 0
+        done += size
+
+        if checkpoint is not None and (done >= samples or time.time() - last_checkpoint >= checkpoint_interval):
+            # The entropy can be larger than 64 bits, so it is saved as a str
+            _save_checkpoint(checkpoint, parameters=parameters, histogram=histogram, done=done, entropy=str(entropy),
+                             states=states, counts=counts, contributions=contributions)
+            last_checkpoint = time.time()
+    return histogram
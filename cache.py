@@ -0,0 +1,188 @@
+import functools
+import hashlib
+import os
+import types
+import zipfile
+import numpy as np
+from decimal import Decimal
+from typing import Callable, Optional, Tuple
+from files import atomic_write
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+CACHE_DIR_VARIABLE = 'FRACTALS_CACHE_DIR'
+CACHE_SIZE_VARIABLE = 'FRACTALS_CACHE_SIZE'
+
+
+def _global_names(code: types.CodeType) -> set:
+    # Names that code and the functions, lambdas and comprehensions nested in it may look up in the module globals
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _global_names(const)
+    return names
+
+
+def _stable_bytes(obj, functions: frozenset = frozenset()) -> bytes:
+    # Representation of obj that is the same in every process, or TypeError if there is none. functions holds the ids
+    # of the functions that are being represented, so that (mutually) recursive functions do not recurse forever
+    stable_bytes = functools.partial(_stable_bytes, functions=functions)
+    if obj is None or isinstance(obj, (bool, int, float, complex, str, bytes, Decimal)):
+        return f'{type(obj).__name__}:{obj!r}'.encode()
+    if isinstance(obj, np.generic):
+        return stable_bytes(obj.item())
+    if isinstance(obj, np.ndarray):
+        return f'ndarray:{obj.dtype.str}:{obj.shape}:'.encode() + np.ascontiguousarray(obj).tobytes()
+    if isinstance(obj, frozenset):
+        return b'frozenset(' + b','.join(sorted(map(stable_bytes, obj))) + b')'
+    if isinstance(obj, (tuple, list)):
+        return f'{type(obj).__name__}('.encode() + b','.join(map(stable_bytes, obj)) + b')'
+    if isinstance(obj, dict):
+        return b'dict(' + b','.join(stable_bytes(key) + b'=' + stable_bytes(obj[key]) for key in sorted(obj)) + b')'
+    if isinstance(obj, types.CodeType):
+        return b'code(' + b','.join([obj.co_code, stable_bytes(obj.co_consts), stable_bytes(obj.co_names)]) + b')'
+    if isinstance(obj, functools.partial):
+        return b'partial(' + b','.join(map(stable_bytes, (obj.func, obj.args, obj.keywords))) + b')'
+    if hasattr(obj, 'py_func'):  # numba dispatcher
+        return stable_bytes(obj.py_func)
+    if isinstance(obj, types.FunctionType):
+        if id(obj) in functions:
+            return f'recursive:{obj.__module__}.{obj.__qualname__}'.encode()
+        stable_bytes = functools.partial(_stable_bytes, functions=functions | {id(obj)})
+        closure = tuple(cell.cell_contents for cell in obj.__closure__ or ())
+        # The values of the globals that the function uses (e.g. a module level constant) change its results too
+        global_values = {name: obj.__globals__[name] for name in _global_names(obj.__code__) if name in obj.__globals__}
+        return b'function(' + b','.join(map(stable_bytes, (obj.__code__, obj.__defaults__, obj.__kwdefaults__,
+                                                          closure, global_values))) + b')'
+    if isinstance(obj, types.ModuleType):
+        return f'module:{obj.__name__}'.encode()
+    if isinstance(obj, (np.ufunc, types.BuiltinFunctionType)):
+        return f'{type(obj).__name__}:{obj.__name__}'.encode()
+    raise TypeError(f'{obj!r} has no stable representation')
+
+
+def cache_key(re_lim: Tuple[float, float], im_lim: Tuple[float, float], iterations: int, resolution, et_function: Callable,
+              et_f_args: tuple = (), et_f_kwargs: dict = None, engine: str = 'numpy',
+              precision: str = 'double') -> Optional[str]:
+    """Calculates a key identifying an escape time fractal, from the code of et_function, its arguments, the limits,
+    the resolution, the number of iterations, the engine and the precision.
+
+    Parameters
+    ----------
+    See `fractal_generator.generate_escape_time`.
+
+    Returns
+    ----------
+    key : str or None
+        SHA-256 hex digest, or None if et_function or one of the arguments cannot be identified across processes.
+    """
+    # The engines test |z| >= 2 and round differently, so points on the edge may escape at different iterations.
+    # The dtype of the iteration counts does not change the results, so it is not part of the key
+    parameters = (tuple(re_lim), tuple(im_lim), iterations, resolution, et_function, tuple(et_f_args),
+                  et_f_kwargs or {}, engine, precision)
+    try:
+        return hashlib.sha256(_stable_bytes(parameters)).hexdigest()
+    except TypeError:
+        return None
+
+
+class EscapeTimeCache:
+    """On-disk cache of escape time results, with a maximum size. The least recently used results are removed first.
+    Several processes can use the same directory at the same time.
+
+    Parameters
+    ----------
+    directory : str
+        Directory where the results are saved. Created if it does not exist.
+    max_bytes : int, optional
+        Maximum total size of the saved results. Default is 1 GiB.
+    """
+    def __init__(self, directory: str, max_bytes: int = 2**30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Loads the iteration counts and z values saved under key, or returns None if there are none."""
+        path = self._path(key)
+        try:
+            with np.load(path) as result:
+                iteration_counts, z_values = result['iteration_counts'], result['z_values']
+            # The modification time is used as the time of last use
+            os.utime(path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            # Missing, removed by another process or never completely written
+            return None
+        return iteration_counts, z_values
+
+    def put(self, key: str, iteration_counts: np.ndarray, z_values: np.ndarray):
+        """Saves the iteration counts and z values under key and removes the least recently used results if the cache
+        has become too large."""
+        # Other processes never see a partially written result
+        with atomic_write(self._path(key)) as file:
+            np.savez(file, iteration_counts=iteration_counts, z_values=z_values)
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used results until the cache is no larger than max_bytes."""
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.npz'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def clear(self):
+        """Removes all saved results."""
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+_default_cache = None
+if os.environ.get(CACHE_DIR_VARIABLE):
+    _default_cache = EscapeTimeCache(os.environ[CACHE_DIR_VARIABLE],
+                                     int(os.environ.get(CACHE_SIZE_VARIABLE, 2**30)))
+
+
+def set_default_cache(cache: Optional[EscapeTimeCache]):
+    """Sets the cache used by `fractal_generator.generate_escape_time` (and thereby by the functions in `render`).
+    The default cache is read from the environment variables FRACTALS_CACHE_DIR and FRACTALS_CACHE_SIZE (in bytes),
+    and is None (no caching) if FRACTALS_CACHE_DIR is not set.
+
+    Parameters
+    ----------
+    cache : EscapeTimeCache or None
+        The cache, or None to turn caching off.
+    """
+    global _default_cache
+    _default_cache = cache
+
+
+def get_default_cache() -> Optional[EscapeTimeCache]:
+    """Returns the cache set by `set_default_cache`."""
+    return _default_cache
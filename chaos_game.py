@@ -0,0 +1,136 @@
+import numpy as np
+from numba import njit, prange, get_num_threads
+from typing import Sequence, Tuple, Union
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def _chaos_game_chains(matrices: np.ndarray, translations: np.ndarray, cumulative: np.ndarray, points: int,
+                       warmup: int, seeds: np.ndarray, view: Tuple[float, float, float, float], histograms: np.ndarray):
+    x_min, y_min, x_scale, y_scale = view
+    height, width = histograms.shape[1:]
+    maps = cumulative.shape[1]
+    # Each chain is run by one thread with its own random numbers and histogram
+    for chain in prange(seeds.size):
+        np.random.seed(seeds[chain])
+        x, y = np.random.random(), np.random.random()
+        previous = 0
+        for step in range(warmup + points):
+            u = np.random.random()
+            k = 0
+            while k < maps - 1 and u >= cumulative[previous, k]:
+                k += 1
+            x, y = (matrices[k, 0, 0] * x + matrices[k, 0, 1] * y + translations[k, 0],
+                    matrices[k, 1, 0] * x + matrices[k, 1, 1] * y + translations[k, 1])
+            previous = k
+            if step >= warmup:
+                column = (x - x_min) * x_scale
+                row = (y - y_min) * y_scale
+                if 0 <= column < width and 0 <= row < height:
+                    histograms[chain, int(row), int(column)] += np.uint64(1)
+
+
+def polygon(vertices: int, scale: float = 0.5,
+            forbidden: Sequence[int] = ()) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Creates the maps of the chaos game on a regular polygon, where each point is moved a fraction scale of the way
+    to a random vertex, e.g. the Sierpinski triangle for vertices = 3 and scale = 0.5.
+
+    Parameters
+    ----------
+    vertices : int
+        Number of vertices of the polygon, which lie on the unit circle.
+    scale : float, optional
+        Fraction of the distance to the vertex that each point is moved. Default is 0.5.
+    forbidden : sequence of int, optional
+        Vertices that cannot be chosen, relative to the previously chosen vertex. E.g. (0,) forbids choosing the same
+        vertex twice in a row. Default is no restrictions.
+
+    Returns
+    ----------
+    matrices : numpy.ndarray
+        The linear part of the map of each vertex, with shape (vertices, 2, 2).
+    translations : numpy.ndarray
+        The translation of the map of each vertex, with shape (vertices, 2).
+    allowed : numpy.ndarray
+        Boolean array with shape (vertices, vertices), where element (i, j) is whether vertex j may follow vertex i.
+    """
+    angles = 2 * np.pi * np.arange(1, vertices + 1) / vertices
+    corners = np.stack([np.sin(angles), np.cos(angles)], axis=1)
+    matrices = np.tile((1 - scale) * np.eye(2), (vertices, 1, 1))
+    offsets = (np.arange(vertices) - np.arange(vertices)[:, np.newaxis]) % vertices
+    allowed = ~np.isin(offsets, np.mod(forbidden, vertices))
+    return matrices, scale * corners, allowed
+
+
+def chaos_game(matrices: np.ndarray, translations: np.ndarray, x_lim: Tuple[float, float], y_lim: Tuple[float, float],
+               resolution: Union[int, Tuple[int, int]], points: int, probabilities: Sequence[float] = None,
+               allowed: np.ndarray = None, chains: int = None, batch_size: int = 2**26, warmup: int = 20,
+               seed: int = None) -> np.ndarray:
+    """Plays the chaos game of an iterated function system of affine maps (x, y) -> matrix @ (x, y) + translation,
+    applying a random map at each step, and counts the points in each pixel of an image instead of storing them.
+    Independent chains of points run in parallel on all cores.
+
+    Parameters
+    ----------
+    matrices : numpy.ndarray
+        The linear part of each map, with shape (maps, 2, 2).
+    translations : numpy.ndarray
+        The translation of each map, with shape (maps, 2).
+    x_lim : tuple of float
+        The lower and upper limit of the x axis of the image.
+    y_lim : tuple of float
+        The lower and upper limit of the y axis of the image.
+    resolution : int or tuple of int
+        Number of pixels along each axis of the image, or (width, height) for a non-square image.
+    points : int
+        Total number of points.
+    probabilities : sequence of float, optional
+        Probability of each map. Default is the same for all maps.
+    allowed : numpy.ndarray, optional
+        Boolean array with shape (maps, maps), where element (i, j) is whether map j may follow map i, see `polygon`.
+        The probabilities of the allowed maps are normalized after each map. Default is all allowed.
+    chains : int, optional
+        Number of independent chains. Default is the number of threads of numba.
+    batch_size : int, optional
+        Number of points per batch; the histograms of the chains are merged after each batch. Default is 2**26.
+    warmup : int, optional
+        Number of points at the start of each chain and batch that are not counted, so that the chain has reached
+        the attractor. Default is 20.
+    seed : int, optional
+        Seed of the random numbers. Default is a random seed.
+
+    Returns
+    ----------
+    histogram : numpy.ndarray
+        Number of points in each pixel as uint64, with shape (height, width) and the first row at y_lim[0].
+    """
+    matrices = np.asarray(matrices, dtype=np.float64)
+    translations = np.asarray(translations, dtype=np.float64)
+    maps = matrices.shape[0]
+    if matrices.shape != (maps, 2, 2) or translations.shape != (maps, 2):
+        raise ValueError(f'matrices and translations must have shapes (maps, 2, 2) and (maps, 2) but got '
+                         f'{matrices.shape} and {translations.shape}')
+    probabilities = np.full(maps, 1 / maps) if probabilities is None else np.asarray(probabilities, dtype=np.float64)
+    allowed = np.ones((maps, maps), dtype=bool) if allowed is None else np.asarray(allowed, dtype=bool)
+    transitions = np.where(allowed, probabilities, 0)
+    if (transitions.sum(axis=1) <= 0).any():
+        raise ValueError('every map must be allowed to be followed by a map with a probability larger than 0')
+    cumulative = np.cumsum(transitions / transitions.sum(axis=1, keepdims=True), axis=1)
+
+    width, height = (resolution, resolution) if np.isscalar(resolution) else resolution
+    view = (float(x_lim[0]), float(y_lim[0]), width / (x_lim[1] - x_lim[0]), height / (y_lim[1] - y_lim[0]))
+    chains = chains or get_num_threads()
+    histogram = np.zeros((height, width), dtype=np.uint64)
+    histograms = np.zeros((chains, height, width), dtype=np.uint64)
+    rng = np.random.default_rng(seed)
+    for start in range(0, points, batch_size):
+        size = min(batch_size, points - start)
+        # The points are split evenly over the chains, the first chains getting one more if needed
+        seeds = rng.integers(2**32, size=chains)
+        for chain_points, chain_seeds in ((size // chains + 1, seeds[:size % chains]),
+                                          (size // chains, seeds[size % chains:])):
+            if chain_seeds.size and chain_points:
+                _chaos_game_chains(matrices, translations, cumulative, chain_points, warmup, chain_seeds, view,
+                                   histograms[:chain_seeds.size])
+                histogram += histograms[:chain_seeds.size].sum(axis=0, dtype=np.uint64)
+                histograms[:chain_seeds.size] = 0
+    return histogram
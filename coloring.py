@@ -0,0 +1,46 @@
+import numpy as np
+
+
+def colormap_lut(colormap: str) -> np.ndarray:
+    """Generates a lookup table with the colors of a matplotlib colormap.
+
+    Parameters
+    ----------
+    colormap : str
+        Name of the matplotlib colormap.
+
+    Returns
+    ----------
+    lut : numpy.ndarray
+        The RGB colors of the colormap as uint8. Has shape (N, 3), where N is the number of colors in the colormap.
+    """
+    import matplotlib
+    cmap = matplotlib.colormaps[colormap]
+    return cmap(np.linspace(0, 1, cmap.N), bytes=True)[:, :3]
+
+
+def colorize(values: np.ndarray, lut: np.ndarray, vmin: float, vmax: float, out: np.ndarray = None) -> np.ndarray:
+    """Maps values to colors the same way as matplotlib's imshow does.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        The values that will be colored.
+    lut : numpy.ndarray
+        Lookup table of colors, see `colormap_lut`.
+    vmin : float
+        The value that is mapped to the first color.
+    vmax : float
+        The value that is mapped to the last color.
+    out : numpy.ndarray, optional
+        Array with shape values.shape + (3,) that the colors are written to.
+
+    Returns
+    ----------
+    image : numpy.ndarray
+        The RGB colors of values as uint8. Has shape values.shape + (3,).
+    """
+    scale = lut.shape[0] / (vmax - vmin) if vmax > vmin else 0
+    index = ((np.asarray(values, dtype=np.float64) - vmin) * scale).astype(np.intp)
+    np.clip(index, 0, lut.shape[0] - 1, out=index)
+    return np.take(lut, index, axis=0, out=out)
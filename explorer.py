@@ -0,0 +1,377 @@
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional, Tuple
+import numpy as np
+from fractal_generator import count_dtype_for, generate_escape_time
+
+
+@dataclass(frozen=True)
+class View:
+    """A view of the complex plane on a grid of pixels that is the same for every view with the same spacing, so that
+    views can share tiles. Pixel (row, column) of the grid is at column * spacing + 1j * row * spacing.
+    """
+    # Grid pixel at the lower left corner of the view
+    row: int
+    column: int
+    width: int
+    height: int
+    # Distance between neighbouring pixels in the complex plane
+    spacing: float
+
+    @classmethod
+    def around(cls, center: complex, spacing: float, resolution: Tuple[int, int]) -> 'View':
+        """Creates the view with the given (width, height) whose center is the grid pixel closest to center."""
+        width, height = resolution
+        return cls(round(center.imag / spacing) - height // 2, round(center.real / spacing) - width // 2,
+                   width, height, spacing)
+
+    @property
+    def center(self) -> complex:
+        return complex((self.column + self.width // 2) * self.spacing, (self.row + self.height // 2) * self.spacing)
+
+    @property
+    def extent(self) -> Tuple[float, float, float, float]:
+        """The limits of the real and imaginary axis, as for the extent of imshow."""
+        return ((self.column - 0.5) * self.spacing, (self.column + self.width - 0.5) * self.spacing,
+                (self.row - 0.5) * self.spacing, (self.row + self.height - 0.5) * self.spacing)
+
+
+class TileRenderer:
+    """Renders views of an escape time fractal from square tiles on the grid of their spacing, keeping the most
+    recently used tiles in memory, so that panning back over an area that has been rendered before is free.
+
+    Parameters
+    ----------
+    iterations : int
+        Maximum number of iterations.
+    et_function : function
+        The function used to calculate the z values, see `fractal_generator.generate_escape_time`.
+    *et_f_args : any, optional
+        Other input arguments for et_function.
+    tile_size : int, optional
+        Number of rows and columns of each tile. Default is 128.
+    max_tiles : int, optional
+        Maximum number of tiles kept in memory. Default is 1024 (32 MiB of tiles of 128 x 128 for up to 65535
+        iterations).
+    engine : str, optional
+        The engine used for the iteration, see `fractal_generator.ENGINES`. Default is 'numpy'.
+    **et_f_kwargs : any, optional
+        Other input keyword arguments for et_function.
+    """
+    def __init__(self, iterations: int, et_function: Callable[[np.ndarray, np.ndarray], np.ndarray], *et_f_args,
+                 tile_size: int = 128, max_tiles: int = 1024, engine: str = 'numpy', **et_f_kwargs):
+        self.iterations = iterations
+        self.et_function = et_function
+        self.et_f_args = et_f_args
+        self.et_f_kwargs = et_f_kwargs
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.engine = engine
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _generate(self, row: int, column: int, rows: int, columns: int, spacing: float, stride: int = 1) -> np.ndarray:
+        re_lim = (column * spacing, (column + (columns - 1) * stride) * spacing)
+        im_lim = (row * spacing, (row + (rows - 1) * stride) * spacing)
+        iteration_counts, _ = generate_escape_time(re_lim, im_lim, self.iterations, (columns, rows), self.et_function,
+                                                   *self.et_f_args, engine=self.engine, count_dtype=None,
+                                                   **self.et_f_kwargs)
+        return iteration_counts
+
+    def cached_tile(self, key: Tuple[float, int, int]) -> Optional[np.ndarray]:
+        """Returns the tile (spacing, tile row, tile column) if it is in memory, otherwise None."""
+        with self._lock:
+            tile = self._tiles.get((self.iterations,) + key)
+            if tile is not None:
+                self._tiles.move_to_end((self.iterations,) + key)
+            return tile
+
+    def tile(self, key: Tuple[float, int, int]) -> np.ndarray:
+        """Returns the iteration counts of the tile (spacing, tile row, tile column), rendering it if needed."""
+        tile = self.cached_tile(key)
+        if tile is None:
+            spacing, tile_row, tile_column = key
+            tile = self._generate(tile_row * self.tile_size, tile_column * self.tile_size, self.tile_size,
+                                  self.tile_size, spacing)
+            with self._lock:
+                self._tiles[(self.iterations,) + key] = tile
+                while len(self._tiles) > self.max_tiles:
+                    self._tiles.popitem(last=False)
+        return tile
+
+    def tiles(self, view: View) -> Iterator[Tuple[Tuple[float, int, int], Tuple[slice, slice], Tuple[slice, slice]]]:
+        """Lists the tiles that overlap with view, from the center of the view outwards.
+
+        Parameters
+        ----------
+        view : View
+            The view.
+
+        Returns
+        ----------
+        tiles : iterator
+            Tuples of the key of the tile, the (row, column) slices of the view that it covers and the (row, column)
+            slices of the tile that lie in the view.
+        """
+        size = self.tile_size
+        tile_rows = range(view.row // size, (view.row + view.height - 1) // size + 1)
+        tile_columns = range(view.column // size, (view.column + view.width - 1) // size + 1)
+        center_row, center_column = view.row + view.height / 2, view.column + view.width / 2
+        keys = sorted(((tile_row, tile_column) for tile_row in tile_rows for tile_column in tile_columns),
+                      key=lambda tile: ((tile[0] + 0.5) * size - center_row) ** 2 +
+                                       ((tile[1] + 0.5) * size - center_column) ** 2)
+        for tile_row, tile_column in keys:
+            slices = []
+            for tile_start, start, length in ((tile_row * size, view.row, view.height),
+                                              (tile_column * size, view.column, view.width)):
+                first, last = max(tile_start, start), min(tile_start + size, start + length)
+                slices.append((slice(first - start, last - start), slice(first - tile_start, last - tile_start)))
+            (view_rows, tile_rows_slice), (view_columns, tile_columns_slice) = slices
+            yield (view.spacing, tile_row, tile_column), (view_rows, view_columns), (tile_rows_slice, tile_columns_slice)
+
+    def preview(self, view: View, stride: int) -> np.ndarray:
+        """Renders every stride-th pixel of view along each axis and repeats them to the full shape of the view."""
+        rows, columns = -(-view.height // stride), -(-view.width // stride)
+        coarse = self._generate(view.row, view.column, rows, columns, view.spacing, stride)
+        return np.repeat(np.repeat(coarse, stride, 0), stride, 1)[:view.height, :view.width]
+
+
+class BackgroundRenderer:
+    """Renders views on a background thread. Requesting a new view cancels the render of the previous one as soon as
+    the tile being rendered is done. Each render first publishes the tiles in memory together with a coarse preview of
+    the rest of the view, and then publishes the view again after every tile. Use as a context manager, or call
+    `close`.
+
+    Parameters
+    ----------
+    tiles : TileRenderer
+        The renderer of the tiles.
+    preview_stride : int, optional
+        Distance between the pixels of the preview. Default is 8, i.e. 1/64 of the pixels.
+    """
+    def __init__(self, tiles: TileRenderer, preview_stride: int = 8):
+        self.tiles = tiles
+        self.preview_stride = preview_stride
+        self._condition = threading.Condition()
+        self._request = None
+        self._generation = 0
+        self._closed = False
+        # Latest published (view, image, done), and whether it has been returned by `latest`
+        self._published = None
+        self._new = False
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, view: View, iterations: int = None):
+        """Starts rendering view, with iterations (if given) as the new maximum number of iterations, cancelling the
+        current render."""
+        with self._condition:
+            self._generation += 1
+            self._request = (view, iterations)
+            self._condition.notify()
+
+    def latest(self) -> Optional[Tuple[View, np.ndarray, bool]]:
+        """Returns a copy of the latest published image of the current view with its view and whether it is complete,
+        or None if nothing has been published since the last call. Raises the error of the render if it failed."""
+        with self._condition:
+            if self._error is not None:
+                raise self._error
+            if not self._new:
+                return None
+            self._new = False
+            view, image, done = self._published
+            return view, image.copy(), done
+
+    def _cancelled(self, generation: int) -> bool:
+        return self._closed or self._generation != generation
+
+    def _publish(self, generation: int, view: View, image: np.ndarray, done: bool):
+        with self._condition:
+            if not self._cancelled(generation):
+                self._published = (view, image, done)
+                self._new = True
+
+    def _paste(self, generation: int, image: np.ndarray, view_slices: Tuple[slice, slice], tile: np.ndarray,
+               tile_slices: Tuple[slice, slice]):
+        # Under the lock, so that `latest` never copies a partially pasted tile
+        with self._condition:
+            if not self._cancelled(generation):
+                image[view_slices] = tile[tile_slices]
+
+    def _render(self, generation: int, view: View):
+        image = np.zeros((view.height, view.width), dtype=count_dtype_for(self.tiles.iterations, None))
+        missing = []
+        for key, view_slices, tile_slices in self.tiles.tiles(view):
+            tile = self.tiles.cached_tile(key)
+            if tile is None:
+                missing.append((key, view_slices, tile_slices))
+            else:
+                image[view_slices] = tile[tile_slices]
+        if missing:
+            if self.preview_stride > 1:
+                preview = self.tiles.preview(view, self.preview_stride)
+                for _, view_slices, _ in missing:
+                    image[view_slices] = preview[view_slices]
+            self._publish(generation, view, image, False)
+        for key, view_slices, tile_slices in missing:
+            if self._cancelled(generation):
+                return
+            self._paste(generation, image, view_slices, self.tiles.tile(key), tile_slices)
+            self._publish(generation, view, image, False)
+        self._publish(generation, view, image, True)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._request is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                (view, iterations), generation = self._request, self._generation
+                self._request = None
+                if iterations is not None:
+                    self.tiles.iterations = iterations
+            try:
+                self._render(generation, view)
+            except BaseException as error:
+                # Kept so that it is raised in the thread polling the results
+                with self._condition:
+                    self._error = error
+                return
+
+    def close(self):
+        """Cancels the current render and stops the background thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def __enter__(self) -> 'BackgroundRenderer':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Explorer:
+    """Interactive explorer of an escape time fractal. Click to zoom in on a point, press 'u' to zoom out, the arrow
+    keys to pan and 's' to save the image. The view is rendered on a background thread (see `BackgroundRenderer`),
+    so the window stays responsive: the current image is moved to the new view immediately, followed by a coarse
+    preview and then the tiles from the center outwards.
+
+    Parameters
+    ----------
+    re_lim : tuple of float
+        The lower and upper limit of the real axis of the first view.
+    im_lim : tuple of float
+        The lower and upper limit of the imaginary axis of the first view.
+    iterations : int
+        Maximum number of iterations of the first view.
+    et_function : function
+        The function used to calculate the z values, see `fractal_generator.generate_escape_time`.
+    *et_f_args : any, optional
+        Other input arguments for et_function.
+    resolution : int or tuple of int, optional
+        Number of pixels along each axis, or (width, height). Default is 1000.
+    colormap : str, optional
+        The matplotlib colormap. Default is 'twilight'.
+    zoom : float, optional
+        Factor by which a click zooms in and 'u' zooms out. Default is 2.
+    additional_iterations : int, optional
+        Number of iterations added at each zoom in (and removed at each zoom out). Default is 0.
+    pan : float, optional
+        Fraction of the view that the arrow keys move it by. Default is 0.25.
+    engine : str, optional
+        The engine used for the iteration, see `fractal_generator.ENGINES`. Default is 'numpy'.
+    tile_size, max_tiles, preview_stride
+        See `TileRenderer` and `BackgroundRenderer`.
+    **et_f_kwargs : any, optional
+        Other input keyword arguments for et_function.
+    """
+    # Milliseconds between the checks for newly rendered images
+    POLL_INTERVAL = 25
+    PAN_KEYS = {'left': (0, -1), 'right': (0, 1), 'down': (-1, 0), 'up': (1, 0)}
+
+    def __init__(self, re_lim: Tuple[float, float], im_lim: Tuple[float, float], iterations: int,
+                 et_function: Callable[[np.ndarray, np.ndarray], np.ndarray], *et_f_args, resolution=1000,
+                 colormap: str = 'twilight', zoom: float = 2., additional_iterations: int = 0, pan: float = 0.25,
+                 engine: str = 'numpy', tile_size: int = 128, max_tiles: int = 1024, preview_stride: int = 8,
+                 **et_f_kwargs):
+        width, height = (resolution, resolution) if np.isscalar(resolution) else resolution
+        self.base_spacing = max((re_lim[1] - re_lim[0]) / width, (im_lim[1] - im_lim[0]) / height)
+        self.zoom = zoom
+        self.level = 0
+        self.base_iterations = iterations
+        self.additional_iterations = additional_iterations
+        self.pan = pan
+        self.colormap = colormap
+        self.view = View.around(complex(sum(re_lim) / 2, sum(im_lim) / 2), self.base_spacing, (width, height))
+        self.tiles = TileRenderer(iterations, et_function, *et_f_args, tile_size=tile_size, max_tiles=max_tiles,
+                                  engine=engine, **et_f_kwargs)
+        self.preview_stride = preview_stride
+
+    @property
+    def iterations(self) -> int:
+        return max(1, self.base_iterations + self.level * self.additional_iterations)
+
+    def _spacing(self) -> float:
+        # Calculated from the zoom level, so that returning to a level gives exactly the same grid and tiles
+        return self.base_spacing * self.zoom ** -self.level
+
+    def _go_to(self, center: complex, level: int):
+        self.level = level
+        self.view = View.around(center, self._spacing(), (self.view.width, self.view.height))
+        # Shows the current image in the new view right away, until the first image of the new view arrives
+        extent = self.view.extent
+        self._axes.set_xlim(extent[:2])
+        self._axes.set_ylim(extent[2:])
+        self._figure.canvas.draw_idle()
+        self._renderer.request(self.view, self.iterations)
+
+    def _on_click(self, event):
+        if event.inaxes is self._axes and event.xdata is not None:
+            self._go_to(complex(event.xdata, event.ydata), self.level + 1)
+
+    def _on_key(self, event):
+        if event.key == 'u':
+            self._go_to(self.view.center, self.level - 1)
+        elif event.key in self.PAN_KEYS:
+            rows, columns = self.PAN_KEYS[event.key]
+            extent = self.view.extent
+            self._go_to(self.view.center + complex(columns * self.pan * (extent[1] - extent[0]),
+                                                   rows * self.pan * (extent[3] - extent[2])), self.level)
+        elif event.key == 's':
+            i = 1
+            while os.path.isfile(f'explorer{i}.png'):
+                i += 1
+            self._figure.savefig(f'explorer{i}.png', bbox_inches='tight', dpi=300)
+
+    def _poll(self):
+        result = self._renderer.latest()
+        if result is not None:
+            view, image, _ = result
+            self._image.set_data(image)
+            self._image.set_extent(view.extent)
+            self._image.set_clim(0, self.iterations)
+            self._figure.canvas.draw_idle()
+
+    def show(self):
+        """Opens the window and blocks until it is closed."""
+        import matplotlib.pyplot as plt
+        self._figure, self._axes = plt.subplots()
+        self._axes.axis('off')
+        self._image = self._axes.imshow(np.zeros((self.view.height, self.view.width)), cmap=self.colormap,
+                                        origin='lower', extent=self.view.extent, interpolation='none',
+                                        vmin=0, vmax=self.iterations)
+        self._figure.canvas.mpl_connect('button_press_event', self._on_click)
+        self._figure.canvas.mpl_connect('key_press_event', self._on_key)
+        timer = self._figure.canvas.new_timer(interval=self.POLL_INTERVAL)
+        timer.add_callback(self._poll)
+        with BackgroundRenderer(self.tiles, self.preview_stride) as self._renderer:
+            self._renderer.request(self.view, self.iterations)
+            timer.start()
+            plt.show()
+            timer.stop()
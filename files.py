@@ -0,0 +1,32 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterator
+
+
+@contextmanager
+def atomic_write(filename: str, mode: str = 'wb') -> Iterator[IO]:
+    """Context manager opening a temporary file next to filename for writing, which replaces filename when the block
+    exits without an exception. Other processes therefore never see a partially written file, and an interrupted write
+    never destroys the previous version of filename. If the block raises, the temporary file is removed.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the file that is written.
+    mode : str, optional
+        'wb' to write bytes or 'w' to write text. Default is 'wb'.
+
+    Returns
+    ----------
+    file : file
+        The temporary file.
+    """
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, mode) as temporary_file:
+            yield temporary_file
+        os.replace(temporary_path, filename)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
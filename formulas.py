@@ -0,0 +1,325 @@
+"""Registry of escape time formulas.
+
+A formula is the expression of the next z in terms of z, c and optional parameters, e.g. 'z * z + c'. For each formula,
+a module is generated with a numpy version of the formula, an @njit version and escape time kernels of the numba
+engine with the formula compiled in. The modules are written to a directory on disk and compiled with cache=True, so
+every process after the first one loads the compiled kernels instead of compiling them. Run `python formulas.py` to
+compile the built-in formulas ahead of time.
+"""
+import ast
+import functools
+import hashlib
+import importlib.util
+import keyword
+import os
+import sys
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence, Tuple
+import numpy as np
+from files import atomic_write
+
+
+FORMULA_DIR_VARIABLE = 'FRACTALS_FORMULA_DIR'
+# Functions that can be used in the expressions; all of them work on numpy arrays and in compiled code
+FUNCTIONS = ('abs', 'conj', 'exp', 'log', 'sqrt', 'sin', 'cos', 'tan', 'sinh', 'cosh', 'tanh')
+# The only attributes that can be used in the expressions
+ATTRIBUTES = ('real', 'imag')
+# The syntax that can be used in the expressions: arithmetic, comparisons and conditional expressions
+_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call, ast.Name,
+          ast.Attribute, ast.Constant, ast.Load, ast.operator, ast.unaryop, ast.boolop, ast.cmpop)
+BUILTIN_FORMULAS = {
+    'mandelbrot': ('z * z + c', ()),
+    'julia': ('z * z + k', ('k',)),
+    'burning_ship': ('(abs(z.real) + 1j * abs(z.imag)) ** 2 + c', ()),
+    'mandelbar': ('conj(z) ** power + c', ('power=2',)),
+    'gen_julia': ('(z.real / z.imag) ** 2 + 1j * conj(z)', ()),
+}
+
+_TEMPLATE = '''\
+# Generated by formulas.py from the formula {name}: {comment}
+import numpy as np
+from numpy import {functions}
+from numba import njit, prange
+
+
+BLOCK_SIZE = {block_size}
+
+
+def numpy_function(z, c{parameters}):
+    return {expression}
+
+
+# Division by 0 gives inf or nan like in numpy, instead of raising an error
+@njit(nogil=True, cache=True, error_model='numpy')
+def function(z, c{parameters}):
+    return {expression}
+
+
+@njit(parallel=True, nogil=True, cache=True, error_model='numpy')
+def escape_time_blocks(complex_plane, iterations, et_f_args, iteration_counts, z_values):
+    size = complex_plane.size
+    for block in prange((size + BLOCK_SIZE - 1) // BLOCK_SIZE):
+        for index in range(block * BLOCK_SIZE, min(block * BLOCK_SIZE + BLOCK_SIZE, size)):
+            c = complex_plane[index]
+            z = c
+            count = iterations
+            for i in range(iterations):
+                if z.real * z.real + z.imag * z.imag >= 4.:
+                    count = i
+                    break
+                z = function(z, c, *et_f_args)
+            iteration_counts[index] = count
+            z_values[index] = z
+
+
+@njit(parallel=True, nogil=True, cache=True, error_model='numpy')
+def escape_time_batch_blocks(complex_plane, iterations, et_f_args_batch, iteration_counts, z_values):
+    size = complex_plane.size
+    blocks = (size + BLOCK_SIZE - 1) // BLOCK_SIZE
+    for task in prange(len(et_f_args_batch) * blocks):
+        frame = np.int64(task // blocks)
+        block = task % blocks
+        et_f_args = et_f_args_batch[frame]
+        for index in range(block * BLOCK_SIZE, min(block * BLOCK_SIZE + BLOCK_SIZE, size)):
+            c = complex_plane[index]
+            z = c
+            count = iterations
+            for i in range(iterations):
+                if z.real * z.real + z.imag * z.imag >= 4.:
+                    count = i
+                    break
+                z = function(z, c, *et_f_args)
+            iteration_counts[frame, index] = count
+            z_values[frame, index] = z
+
+
+@njit(parallel=True, nogil=True, cache=True, error_model='numpy')
+def smooth_escape_time_blocks(complex_plane, iterations, et_f_args, bailout, smooth_values):
+    size = complex_plane.size
+    bailout_squared = bailout * bailout
+    log_bailout = np.log(bailout)
+    for block in prange((size + BLOCK_SIZE - 1) // BLOCK_SIZE):
+        for index in range(block * BLOCK_SIZE, min(block * BLOCK_SIZE + BLOCK_SIZE, size)):
+            c = complex_plane[index]
+            z = c
+            value = 1.
+            for i in range(iterations):
+                abs_squared = z.real * z.real + z.imag * z.imag
+                if abs_squared >= bailout_squared:
+                    value = min(max((i + 1 - np.log2(0.5 * np.log(abs_squared) / log_bailout)) / iterations, 0.), 1.)
+                    break
+                z = function(z, c, *et_f_args)
+            smooth_values[index] = value
+'''
+
+_registry = {}
+# Generated modules by their @njit function, so that the numba engine can use their kernels
+_kernels = {}
+
+
+def formula_directory() -> str:
+    """Returns the directory of the generated modules and their compiled kernels: the environment variable
+    FRACTALS_FORMULA_DIR if set, and otherwise fractals/formulas in the user's cache directory."""
+    if os.environ.get(FORMULA_DIR_VARIABLE):
+        return os.environ[FORMULA_DIR_VARIABLE]
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'fractals', 'formulas')
+
+
+@dataclass(frozen=True)
+class Formula:
+    """An escape time formula. The module with its functions and kernels is generated and loaded on first use.
+
+    Parameters
+    ----------
+    name : str
+        Name of the formula, a valid Python identifier.
+    expression : str
+        The next z in terms of z, c, the parameters and `FUNCTIONS`, e.g. 'z * z + c'.
+    parameters : tuple of str, optional
+        The extra parameters of the formula, optionally with a default value, e.g. ('k', 'power=2').
+    """
+    name: str
+    expression: str
+    parameters: Tuple[str, ...] = ()
+
+    def __post_init__(self):
+        # The name, expression and parameters are written into the source of the generated module, which is executed
+        _check(self.name, self.expression, self.parameters)
+
+    @property
+    def source(self) -> str:
+        """The source of the generated module."""
+        from numba_engine import BLOCK_SIZE
+        parameters = ''.join(f', {parameter}' for parameter in self.parameters)
+        # The expression may span several lines inside parentheses, but the comment must stay on one line
+        return _TEMPLATE.format(name=self.name, expression=self.expression, functions=', '.join(FUNCTIONS[1:]),
+                                block_size=BLOCK_SIZE, parameters=parameters,
+                                comment=' '.join(self.expression.split()))
+
+    @property
+    def module(self):
+        """The generated module."""
+        return _load_module(self.name, self.source)
+
+    @property
+    def numpy(self) -> Callable:
+        """The formula for numpy arrays, for the engines 'numpy' and 'compact'."""
+        return self.module.numpy_function
+
+    @property
+    def numba(self) -> Callable:
+        """The @njit formula for the engine 'numba', which uses the escape time kernels compiled for this formula."""
+        return self.module.function
+
+    def et_function(self, engine: str) -> Callable:
+        """Returns the version of the formula for engine."""
+        return self.numba if engine == 'numba' else self.numpy
+
+
+@functools.lru_cache(maxsize=None)
+def _load_module(name: str, source: str):
+    # The hash of the source is part of the file name, so that a changed formula never uses old compiled kernels
+    module_name = f'fractal_formula_{name}_{hashlib.sha256(source.encode()).hexdigest()[:16]}'
+    directory = formula_directory()
+    path = os.path.join(directory, f'{module_name}.py')
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        # Other processes never import a partially written module
+        with atomic_write(path, 'w') as file:
+            file.write(source)
+    # On the path, so that pickled functions can be loaded by worker processes
+    if directory not in sys.path:
+        sys.path.append(directory)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    _kernels[module.function] = module
+    return module
+
+
+def _check_parameter(name: str, parameter: str) -> str:
+    # A parameter is an identifier, optionally with a number as default value; returns the name of the parameter
+    parameter_name, equals, default = parameter.partition('=')
+    parameter_name = parameter_name.strip()
+    if not parameter_name.isidentifier() or keyword.iskeyword(parameter_name) or parameter_name in ('z', 'c'):
+        raise ValueError(f"invalid formula '{name}': '{parameter}' is not a valid parameter; parameters must be "
+                         f"identifiers other than z and c, optionally with a default value, e.g. 'k' or 'power=2'")
+    if equals:
+        try:
+            value = ast.literal_eval(default.strip())
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            value = None
+        if isinstance(value, bool) or not isinstance(value, (int, float, complex)):
+            raise ValueError(f"invalid formula '{name}': the default value of parameter '{parameter_name}' must be a "
+                             f"number but got '{default.strip()}'")
+    return parameter_name
+
+
+def _check(name: str, expression: str, parameters: Sequence[str]):
+    if not name.isidentifier():
+        raise ValueError(f"'{name}' is not a valid formula name; it must be a valid Python identifier")
+    parameter_names = [_check_parameter(name, parameter) for parameter in parameters]
+    if len(set(parameter_names)) < len(parameter_names):
+        raise ValueError(f"invalid formula '{name}': duplicate parameters {', '.join(parameter_names)}")
+    try:
+        ast.parse(f'def f(z, c{"".join(f", {parameter}" for parameter in parameters)}): pass')
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as error:
+        raise ValueError(f"invalid formula '{name}': {error}") from None
+    allowed = {'z', 'c', *FUNCTIONS, *parameter_names}
+    unknown = sorted({node.id for node in ast.walk(tree) if isinstance(node, ast.Name)} - allowed)
+    if unknown:
+        raise ValueError(f"invalid formula '{name}': unknown names {', '.join(unknown)}; supported names are z, c, "
+                         f"the parameters and {', '.join(FUNCTIONS)}")
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and node.attr not in ATTRIBUTES:
+            raise ValueError(f"invalid formula '{name}': unknown attribute '{node.attr}'; supported attributes are "
+                             f"{', '.join(ATTRIBUTES)}")
+        if isinstance(node, ast.Constant) and (isinstance(node.value, bool) or
+                                               not isinstance(node.value, (int, float, complex))):
+            raise ValueError(f"invalid formula '{name}': {node.value!r} is not a number")
+        if isinstance(node, ast.Call) and (not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or
+                                           node.keywords or any(isinstance(arg, ast.Starred) for arg in node.args)):
+            raise ValueError(f"invalid formula '{name}': only {', '.join(FUNCTIONS)} can be called, with positional "
+                             f"arguments")
+        if not isinstance(node, _NODES):
+            raise ValueError(f"invalid formula '{name}': {type(node).__name__} is not supported; formulas may only "
+                             f"use arithmetic, comparisons, conditional expressions, {', '.join(FUNCTIONS)} and "
+                             f".{', .'.join(ATTRIBUTES)}")
+
+
+def register(name: str, expression: str, parameters: Sequence[str] = ()) -> Formula:
+    """Registers a formula from an expression, replacing any formula with the same name.
+
+    Parameters
+    ----------
+    name : str
+        Name of the formula, a valid Python identifier.
+    expression : str
+        The next z in terms of z, c, the parameters and `FUNCTIONS`, e.g. 'z ** 3 + c'.
+    parameters : sequence of str, optional
+        The extra parameters of the formula, optionally with a default value, e.g. ('k', 'power=2').
+        They are passed as et_f_args or et_f_kwargs.
+
+    Returns
+    ----------
+    formula : Formula
+        The formula.
+    """
+    formula = _registry[name] = Formula(name, expression, tuple(parameters))
+    return formula
+
+
+def formula(name: str) -> Formula:
+    """Returns the registered formula called name, see `BUILTIN_FORMULAS` for the built-in formulas."""
+    if name not in _registry:
+        raise ValueError(f"'{name}' is not a registered formula; registered formulas are "
+                         f"{', '.join(map(repr, _registry))}")
+    return _registry[name]
+
+
+def registered_formulas() -> Dict[str, Formula]:
+    """Returns all registered formulas by name."""
+    return dict(_registry)
+
+
+def formula_kernels(et_function: Callable) -> Optional[object]:
+    """Returns the generated module of a formula if et_function is its @njit function, otherwise None."""
+    return _kernels.get(et_function)
+
+
+def precompile(names: Sequence[str] = None, precisions: Sequence[str] = ('double', 'single')):
+    """Compiles the kernels of formulas for the default dtypes of the iteration counts (int and the smallest dtypes
+    selected by count_dtype=None), so that later processes load them from disk.
+
+    Parameters
+    ----------
+    names : sequence of str, optional
+        Names of the formulas. Default is all registered formulas.
+    precisions : sequence of str, optional
+        The precisions to compile the kernels for, see `fractal_generator.generate_escape_time`.
+        Default is both.
+    """
+    from numba_engine import numba_escape_time, numba_escape_time_batch, numba_smooth_escape_time
+    for name in names if names is not None else list(_registry):
+        current = formula(name)
+        # Parameters without a default are given a complex value, the most common type of formula constants
+        args = tuple(0j for parameter in current.parameters if '=' not in parameter)
+        for precision in precisions:
+            complex_plane = np.zeros(1, dtype=np.complex128 if precision == 'double' else np.complex64)
+            for count_dtype in (int, np.uint8, np.uint16, np.uint32):
+                numba_escape_time(complex_plane, 1, current.numba, *args, count_dtype=count_dtype)
+                if args:
+                    numba_escape_time_batch(complex_plane, 1, current.numba, [args], count_dtype=count_dtype)
+            numba_smooth_escape_time(complex_plane, 1, current.numba, *args)
+
+
+for _name, (_expression, _parameters) in BUILTIN_FORMULAS.items():
+    register(_name, _expression, _parameters)
+
+
+if __name__ == '__main__':
+    precompile(sys.argv[1:] or None)
+    print(f'Compiled {", ".join(sys.argv[1:] or _registry)} in {formula_directory()}')
@@ -1,7 +1,7 @@
 from dataclasses import dataclass, field
 from typing import Callable, Tuple, Sequence, Dict
 import numpy as np
-from matplotlib import pyplot as plt
+from fractal_generator import escape_time, deepen_escape_time
 
 
 @dataclass
@@ -19,13 +19,15 @@ class EscapeTimeFractal:
     #calculate_plane: bool = False
     et_f_args: Sequence = field(default_factory=list)
     et_f_kwargs: Dict = field(default_factory=dict)
+    engine: str = 'numpy'
 
     def __post_init__(self):
     #   if self.calculate_plane:
         self.complex_plane = np.linspace(*self.re_limit, self.resolution) + 1j * np.linspace(*self.im_limit, self.resolution)[:, np.newaxis]
 
     def generate_escape_time(self, et_f_args, et_f_kwargs) -> Tuple[np.ndarray, np.ndarray]:
-        """Generates the escape time fractal.
+        """Generates the escape time fractal. et_f_args and et_f_kwargs replace self.et_f_args and self.et_f_kwargs,
+        so that `deepen` continues with the same arguments.
 
         Parameters
         ----------
@@ -41,9 +43,17 @@ class EscapeTimeFractal:
         z_values : numpy.ndarray
             The values of the complex numbers right after |z| >= 2. Same shape as plane.
         """
+        self.et_f_args = list(et_f_args)
+        self.et_f_kwargs = dict(et_f_kwargs)
+        if self.engine != 'numpy':
+            iteration_counts, z_values = escape_time(self.complex_plane, self.iterations, self.et_function,
+                                                     *et_f_args, engine=self.engine, **et_f_kwargs)
+            self.iteration_counts = iteration_counts
+            self.z_values = z_values
+            return iteration_counts, z_values
 
         z_values = np.copy(self.complex_plane)
-        iteration_counts = np.zeros(z_values.shape, dtype=int)
+        iteration_counts = np.full(z_values.shape, self.iterations, dtype=int)
         exceeded_limit_before = np.zeros(z_values.shape, dtype=bool)
         for i in range(self.iterations):
             exceeded_limit_after = np.abs(z_values) >= 2
@@ -57,6 +67,87 @@ class EscapeTimeFractal:
 
         return iteration_counts, z_values
 
+    def deepen(self, iterations: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Continues the iteration from self.iterations to iterations, using self.et_f_args and self.et_f_kwargs (the
+        arguments of the last `generate_escape_time`). Only the points that have not escaped yet are iterated further,
+        so the cost is only that of the extra iterations. If the fractal has not been generated yet, all points are
+        iterated from the start.
+
+        The engines can only start iterating at z = c, so the live points are always iterated with numpy, whatever
+        self.engine is: et_function is called on arrays of the live points, which an @njit function made of array
+        operations supports too.
+
+        Parameters
+        ----------
+        iterations : int
+            The new maximum number of iterations. Must be larger than self.iterations.
+
+        Returns
+        ----------
+        iteration_counts : numpy.ndarray
+            Number of iterations before |z| >= 2. Same shape as plane.
+        z_values : numpy.ndarray
+            The values of the complex numbers right after |z| >= 2. Same shape as plane.
+        """
+        if not hasattr(self, 'iteration_counts'):
+            self.iteration_counts = np.zeros(self.complex_plane.shape, dtype=int)
+            self.z_values = np.copy(self.complex_plane)
+            self.iterations = 0
+        elif iterations <= self.iterations:
+            raise ValueError(f'iterations must be larger than the {self.iterations} iterations that were already done '
+                             f'but got {iterations}')
+
+        self.iteration_counts, self.z_values = deepen_escape_time(self.complex_plane, self.iteration_counts, self.z_values,
+                                                                  self.iterations, iterations, self.et_function,
+                                                                  *self.et_f_args, **self.et_f_kwargs)
+        self.iterations = iterations
+        return self.iteration_counts, self.z_values
+
+    def save(self, filename: str):
+        """Saves the state of the fractal (but not et_function and its arguments) as a .npz file, so that it can be
+        loaded with `EscapeTimeFractal.load` and deepened in another process.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the .npz file.
+        """
+        state = dict(re_limit=self.re_limit, im_limit=self.im_limit, resolution=self.resolution, iterations=self.iterations)
+        if hasattr(self, 'iteration_counts'):
+            state.update(iteration_counts=self.iteration_counts, z_values=self.z_values)
+        np.savez(filename, **state)
+
+    @classmethod
+    def load(cls, filename: str, et_function: Callable, et_f_args: Sequence = (), et_f_kwargs: Dict = None,
+             engine: str = 'numpy') -> 'EscapeTimeFractal':
+        """Loads a fractal saved with `EscapeTimeFractal.save`.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the .npz file.
+        et_function : function
+            The function that was used to calculate the z values.
+        et_f_args : sequence, optional
+            The other input arguments for et_function that were used.
+        et_f_kwargs : dict, optional
+            The other input keyword arguments for et_function that were used.
+        engine : str, optional
+            The engine used by `generate_escape_time`. Default is 'numpy'.
+
+        Returns
+        ----------
+        fractal : EscapeTimeFractal
+            The fractal, with the iteration counts and z values of the saved fractal.
+        """
+        with np.load(filename) as state:
+            fractal = cls(tuple(state['re_limit']), tuple(state['im_limit']), int(state['resolution']),
+                          int(state['iterations']), et_function, list(et_f_args), dict(et_f_kwargs or {}), engine)
+            if 'iteration_counts' in state:
+                fractal.iteration_counts = state['iteration_counts']
+                fractal.z_values = state['z_values']
+        return fractal
+
     # TODO: change this to be able to automate any parameter? Probably results in lower efficiency but more freedom.
     def animate(self, parameter: str, *args, **kwargs):
         animation_function = getattr(self, f'_{parameter}')
@@ -92,7 +183,7 @@ class EscapeTimeFractal:
         axes : matplotlib.axes.Axes
             The axes (can be multiple) with the plots.
         """
-
+        from matplotlib import pyplot as plt
         fig, axes = plt.subplots(ncols=2, sharex='all', sharey='all')
         axes[0].imshow(self.iteration_counts, extent=self.re_limit + self.im_limit)
         axes[1].imshow(np.abs(self.z_values), extent=self.re_limit + self.im_limit)
@@ -1,25 +1,438 @@
 import numpy as np
-from matplotlib import pyplot as plt
-from typing import Callable, Tuple
+from typing import Callable, Iterator, Sequence, Tuple, Union
 import sys
+import time
+import warnings
+from cache import cache_key, get_default_cache
+from progress import get_instrumentation
 
 
-def generate_escape_time(re_lim: Tuple[float, float], im_lim: Tuple[float, float], iterations: int, resolution: int,
+ENGINES = ('numpy', 'compact', 'numba', 'perturbation')
+PRECISIONS = ('double', 'single')
+# Smallest distance between neighbouring points, in float32 rounding errors of the largest coordinate, for which
+# precision 'single' is used
+SINGLE_PRECISION_MIN_SPACING = 2**10
+# Bailout radius of the smooth escape values. A large radius removes the bands left by the bailout radius 2
+SMOOTH_BAILOUT = 2.**8
+
+
+def complex_axes(re_lim: Tuple[float, float], im_lim: Tuple[float, float],
+                 resolution: Union[int, Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Generates the real and imaginary axis of the complex plane.
+
+    Parameters
+    ----------
+    re_lim : tuple of float
+        The lower and upper limit of the real axis.
+    im_lim : tuple of float
+        The lower and upper limit of the imaginary axis.
+    resolution : int or tuple of int
+        Number of points along each axis, or (width, height) for a non-square plane.
+
+    Returns
+    ----------
+    re_axis : numpy.ndarray
+        The real part of each column of the complex plane.
+    im_axis : numpy.ndarray
+        The imaginary part of each row of the complex plane.
+    """
+    width, height = (resolution, resolution) if np.isscalar(resolution) else resolution
+    return np.linspace(*re_lim, width), np.linspace(*im_lim, height)
+
+
+def count_dtype_for(iterations: int, count_dtype=None) -> np.dtype:
+    """Checks that a dtype can hold iteration counts up to iterations.
+
+    Parameters
+    ----------
+    iterations : int
+        Maximum number of iterations.
+    count_dtype : numpy.dtype or None, optional
+        The dtype of the iteration counts. If None, the smallest unsigned integer dtype that can hold iterations is
+        used, e.g. uint16 for up to 65535 iterations.
+
+    Returns
+    ----------
+    count_dtype : numpy.dtype
+        The dtype of the iteration counts.
+    """
+    if count_dtype is None:
+        return np.min_scalar_type(iterations)
+    count_dtype = np.dtype(count_dtype)
+    if not np.issubdtype(count_dtype, np.integer):
+        raise TypeError(f'count_dtype must be an integer dtype but got {count_dtype}')
+    if np.iinfo(count_dtype).max < iterations:
+        raise ValueError(f'count_dtype {count_dtype} cannot hold iteration counts up to {iterations}')
+    return count_dtype
+
+
+def plane_dtype(re_lim: Tuple[float, float], im_lim: Tuple[float, float], resolution: Union[int, Tuple[int, int]],
+                precision: str = 'double') -> type:
+    """Selects the dtype that the complex plane is iterated in. Precision 'single' falls back to double precision
+    (with a warning) if neighbouring points are too close to be told apart reliably in float32.
+
+    Parameters
+    ----------
+    re_lim : tuple of float
+        The lower and upper limit of the real axis.
+    im_lim : tuple of float
+        The lower and upper limit of the imaginary axis.
+    resolution : int or tuple of int
+        Number of points along each axis, or (width, height) for a non-square plane.
+    precision : str, optional
+        'double' (complex128) or 'single' (complex64). Default is 'double'.
+
+    Returns
+    ----------
+    dtype : type
+        numpy.complex128 or numpy.complex64.
+    """
+    if precision == 'double':
+        return np.complex128
+    elif precision != 'single':
+        raise ValueError(f"'{precision}' is not a valid value for precision; supported values are "
+                         f"{', '.join(map(repr, PRECISIONS))}")
+
+    width, height = (resolution, resolution) if np.isscalar(resolution) else resolution
+    spacing = min(abs(re_lim[1] - re_lim[0]) / max(width - 1, 1), abs(im_lim[1] - im_lim[0]) / max(height - 1, 1))
+    magnitude = max(map(abs, tuple(re_lim) + tuple(im_lim)))
+    if spacing < SINGLE_PRECISION_MIN_SPACING * np.finfo(np.float32).eps * magnitude:
+        warnings.warn(f'the distance between points ({spacing:.3g}) is too small for single precision, '
+                      f'using double precision instead', RuntimeWarning, stacklevel=3)
+        return np.complex128
+    return np.complex64
+
+
+def generate_escape_time(re_lim: Tuple[float, float], im_lim: Tuple[float, float], iterations: int,
+                         resolution: Union[int, Tuple[int, int]],
                          et_function: Callable[[np.ndarray, np.ndarray], np.ndarray],
-                         *et_f_args, **et_f_kwargs) -> Tuple[np.ndarray, np.ndarray]:
+                         *et_f_args, engine: str = 'numpy', count_dtype=int, precision: str = 'double',
+                         **et_f_kwargs) -> Tuple[np.ndarray, np.ndarray]:
     """Generates an escape time fractal.
 
     Parameters
     ----------
-    complex_plane : numpy.ndarray
-        The coordinates in the complex complex_plane that will be used to generate the mandelbrot set.
+    re_lim : tuple of float
+        The lower and upper limit of the real axis. May be Decimal or str if engine is 'perturbation'.
+    im_lim : tuple of float
+        The lower and upper limit of the imaginary axis. May be Decimal or str if engine is 'perturbation'.
     iterations : int
         Maximum number of iterations that the mandelbrot formula will be used on a given number.
+    resolution : int or tuple of int
+        Number of points along each axis of the complex plane, or (width, height) for a non-square plane.
     et_function : function
         The function used to calculate the z value of each point in the complex complex_plane.
         Must at least accept (but do not have to use) 2 input arguments of the complex complex_plane and the current z values.
     *et_f_args : any, optional
         Other input arguments for et_function.
+    engine : str, optional
+        The engine used for the iteration, see `ENGINES`. Default is 'numpy'.
+    count_dtype : numpy.dtype or None, optional
+        The dtype of the iteration counts, see `count_dtype_for`. Default is int. None selects the smallest unsigned
+        integer dtype, which uses 4 to 8 times less memory.
+    precision : str, optional
+        'double' iterates in complex128. 'single' iterates in complex64, which halves the memory of z_values and is
+        faster, but is only accurate for shallow views; it falls back to 'double' with a warning when the points are too
+        close together, see `plane_dtype`. Not supported by engine 'perturbation'. Default is 'double'.
+    **et_f_kwargs : any, optional
+        Other input keyword arguments for et_function.
+
+    Returns
+    ----------
+    iteration_counter : numpy.ndarray
+        Number of iterations before |z| >= 2, with dtype count_dtype. Same shape as complex_plane.
+    z_values : numpy.ndarray
+        The values of the complex numbers right after |z| >= 2. Same shape as complex_plane.
+
+    Notes
+    ----------
+    If a cache has been set with `cache.set_default_cache` (or the environment variable FRACTALS_CACHE_DIR), results
+    are loaded from it when the same fractal has been generated before, and saved to it otherwise.
+    """
+    count_dtype = count_dtype_for(iterations, count_dtype)
+    if engine == 'perturbation' and precision != 'double':
+        raise ValueError(f"precision '{precision}' is not supported with engine 'perturbation'")
+    dtype = np.complex128 if engine == 'perturbation' else plane_dtype(re_lim, im_lim, resolution, precision)
+
+    tile_cache = get_default_cache()
+    key = None
+    if tile_cache is not None:
+        key = cache_key(re_lim, im_lim, iterations, resolution, et_function, et_f_args, et_f_kwargs, engine,
+                        'single' if dtype == np.complex64 else 'double')
+        result = tile_cache.get(key) if key is not None else None
+        if result is not None:
+            return result[0].astype(count_dtype, copy=False), result[1]
+
+    if engine == 'perturbation':
+        from perturbation import perturbation_escape_time
+        start = time.perf_counter()
+        iteration_counts, z_values = perturbation_escape_time(re_lim, im_lim, iterations, resolution, et_function,
+                                                              *et_f_args, **et_f_kwargs)
+        instrumentation = get_instrumentation()
+        if instrumentation is not None:
+            instrumentation.record_escape_time(engine, iteration_counts, iterations, time.perf_counter() - start)
+        result = iteration_counts.astype(count_dtype, copy=False), z_values
+    else:
+        re_axis, im_axis = complex_axes(re_lim, im_lim, resolution)
+        complex_plane = (re_axis + 1j * im_axis[:, np.newaxis]).astype(dtype, copy=False)
+        result = escape_time(complex_plane, iterations, et_function, *et_f_args, engine=engine, count_dtype=count_dtype,
+                             **et_f_kwargs)
+
+    if key is not None:
+        tile_cache.put(key, *result)
+    return result
+
+
+def generate_escape_time_batch(re_lim: Tuple[float, float], im_lim: Tuple[float, float], iterations: int,
+                               resolution: Union[int, Tuple[int, int]],
+                               et_function: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                               et_f_args_batch: Sequence[tuple] = None, et_f_kwargs_batch: Sequence[dict] = None,
+                               engine: str = 'numpy', count_dtype=int,
+                               precision: str = 'double') -> Tuple[np.ndarray, np.ndarray]:
+    """Generates a batch of escape time fractals on the same complex plane, which only differ in the arguments of
+    et_function, e.g. the frames of an animation of the constant of a Julia set. The complex plane is generated once,
+    and with engine 'numba' all frames are computed in one call spread over all cores.
+
+    Parameters
+    ----------
+    re_lim, im_lim, iterations, resolution, et_function, engine, count_dtype, precision
+        See `generate_escape_time`. Engine 'perturbation' is not supported.
+    et_f_args_batch : sequence of tuple, optional
+        The other input arguments for et_function of each frame.
+    et_f_kwargs_batch : sequence of dict, optional
+        The other input keyword arguments for et_function of each frame. At least one of et_f_args_batch and
+        et_f_kwargs_batch must be given; if both are given, they must have the same length.
+
+    Returns
+    ----------
+    iteration_counter : numpy.ndarray
+        Number of iterations before |z| >= 2, with dtype count_dtype and shape (frames, height, width).
+    z_values : numpy.ndarray
+        The values of the complex numbers right after |z| >= 2, with shape (frames, height, width).
+
+    Notes
+    ----------
+    The frames are loaded from and saved to the cache set with `cache.set_default_cache` in the same way as by
+    `generate_escape_time`, so only the frames that are not in the cache are computed.
+    """
+    if et_f_args_batch is None and et_f_kwargs_batch is None:
+        raise ValueError('at least one of et_f_args_batch and et_f_kwargs_batch must be given')
+    et_f_args_batch = [tuple(et_f_args) for et_f_args in et_f_args_batch or [()] * len(et_f_kwargs_batch)]
+    et_f_kwargs_batch = list(et_f_kwargs_batch or [{}] * len(et_f_args_batch))
+    if len(et_f_args_batch) != len(et_f_kwargs_batch):
+        raise ValueError(f'et_f_args_batch and et_f_kwargs_batch must have the same length but have lengths '
+                         f'{len(et_f_args_batch)} and {len(et_f_kwargs_batch)}')
+    if engine == 'perturbation':
+        raise ValueError("engine 'perturbation' is not supported by generate_escape_time_batch")
+    count_dtype = count_dtype_for(iterations, count_dtype)
+    dtype = plane_dtype(re_lim, im_lim, resolution, precision)
+    width, height = (resolution, resolution) if np.isscalar(resolution) else resolution
+    frames = len(et_f_args_batch)
+    iteration_counts = np.empty((frames, height, width), dtype=count_dtype)
+    z_values = np.empty((frames, height, width), dtype=dtype)
+
+    tile_cache = get_default_cache()
+    keys = [None] * frames
+    missing = list(range(frames))
+    if tile_cache is not None:
+        missing = []
+        for frame, (et_f_args, et_f_kwargs) in enumerate(zip(et_f_args_batch, et_f_kwargs_batch)):
+            keys[frame] = cache_key(re_lim, im_lim, iterations, resolution, et_function, et_f_args, et_f_kwargs,
+                                    engine, 'single' if dtype == np.complex64 else 'double')
+            result = tile_cache.get(keys[frame]) if keys[frame] is not None else None
+            if result is None:
+                missing.append(frame)
+            else:
+                iteration_counts[frame], z_values[frame] = result
+    if not missing:
+        return iteration_counts, z_values
+
+    re_axis, im_axis = complex_axes(re_lim, im_lim, resolution)
+    complex_plane = (re_axis + 1j * im_axis[:, np.newaxis]).astype(dtype, copy=False)
+    iteration_counts[missing], z_values[missing] = escape_time_batch(
+        complex_plane, iterations, et_function, [et_f_args_batch[frame] for frame in missing],
+        [et_f_kwargs_batch[frame] for frame in missing], engine=engine, count_dtype=count_dtype)
+    for frame in missing:
+        if keys[frame] is not None:
+            tile_cache.put(keys[frame], iteration_counts[frame], z_values[frame])
+    return iteration_counts, z_values
+
+
+def generate_escape_time_progressive(re_lim: Tuple[float, float], im_lim: Tuple[float, float], iterations: int,
+                                     resolution: Union[int, Tuple[int, int]],
+                                     et_function: Callable[[np.ndarray, np.ndarray], np.ndarray], *et_f_args,
+                                     initial_stride: int = 4, engine: str = 'numpy', count_dtype=int,
+                                     precision: str = 'double',
+                                     **et_f_kwargs) -> Iterator[Tuple[np.ndarray, np.ndarray, int]]:
+    """Generates an escape time fractal from coarse to fine, e.g. for previews.
+    The first pass computes every initial_stride-th point along each axis, and every following pass halves the stride
+    and only computes the points that have not been computed yet, so the total work is that of one full render.
+
+    Parameters
+    ----------
+    re_lim : tuple of float
+        The lower and upper limit of the real axis.
+    im_lim : tuple of float
+        The lower and upper limit of the imaginary axis.
+    iterations : int
+        Maximum number of iterations.
+    resolution : int or tuple of int
+        Number of points along each axis of the complex plane, or (width, height) for a non-square plane.
+    et_function : function
+        The function used to calculate the z values, see `generate_escape_time`.
+    *et_f_args : any, optional
+        Other input arguments for et_function.
+    initial_stride : int, optional
+        Distance between the points computed in the first pass. Default is 4, i.e. 1/16 of the points.
+    engine : str, optional
+        The engine used for the iteration, see `escape_time`. Default is 'numpy'.
+    count_dtype : numpy.dtype or None, optional
+        The dtype of the iteration counts, see `generate_escape_time`. Default is int.
+    precision : str, optional
+        'double' or 'single', see `generate_escape_time`. Default is 'double'.
+    **et_f_kwargs : any, optional
+        Other input keyword arguments for et_function.
+
+    Returns
+    ----------
+    passes : iterator
+        Tuples of the iteration counts, z values and stride after each pass. Both arrays have the full shape, with
+        every point that has not been computed yet copied from the nearest computed point above and to the left of it.
+        The last pass has stride 1 and is the same as the result of `generate_escape_time`.
+    """
+    count_dtype = count_dtype_for(iterations, count_dtype)
+    dtype = plane_dtype(re_lim, im_lim, resolution, precision)
+    re_axis, im_axis = complex_axes(re_lim, im_lim, resolution)
+    complex_plane = (re_axis + 1j * im_axis[:, np.newaxis]).astype(dtype, copy=False)
+    iteration_counts = np.empty(complex_plane.shape, dtype=count_dtype)
+    z_values = np.empty_like(complex_plane)
+    computed = np.zeros(complex_plane.shape, dtype=bool)
+    stride = initial_stride
+    while stride >= 1:
+        new_points = np.zeros(complex_plane.shape, dtype=bool)
+        new_points[::stride, ::stride] = True
+        new_points &= ~computed
+        iteration_counts[new_points], z_values[new_points] = escape_time(complex_plane[new_points], iterations,
+                                                                         et_function, *et_f_args, engine=engine,
+                                                                         count_dtype=count_dtype, **et_f_kwargs)
+        computed |= new_points
+        if stride == 1:
+            yield iteration_counts, z_values, stride
+        else:
+            height, width = complex_plane.shape
+            yield (np.repeat(np.repeat(iteration_counts[::stride, ::stride], stride, 0), stride, 1)[:height, :width],
+                   np.repeat(np.repeat(z_values[::stride, ::stride], stride, 0), stride, 1)[:height, :width], stride)
+        stride //= 2
+
+
+def generate_smooth_escape_time(re_lim: Tuple[float, float], im_lim: Tuple[float, float], iterations: int,
+                                resolution: Union[int, Tuple[int, int]],
+                                et_function: Callable[[np.ndarray, np.ndarray], np.ndarray], *et_f_args,
+                                engine: str = 'numpy', bailout: float = SMOOTH_BAILOUT, precision: str = 'double',
+                                **et_f_kwargs) -> np.ndarray:
+    """Generates continuous (smooth) escape values of an escape time fractal, without keeping the z values.
+
+    Parameters
+    ----------
+    See `generate_escape_time` and `smooth_escape_time`. With engine 'perturbation' the values are calculated from the
+    iteration counts and z values with `smooth_escape_values`, since the perturbation engine uses bailout radius 2.
+
+    Returns
+    ----------
+    smooth_values : numpy.ndarray
+        The escape values normalized by iterations, as float32. Points that did not escape get the value 1.
+    """
+    if engine == 'perturbation':
+        iteration_counts, z_values = generate_escape_time(re_lim, im_lim, iterations, resolution, et_function,
+                                                          *et_f_args, engine=engine, precision=precision, **et_f_kwargs)
+        return smooth_escape_values(iteration_counts, z_values, iterations)
+
+    re_axis, im_axis = complex_axes(re_lim, im_lim, resolution)
+    complex_plane = (re_axis + 1j * im_axis[:, np.newaxis]).astype(plane_dtype(re_lim, im_lim, resolution, precision),
+                                                                   copy=False)
+    return smooth_escape_time(complex_plane, iterations, et_function, *et_f_args, engine=engine, bailout=bailout,
+                              **et_f_kwargs)
+
+
+def smooth_escape_time(complex_plane: np.ndarray, iterations: int,
+                       et_function: Callable[[np.ndarray, np.ndarray], np.ndarray], *et_f_args, engine: str = 'numpy',
+                       bailout: float = SMOOTH_BAILOUT, **et_f_kwargs) -> np.ndarray:
+    """Iterates every point of an already generated complex plane until |z| >= bailout and calculates the continuous
+    escape value n + 1 - log2(log|z| / log(bailout)) of each point right when it escapes, where n is the number of
+    iterations before |z| >= bailout. The values are continuous for formulas of degree 2, e.g. z**2 + c.
+
+    Parameters
+    ----------
+    complex_plane : numpy.ndarray
+        The coordinates in the complex plane that will be iterated.
+    iterations : int
+        Maximum number of iterations.
+    et_function : function
+        The function used to calculate the z value of each point, see `generate_escape_time`.
+    *et_f_args : any, optional
+        Other input arguments for et_function.
+    engine : str, optional
+        'numpy', 'compact' (the same for smooth values) or 'numba', see `escape_time`. Default is 'numpy'.
+    bailout : float, optional
+        The radius that |z| must reach for a point to escape. Default is `SMOOTH_BAILOUT`.
+    **et_f_kwargs : any, optional
+        Other input keyword arguments for et_function.
+
+    Returns
+    ----------
+    smooth_values : numpy.ndarray
+        The escape values normalized by iterations and clipped to [0, 1], as float32. Points that did not escape get
+        the value 1. Same shape as complex_plane.
+    """
+    start = time.perf_counter()
+    if engine in ('numpy', 'compact'):
+        smooth_values = _numpy_smooth_escape_time(complex_plane, iterations, et_function, et_f_args, et_f_kwargs,
+                                                  bailout)
+    elif engine == 'numba':
+        from numba_engine import numba_smooth_escape_time
+        smooth_values = numba_smooth_escape_time(complex_plane, iterations, et_function, *et_f_args, bailout=bailout,
+                                                 **et_f_kwargs)
+    elif engine == 'perturbation':
+        raise ValueError("engine 'perturbation' needs the limits of the plane, use generate_smooth_escape_time instead")
+    else:
+        raise ValueError(f"'{engine}' is not a valid value for engine; supported values are "
+                         f"{', '.join(map(repr, ENGINES))}")
+
+    instrumentation = get_instrumentation()
+    if instrumentation is not None:
+        # The number of iterations of each point is the integer part of its smooth value
+        instrumentation.record_escape_time(engine, (smooth_values * iterations).astype(np.intp), iterations,
+                                           time.perf_counter() - start)
+    return smooth_values
+
+
+def escape_time(complex_plane: np.ndarray, iterations: int, et_function: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                *et_f_args, engine: str = 'numpy', count_dtype=int, **et_f_kwargs) -> Tuple[np.ndarray, np.ndarray]:
+    """Iterates every point of an already generated complex plane with the selected engine.
+
+    Parameters
+    ----------
+    complex_plane : numpy.ndarray
+        The coordinates in the complex plane that will be iterated. The iteration is done in single precision if the
+        dtype is complex64, and in double precision otherwise.
+    iterations : int
+        Maximum number of iterations.
+    et_function : function
+        The function used to calculate the z value of each point, see `generate_escape_time`.
+    *et_f_args : any, optional
+        Other input arguments for et_function.
+    engine : str, optional
+        The engine used for the iteration:
+
+        - 'numpy': iterates the whole plane with vectorized numpy operations. Works with any et_function.
+        - 'compact': vectorized numpy operations on compact arrays of the points that have not escaped yet, so the cost
+          of each iteration scales with the number of live points. Works with any et_function.
+        - 'numba': compiled per-pixel loop with early exit, running blocks of pixels in parallel on all cores.
+          et_function must be decorated with @njit and work on single complex numbers.
+        - 'perturbation': deep zoom of the Mandelbrot and Julia sets, see `perturbation.perturbation_escape_time`.
+          Only supported by `generate_escape_time`, since it needs the limits of the plane in high precision.
+    count_dtype : numpy.dtype or None, optional
+        The dtype of the iteration counts, see `count_dtype_for`. Default is int.
     **et_f_kwargs : any, optional
         Other input keyword arguments for et_function.
 
@@ -30,9 +443,89 @@ def generate_escape_time(re_lim: Tuple[float, float], im_lim: Tuple[float, float
     z_values : numpy.ndarray
         The values of the complex numbers right after |z| >= 2. Same shape as complex_plane.
     """
-    complex_plane = np.linspace(*re_lim, resolution) + 1j * np.linspace(*im_lim, resolution)[:, np.newaxis]
+    count_dtype = count_dtype_for(iterations, count_dtype)
+    if engine == 'numpy':
+        engine_function = _numpy_escape_time
+    elif engine == 'compact':
+        engine_function = _compact_escape_time
+    elif engine == 'numba':
+        from numba_engine import numba_escape_time as engine_function
+    elif engine == 'perturbation':
+        raise ValueError("engine 'perturbation' needs the limits of the plane, use generate_escape_time instead")
+    else:
+        raise ValueError(f"'{engine}' is not a valid value for engine; supported values are "
+                         f"{', '.join(map(repr, ENGINES))}")
+
+    start = time.perf_counter()
+    result = engine_function(complex_plane, iterations, et_function, *et_f_args, count_dtype=count_dtype, **et_f_kwargs)
+    instrumentation = get_instrumentation()
+    if instrumentation is not None:
+        instrumentation.record_escape_time(engine, result[0], iterations, time.perf_counter() - start)
+    return result
+
+
+def escape_time_batch(complex_plane: np.ndarray, iterations: int,
+                      et_function: Callable[[np.ndarray, np.ndarray], np.ndarray], et_f_args_batch: Sequence[tuple],
+                      et_f_kwargs_batch: Sequence[dict], engine: str = 'numpy',
+                      count_dtype=int) -> Tuple[np.ndarray, np.ndarray]:
+    """Iterates every point of an already generated complex plane for each of a batch of arguments of et_function,
+    see `generate_escape_time_batch`. With engine 'numba', all frames are computed in one compiled call, see
+    `numba_engine.numba_escape_time_batch`; the other engines compute one frame after the other.
+
+    Returns
+    ----------
+    iteration_counter : numpy.ndarray
+        Number of iterations before |z| >= 2, with shape (frames,) + complex_plane.shape.
+    z_values : numpy.ndarray
+        The values of the complex numbers right after |z| >= 2, with shape (frames,) + complex_plane.shape.
+    """
+    count_dtype = count_dtype_for(iterations, count_dtype)
+    if engine == 'numba':
+        from numba_engine import numba_escape_time_batch
+        start = time.perf_counter()
+        result = numba_escape_time_batch(complex_plane, iterations, et_function, et_f_args_batch, et_f_kwargs_batch,
+                                         count_dtype=count_dtype)
+        instrumentation = get_instrumentation()
+        if instrumentation is not None:
+            instrumentation.record_escape_time(engine, result[0], iterations, time.perf_counter() - start)
+        return result
+
+    iteration_counts = np.empty((len(et_f_args_batch),) + complex_plane.shape, dtype=count_dtype)
+    z_values = np.empty((len(et_f_args_batch),) + complex_plane.shape, dtype=complex_plane.dtype)
+    for frame, (et_f_args, et_f_kwargs) in enumerate(zip(et_f_args_batch, et_f_kwargs_batch)):
+        iteration_counts[frame], z_values[frame] = escape_time(complex_plane, iterations, et_function, *et_f_args,
+                                                               engine=engine, count_dtype=count_dtype, **et_f_kwargs)
+    return iteration_counts, z_values
+
+
+def smooth_escape_values(iteration_counts: np.ndarray, z_values: np.ndarray, iterations: int) -> np.ndarray:
+    """Calculates continuous escape values from the iteration counts and the z values right after escaping.
+
+    Parameters
+    ----------
+    iteration_counts : numpy.ndarray
+        Number of iterations before |z| >= 2.
+    z_values : numpy.ndarray
+        The values of the complex numbers right after |z| >= 2.
+    iterations : int
+        Maximum number of iterations.
+
+    Returns
+    ----------
+    smooth_values : numpy.ndarray
+        The escape values normalized by iterations, as float32. Points that did not escape get the value 1.
+    """
+    escaped = iteration_counts < iterations
+    smooth_values = np.ones(np.shape(iteration_counts), dtype=np.float32)
+    log_abs_z = np.log(np.abs(z_values[escaped]))
+    smooth_values[escaped] = (iteration_counts[escaped] + 1 - np.log2(log_abs_z / np.log(2))) / iterations
+    return smooth_values
+
+
+def _numpy_escape_time(complex_plane: np.ndarray, iterations: int, et_function: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                       *et_f_args, count_dtype=int, **et_f_kwargs) -> Tuple[np.ndarray, np.ndarray]:
     z_values = np.copy(complex_plane)
-    iteration_counter = np.ones(z_values.shape, dtype=int)*iterations
+    iteration_counter = np.full(z_values.shape, iterations, dtype=count_dtype)
     exceeded_limit_before = np.zeros(z_values.shape, dtype=bool)
     for i in range(iterations):
         exceeded_limit_after = np.abs(z_values) >= 2
@@ -43,7 +536,104 @@ def generate_escape_time(re_lim: Tuple[float, float], im_lim: Tuple[float, float
     return iteration_counter, z_values
 
 
+def deepen_escape_time(complex_plane: np.ndarray, iteration_counts: np.ndarray, z_values: np.ndarray, iterations: int,
+                       new_iterations: int, et_function: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                       *et_f_args, **et_f_kwargs) -> Tuple[np.ndarray, np.ndarray]:
+    """Continues the iteration of an escape time fractal from iterations to new_iterations.
+    Only the points that have not escaped yet (iteration count equal to iterations) are iterated further.
+
+    Parameters
+    ----------
+    complex_plane : numpy.ndarray
+        The coordinates in the complex plane.
+    iteration_counts : numpy.ndarray
+        Number of iterations before |z| >= 2 after iterations iterations. Same shape as complex_plane.
+    z_values : numpy.ndarray
+        The z values after iterations iterations. Same shape as complex_plane.
+    iterations : int
+        Number of iterations that have already been done.
+    new_iterations : int
+        Maximum number of iterations after the continuation.
+    et_function : function
+        The function used to calculate the z values, see `generate_escape_time`.
+    *et_f_args : any, optional
+        Other input arguments for et_function.
+    **et_f_kwargs : any, optional
+        Other input keyword arguments for et_function.
+
+    Returns
+    ----------
+    iteration_counter : numpy.ndarray
+        Number of iterations before |z| >= 2, with at most new_iterations iterations. Same shape as complex_plane.
+    z_values : numpy.ndarray
+        The values of the complex numbers right after |z| >= 2. Same shape as complex_plane.
+    """
+    iteration_counter = np.array(iteration_counts, dtype=int).ravel()
+    z_values = np.array(z_values, dtype=complex).ravel()
+    index_live = np.flatnonzero(iteration_counter == iterations)
+    iteration_counter[index_live] = new_iterations
+    _iterate_live(np.ravel(complex_plane)[index_live], z_values[index_live], index_live, iteration_counter, z_values,
+                  iterations, new_iterations, et_function, et_f_args, et_f_kwargs)
+    return iteration_counter.reshape(np.shape(complex_plane)), z_values.reshape(np.shape(complex_plane))
+
+
+def _iterate_live(c_live: np.ndarray, z_live: np.ndarray, index_live: np.ndarray, iteration_counter: np.ndarray,
+                  z_values: np.ndarray, start: int, stop: int, et_function: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                  et_f_args: tuple, et_f_kwargs: dict):
+    # Iterates the live points from iteration start to stop, writing into the flat iteration_counter and z_values
+    for i in range(start, stop):
+        escaped = z_live.real * z_live.real + z_live.imag * z_live.imag >= 4
+        if escaped.any():
+            # Each point is written back exactly once, when it escapes, and then dropped from the live arrays
+            escaped_index = index_live[escaped]
+            iteration_counter[escaped_index] = i
+            z_values[escaped_index] = z_live[escaped]
+            bounded = ~escaped
+            index_live = index_live[bounded]
+            z_live = z_live[bounded]
+            c_live = c_live[bounded]
+            if not index_live.size:
+                break
+        z_live = et_function(z_live, c_live, *et_f_args, **et_f_kwargs)
+    z_values[index_live] = z_live
+
+
+def _numpy_smooth_escape_time(complex_plane: np.ndarray, iterations: int,
+                              et_function: Callable[[np.ndarray, np.ndarray], np.ndarray], et_f_args: tuple,
+                              et_f_kwargs: dict, bailout: float) -> np.ndarray:
+    # Same as _iterate_live, but the smooth value of each point is calculated when it escapes instead of keeping z
+    c_live = np.ravel(complex_plane)
+    z_live = np.copy(c_live)
+    index_live = np.arange(c_live.size)
+    smooth_values = np.ones(c_live.size, dtype=np.float32)
+    bailout_squared, log_bailout = bailout * bailout, np.log(bailout)
+    for i in range(iterations):
+        abs_squared = z_live.real * z_live.real + z_live.imag * z_live.imag
+        escaped = abs_squared >= bailout_squared
+        if escaped.any():
+            smooth_values[index_live[escaped]] = (i + 1 - np.log2(0.5 * np.log(abs_squared[escaped]) / log_bailout)) / iterations
+            bounded = ~escaped
+            index_live = index_live[bounded]
+            z_live = z_live[bounded]
+            c_live = c_live[bounded]
+            if not index_live.size:
+                break
+        z_live = et_function(z_live, c_live, *et_f_args, **et_f_kwargs)
+    np.clip(smooth_values, 0, 1, out=smooth_values)
+    return smooth_values.reshape(np.shape(complex_plane))
+
+
+def _compact_escape_time(complex_plane: np.ndarray, iterations: int, et_function: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                         *et_f_args, count_dtype=int, **et_f_kwargs) -> Tuple[np.ndarray, np.ndarray]:
+    c_live = np.ravel(complex_plane)
+    iteration_counter = np.full(c_live.size, iterations, dtype=count_dtype)
+    z_values = np.empty_like(c_live)
+    _iterate_live(c_live, np.copy(c_live), np.arange(c_live.size), iteration_counter, z_values, 0, iterations,
+                  et_function, et_f_args, et_f_kwargs)
+    return iteration_counter.reshape(np.shape(complex_plane)), z_values.reshape(np.shape(complex_plane))
+
 if __name__ == '__main__':
+    from matplotlib import pyplot as plt
     colormap = sys.argv[1]
     re_lim = (-2., 2.)
     im_lim = (-1.5, 1.5)
@@ -0,0 +1,118 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple, Union
+from fractal_generator import complex_axes, escape_time
+
+
+@dataclass
+class Frame:
+    re_axis: np.ndarray
+    im_axis: np.ndarray
+    iteration_counts: np.ndarray
+    z_values: np.ndarray
+    # Fraction of the points that were taken from the previous frame instead of being computed
+    reused: float = 0.
+
+
+def uniform_cells(iteration_counts: np.ndarray, margin: int) -> np.ndarray:
+    """Finds the cells between 4 neighbouring points where the iteration counts are the same in all points within
+    margin points of the cell.
+
+    Parameters
+    ----------
+    iteration_counts : numpy.ndarray
+        Number of iterations before |z| >= 2, with shape (height, width).
+    margin : int
+        Number of points around each cell that must have the same iteration count as the cell.
+
+    Returns
+    ----------
+    uniform : numpy.ndarray
+        Boolean array with shape (height - 1, width - 1). Element (i, j) is the cell between the points (i, j) and
+        (i + 1, j + 1).
+    """
+    corners = (iteration_counts[:-1, :-1], iteration_counts[1:, :-1], iteration_counts[:-1, 1:], iteration_counts[1:, 1:])
+    minimum = np.minimum.reduce(corners)
+    maximum = np.maximum.reduce(corners)
+    for _ in range(margin):
+        minimum = np.pad(minimum, 1, mode='edge')
+        maximum = np.pad(maximum, 1, mode='edge')
+        minimum = np.minimum.reduce([minimum[row:row + minimum.shape[0] - 2, column:column + minimum.shape[1] - 2]
+                                     for row in range(3) for column in range(3)])
+        maximum = np.maximum.reduce([maximum[row:row + maximum.shape[0] - 2, column:column + maximum.shape[1] - 2]
+                                     for row in range(3) for column in range(3)])
+    return minimum == maximum
+
+
+def _axis_index(axis: np.ndarray, previous_axis: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Index of the cell of previous_axis that each point of axis falls in, whether it falls inside previous_axis and
+    # the index of the nearest point of previous_axis
+    position = (axis - previous_axis[0]) / (previous_axis[-1] - previous_axis[0]) * (previous_axis.size - 1)
+    cell = np.floor(position).astype(np.intp)
+    inside = (cell >= 0) & (cell < previous_axis.size - 1)
+    nearest = np.clip(np.rint(position).astype(np.intp), 0, previous_axis.size - 1)
+    return np.clip(cell, 0, previous_axis.size - 2), inside, nearest
+
+
+def generate_reused_escape_time(previous: Optional[Frame], re_lim: Tuple[float, float], im_lim: Tuple[float, float],
+                                iterations: int, resolution: Union[int, Tuple[int, int]],
+                                et_function: Callable[[np.ndarray, np.ndarray], np.ndarray], *et_f_args,
+                                margin: int = 2, engine: str = 'numpy', **et_f_kwargs) -> Frame:
+    """Generates an escape time fractal, reusing the iteration counts of a previous frame (e.g. during a zoom).
+    A point is copied from the previous frame if it lies in a cell of the previous frame where all points,
+    including those within margin points of the cell, have the same iteration count. All other points (new area and
+    points close to a change in iteration count) are computed.
+
+    Parameters
+    ----------
+    previous : Frame or None
+        The previous frame, which must have been generated with the same et_function, arguments and iterations.
+        If None, every point is computed.
+    re_lim : tuple of float
+        The lower and upper limit of the real axis.
+    im_lim : tuple of float
+        The lower and upper limit of the imaginary axis.
+    iterations : int
+        Maximum number of iterations.
+    resolution : int or tuple of int
+        Number of points along each axis of the complex plane, or (width, height) for a non-square plane.
+    et_function : function
+        The function used to calculate the z values, see `fractal_generator.generate_escape_time`.
+    *et_f_args : any, optional
+        Other input arguments for et_function.
+    margin : int, optional
+        Number of points around a cell of the previous frame that must have the same iteration count for the cell to be
+        reused. Larger values are safer but reuse less: while zooming into the Mandelbrot set by 1.25 per frame, margin
+        1 reuses about 76% of the points with 0.004% wrong iteration counts and margin 2 about 71% with 0.0008%.
+        Default is 2.
+    engine : str, optional
+        The engine used for the computed points, see `fractal_generator.escape_time`. Default is 'numpy'.
+    **et_f_kwargs : any, optional
+        Other input keyword arguments for et_function.
+
+    Returns
+    ----------
+    frame : Frame
+        The axes, iteration counts and z values of the new frame. The z values of reused points are taken from the
+        nearest point of the previous frame, so they are only approximate.
+    """
+    re_axis, im_axis = complex_axes(re_lim, im_lim, resolution)
+    complex_plane = re_axis + 1j * im_axis[:, np.newaxis]
+    if previous is None or previous.re_axis.size < 2 or previous.im_axis.size < 2:
+        return Frame(re_axis, im_axis, *escape_time(complex_plane, iterations, et_function, *et_f_args, engine=engine,
+                                                    **et_f_kwargs))
+
+    columns, columns_inside, nearest_columns = _axis_index(re_axis, previous.re_axis)
+    rows, rows_inside, nearest_rows = _axis_index(im_axis, previous.im_axis)
+    reuse = uniform_cells(previous.iteration_counts, margin)[rows[:, np.newaxis], columns]
+    reuse &= rows_inside[:, np.newaxis] & columns_inside
+
+    iteration_counts = np.empty(complex_plane.shape, dtype=previous.iteration_counts.dtype)
+    z_values = np.empty_like(complex_plane)
+    iteration_counts[reuse] = previous.iteration_counts[rows[:, np.newaxis], columns][reuse]
+    z_values[reuse] = previous.z_values[nearest_rows[:, np.newaxis], nearest_columns][reuse]
+
+    compute = ~reuse
+    iteration_counts[compute], z_values[compute] = escape_time(complex_plane[compute], iterations, et_function,
+                                                               *et_f_args, engine=engine, **et_f_kwargs)
+    return Frame(re_axis, im_axis, iteration_counts, z_values, reuse.mean())
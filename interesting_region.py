@@ -1,8 +1,9 @@
 import numpy as np
 from numba import njit
+from typing import Tuple
 
 
-@njit
+@njit(nogil=True, cache=True)
 def entropy(array: np.ndarray, base: float = None) -> np.float64:
     """Calculate the entropy of a distribution for given probability values. Code inspired by [1]_ and [2]_.
     Parameters
@@ -25,7 +26,7 @@ def entropy(array: np.ndarray, base: float = None) -> np.float64:
     """
     probability_counts = np.bincount(array.ravel())
     p_norm = probability_counts / probability_counts.sum()
-    entropy = np.zeros(p_norm.shape) - np.Inf
+    entropy = np.zeros(p_norm.shape) - np.inf
     above_zero = p_norm > 0
     entropy[above_zero] = -p_norm[above_zero] * np.log(p_norm[above_zero])
     is_zero = p_norm == 0
@@ -38,8 +39,8 @@ def entropy(array: np.ndarray, base: float = None) -> np.float64:
     return S
 
 
-@njit
-def find_interesting_region(plane: np.ndarray, zoom_factor: float, iterations: np.int64) -> np.ndarray:
+@njit(nogil=True, cache=True)
+def find_interesting_region_brute_force(plane: np.ndarray, zoom_factor: float, iterations: np.int64) -> np.ndarray:
     a = np.empty(2)
     np.round(np.array(plane.shape) / zoom_factor, 0, a)
     x_factor, y_factor = a.astype(np.int64)
@@ -57,22 +58,22 @@ def find_interesting_region(plane: np.ndarray, zoom_factor: float, iterations: n
     return segment_index_range.astype(np.int64)
 
 
-@njit
+@njit(nogil=True, cache=True)
 def faster_unique(array: np.ndarray, max_val: np.int64) -> np.int64:
     unique_vals = np.zeros(max_val, dtype=np.uint8)
     unique_vals[array.ravel()] = 1
     return unique_vals.sum()
 
 
-@njit
+@njit(nogil=True, cache=True)
 def new_variance(array: np.ndarray, iterations: np.int64) -> np.float64:
     vertical = np.diff(array)
     horizontal = np.diff(array.T)
     return faster_unique(vertical, iterations) + faster_unique(horizontal, iterations)
 
 
-@njit
-def max_var_segment(plane: np.ndarray, zoom_factor: float) -> np.ndarray:
+@njit(nogil=True, cache=True)
+def max_var_segment_brute_force(plane: np.ndarray, zoom_factor: float) -> np.ndarray:
     """Identifies the segment of a 2D array which is the most interesting.
 
     Parameters
@@ -110,3 +111,200 @@ def max_var_segment(plane: np.ndarray, zoom_factor: float) -> np.ndarray:
     return segment_index_range.astype(np.int64)
 
 
+# Windows whose incrementally updated score is within this (relative) tolerance of the best score are checked with the
+# brute force score, so that rounding errors never change which window is found. Windows whose score is within this
+# tolerance of 0 are flat, which the brute force search never picks, so they are not checked
+_TOLERANCE = 1e-9
+
+
+@njit(nogil=True, cache=True)
+def _window_shape(shape: tuple, zoom_factor: float) -> np.ndarray:
+    a = np.empty(2)
+    np.round(np.array(shape) / zoom_factor, 0, a)
+    return a.astype(np.int64)
+
+
+@njit(nogil=True, cache=True)
+def _refine(plane: np.ndarray, segment_index_range: np.ndarray, stride: np.int64, use_entropy: bool) -> np.ndarray:
+    # Brute force search of the windows within stride of the best window of a coarse search
+    x_factor = segment_index_range[0, 1] - segment_index_range[0, 0]
+    y_factor = segment_index_range[1, 1] - segment_index_range[1, 0]
+    best = 0.
+    best_range = np.ones((2, 2), dtype=np.int64) * -1
+    for x in range(max(segment_index_range[0, 0] - stride + 1, 0),
+                   min(segment_index_range[0, 0] + stride, plane.shape[0] - x_factor)):
+        for y in range(max(segment_index_range[1, 0] - stride + 1, 0),
+                       min(segment_index_range[1, 0] + stride, plane.shape[1] - y_factor)):
+            segment = plane[x:x + x_factor + 1, y:y + y_factor + 1]
+            if use_entropy:
+                score = entropy(segment.astype(np.int64))
+            else:
+                score = ((segment - segment.mean())**2).sum()
+            if score > best:
+                best = score
+                best_range[:] = np.array([[x, x + x_factor], [y, y + y_factor]])
+    return best_range
+
+
+@njit(nogil=True, cache=True)
+def find_interesting_region(plane: np.ndarray, zoom_factor: float, iterations: np.int64,
+                            stride: np.int64 = 1) -> np.ndarray:
+    """Finds the segment of a 2D array with the largest shannon entropy (see `entropy`).
+    The histogram of the segment is updated as the segment slides over plane, instead of being calculated from scratch
+    for every position. Gives the same result as `find_interesting_region_brute_force` if stride = 1.
+
+    Parameters
+    ----------
+    plane : numpy.ndarray
+        Non-negative integer values that will be examined, e.g. iteration counts.
+    zoom_factor : float
+        How small each segment should be. If `zoom_factor = 2` and `plane` has shape 100x100, then each segment is 50x50.
+    iterations : int
+        Maximum number of iterations. Not used.
+    stride : int, optional
+        Distance between the examined segments. If larger than 1, the segments around the best one are then examined
+        with a stride of 1. Faster, but may miss the best segment. Default is 1.
+
+    Returns
+    ----------
+    segment_index : numpy.ndarray
+        The start and end index of the segment with largest entropy, e.g. [0 10].
+        The first returned parameter is the x (row) range and the second parameter is the y (column) range.
+    """
+    x_factor, y_factor = _window_shape(plane.shape, zoom_factor)
+    segment_index_range = np.ones((2, 2), dtype=np.int64) * -1
+    if x_factor >= plane.shape[0] or y_factor >= plane.shape[1]:
+        return segment_index_range
+
+    values = plane.astype(np.int64)
+    window_size = (x_factor + 1) * (y_factor + 1)
+    # The entropy of a window is log(N) - sum(n * log(n)) / N, where n are the counts of the histogram
+    n_log_n = np.zeros(window_size + 1)
+    for n in range(1, window_size + 1):
+        n_log_n[n] = n * np.log(n)
+
+    row_histogram = np.zeros(values.max() + 1, dtype=np.int64)
+    for value in values[:x_factor + 1, :y_factor + 1].ravel():
+        row_histogram[value] += 1
+    row_sum = 0.
+    for count in row_histogram:
+        row_sum += n_log_n[count]
+
+    best = 0.
+    best_approximation = 0.
+    for x in range(0, plane.shape[0] - x_factor, stride):
+        if x > 0:
+            # Move the window of the first column down by stride rows
+            for row in range(x - stride, x):
+                for value in values[row, :y_factor + 1]:
+                    row_sum += n_log_n[row_histogram[value] - 1] - n_log_n[row_histogram[value]]
+                    row_histogram[value] -= 1
+            for row in range(x - stride + x_factor + 1, x + x_factor + 1):
+                for value in values[row, :y_factor + 1]:
+                    row_sum += n_log_n[row_histogram[value] + 1] - n_log_n[row_histogram[value]]
+                    row_histogram[value] += 1
+
+        histogram = row_histogram.copy()
+        window_sum = row_sum
+        for y in range(0, plane.shape[1] - y_factor, stride):
+            if y > 0:
+                # Move the window right by stride columns
+                for column in range(y - stride, y):
+                    for value in values[x:x + x_factor + 1, column]:
+                        window_sum += n_log_n[histogram[value] - 1] - n_log_n[histogram[value]]
+                        histogram[value] -= 1
+                for column in range(y - stride + y_factor + 1, y + y_factor + 1):
+                    for value in values[x:x + x_factor + 1, column]:
+                        window_sum += n_log_n[histogram[value] + 1] - n_log_n[histogram[value]]
+                        histogram[value] += 1
+
+            approximation = np.log(window_size) - window_sum / window_size
+            # The smallest entropy of a window that is not flat is about log(window_size) / window_size
+            if approximation > max(best_approximation - _TOLERANCE * max(1., best_approximation), _TOLERANCE):
+                segment_entropy = entropy(values[x:x + x_factor + 1, y:y + y_factor + 1])
+                if segment_entropy > best:
+                    best = segment_entropy
+                    best_approximation = approximation
+                    segment_index_range[:] = np.array([[x, x + x_factor], [y, y + y_factor]])
+
+    if stride > 1 and segment_index_range[0, 0] >= 0:
+        return _refine(values, segment_index_range, stride, True)
+    return segment_index_range
+
+
+@njit(nogil=True, cache=True)
+def _max_var_windows(plane: np.ndarray, integral: np.ndarray, integral_squares: np.ndarray, x_factor: np.int64,
+                     y_factor: np.int64, stride: np.int64, rounding_error: float,
+                     flat: float) -> Tuple[np.ndarray, float]:
+    # Search of max_var_segment, where the windows whose approximated variance is at most flat are not checked
+    window_size = (x_factor + 1) * (y_factor + 1)
+    best = 0.
+    best_approximation = 0.
+    segment_index_range = np.ones((2, 2), dtype=np.int64) * -1
+    for x in range(0, plane.shape[0] - x_factor, stride):
+        for y in range(0, plane.shape[1] - y_factor, stride):
+            x_end, y_end = x + x_factor + 1, y + y_factor + 1
+            segment_sum = integral[x_end, y_end] - integral[x, y_end] - integral[x_end, y] + integral[x, y]
+            segment_squares = (integral_squares[x_end, y_end] - integral_squares[x, y_end] - integral_squares[x_end, y]
+                               + integral_squares[x, y])
+            approximation = segment_squares - segment_sum * segment_sum / window_size
+            if approximation > max(best_approximation - _TOLERANCE * max(1., best_approximation) - rounding_error,
+                                   flat):
+                segment = plane[x:x_end, y:y_end]
+                segment_variance = ((segment - segment.mean())**2).sum()
+                if segment_variance > best:
+                    best = segment_variance
+                    best_approximation = approximation
+                    segment_index_range[:] = np.array([[x, x + x_factor], [y, y + y_factor]])
+    return segment_index_range, best
+
+
+@njit(nogil=True, cache=True)
+def max_var_segment(plane: np.ndarray, zoom_factor: float, stride: np.int64 = 1) -> np.ndarray:
+    """Identifies the segment of a 2D array with the largest sum of squared deviations from its mean.
+    The sum and sum of squares of each segment are calculated in constant time from integral images.
+    Gives the same result as `max_var_segment_brute_force` if stride = 1.
+
+    Parameters
+    ----------
+    plane : numpy.ndarray
+        Values that will be examined.
+    zoom_factor : int
+        How small each segment should be. If `zoom_factor = 2` and `plane` has shape 100x100, then each segment is 50x50.
+    stride : int, optional
+        Distance between the examined segments. If larger than 1, the segments around the best one are then examined
+        with a stride of 1. Faster, but may miss the best segment. Default is 1.
+
+    Returns
+    ----------
+    segment_index : numpy.ndarray
+        The start and end index of the segment with largest variance, e.g. [0 10].
+        The first returned parameter is the x (row) range and the second parameter is the y (column) range.
+    """
+    x_factor, y_factor = _window_shape(plane.shape, zoom_factor)
+    segment_index_range = np.ones((2, 2), dtype=np.int64) * -1
+    if x_factor >= plane.shape[0] or y_factor >= plane.shape[1]:
+        return segment_index_range
+
+    rows, columns = plane.shape
+    integral = np.zeros((rows + 1, columns + 1))
+    integral_squares = np.zeros((rows + 1, columns + 1))
+    for x in range(rows):
+        for y in range(columns):
+            value = np.float64(plane[x, y])
+            integral[x + 1, y + 1] = value + integral[x, y + 1] + integral[x + 1, y] - integral[x, y]
+            integral_squares[x + 1, y + 1] = (value * value + integral_squares[x, y + 1] + integral_squares[x + 1, y]
+                                              - integral_squares[x, y])
+
+    # Cancellation in the integral images gives errors relative to their total, not to the variance of the segment
+    rounding_error = 1e-12 * integral_squares[rows, columns]
+    segment_index_range, best = _max_var_windows(plane, integral, integral_squares, x_factor, y_factor, stride,
+                                                 rounding_error, rounding_error)
+    if best <= 2 * rounding_error and plane.max() > plane.min():
+        # The best window may have been skipped as flat, since the approximations are only accurate to rounding_error
+        segment_index_range, _ = _max_var_windows(plane, integral, integral_squares, x_factor, y_factor, stride,
+                                                  rounding_error, -np.inf)
+
+    if stride > 1 and segment_index_range[0, 0] >= 0:
+        return _refine(plane, segment_index_range, stride, False)
+    return segment_index_range
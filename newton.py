@@ -0,0 +1,174 @@
+import numpy as np
+from numba import njit, prange
+from typing import Sequence, Tuple, Union
+from fractal_generator import complex_axes
+
+
+ENGINES = ('numpy', 'numba')
+BLOCK_SIZE = 64
+
+
+@njit(nogil=True, cache=True)
+def _horner(coefficients: np.ndarray, derivative: np.ndarray, z: complex) -> Tuple[complex, complex]:
+    p = 0j
+    for coefficient in coefficients:
+        p = p * z + coefficient
+    dp = 0j
+    for coefficient in derivative:
+        dp = dp * z + coefficient
+    return p, dp
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def _newton_blocks(complex_plane: np.ndarray, iterations: int, coefficients: np.ndarray, derivative: np.ndarray,
+                   roots: np.ndarray, relaxation: complex, nova: bool, tolerance: float, iteration_counts: np.ndarray,
+                   root_index: np.ndarray):
+    size = complex_plane.size
+    tolerance_squared = tolerance * tolerance
+    for block in prange((size + BLOCK_SIZE - 1) // BLOCK_SIZE):
+        for index in range(block * BLOCK_SIZE, min(block * BLOCK_SIZE + BLOCK_SIZE, size)):
+            c = complex_plane[index]
+            z = 1. + 0j if nova else c
+            count = iterations
+            root = -1
+            for i in range(iterations):
+                p, dp = _horner(coefficients, derivative, z)
+                if dp == 0:
+                    break
+                step = relaxation * p / dp
+                if nova:
+                    step -= c
+                z -= step
+                if nova:
+                    if step.real * step.real + step.imag * step.imag < tolerance_squared:
+                        count = i + 1
+                        break
+                else:
+                    for k in range(roots.size):
+                        difference = z - roots[k]
+                        if difference.real * difference.real + difference.imag * difference.imag < tolerance_squared:
+                            root = k
+                            break
+                    if root >= 0:
+                        count = i + 1
+                        break
+            iteration_counts[index] = count
+            root_index[index] = root
+
+
+def _numpy_newton(c_live: np.ndarray, iterations: int, coefficients: np.ndarray, derivative: np.ndarray,
+                  roots: np.ndarray, relaxation: complex, nova: bool, tolerance: float,
+                  iteration_counts: np.ndarray, root_index: np.ndarray):
+    # Vectorized iteration of the points that have not converged yet; converged points are written back and dropped
+    index_live = np.arange(c_live.size)
+    z_live = np.ones_like(c_live) if nova else np.copy(c_live)
+    for i in range(iterations):
+        dp = np.polyval(derivative, z_live)
+        # Points where the derivative is 0 cannot be iterated further and never converge
+        stuck = dp == 0
+        step = relaxation * np.polyval(coefficients, z_live) / np.where(stuck, 1, dp)
+        if nova:
+            step -= c_live
+        z_live = z_live - step
+
+        if nova:
+            converged = np.abs(step) < tolerance
+        else:
+            distance = np.abs(z_live[:, np.newaxis] - roots)
+            root_index[index_live] = np.where(distance.min(axis=1) < tolerance, distance.argmin(axis=1), -1)
+            converged = root_index[index_live] >= 0
+        converged &= ~stuck
+        iteration_counts[index_live[converged]] = i + 1
+        root_index[index_live[stuck]] = -1
+        live = ~(converged | stuck)
+        if not live.all():
+            index_live, z_live, c_live = index_live[live], z_live[live], c_live[live]
+            if not index_live.size:
+                break
+
+
+def newton_escape_time(complex_plane: np.ndarray, iterations: int, coefficients: Sequence[complex],
+                       relaxation: complex = 1., nova: bool = False, tolerance: float = 1e-6,
+                       engine: str = 'numpy') -> Tuple[np.ndarray, np.ndarray]:
+    """Iterates Newton's method z -> z - relaxation * p(z) / p'(z) on every point of a complex plane, stopping at each
+    point as soon as it has converged to a root of the polynomial p.
+
+    With nova = True, the Nova fractal z -> z - relaxation * p(z) / p'(z) + c is iterated instead, starting at
+    z = 1 (a critical point of z**3 - 1) for every c. A point has then converged when a step is smaller than tolerance.
+
+    Parameters
+    ----------
+    complex_plane : numpy.ndarray
+        The coordinates in the complex plane: the starting points, or c if nova is True.
+    iterations : int
+        Maximum number of iterations.
+    coefficients : sequence of complex
+        The coefficients of p, highest power first (like numpy.polyval). The derivative and roots are calculated
+        from them.
+    relaxation : complex, optional
+        Factor of the Newton step. Default is 1.
+    nova : bool, optional
+        Whether to iterate the Nova fractal. Default is False.
+    tolerance : float, optional
+        Distance to a root (or size of a step if nova is True) at which a point has converged. Default is 1e-6.
+    engine : str, optional
+        'numpy' for vectorized numpy operations on the points that have not converged yet, or 'numba' for a compiled
+        per-pixel loop running on all cores. Default is 'numpy'.
+
+    Returns
+    ----------
+    iteration_counts : numpy.ndarray
+        Number of iterations before the point converged, or iterations if it did not. Same shape as complex_plane.
+    root_index : numpy.ndarray
+        Index of the root in numpy.roots(coefficients) that the point converged to, or -1 if it did not converge
+        (always -1 if nova is True). int16 with the same shape as complex_plane.
+    """
+    coefficients = np.trim_zeros(np.asarray(coefficients, dtype=np.complex128), 'f')
+    if coefficients.size < 2:
+        raise ValueError(f'coefficients must be of a polynomial of at least degree 1 but got {coefficients}')
+    derivative = np.polyder(coefficients)
+    roots = np.roots(coefficients)
+    complex_plane = np.asarray(complex_plane, dtype=np.complex128)
+    iteration_counts = np.full(complex_plane.shape, iterations, dtype=int)
+    root_index = np.full(complex_plane.shape, -1, dtype=np.int16)
+
+    if engine == 'numpy':
+        _numpy_newton(complex_plane.ravel(), iterations, coefficients, derivative, roots, relaxation, nova, tolerance,
+                      iteration_counts.reshape(-1), root_index.reshape(-1))
+    elif engine == 'numba':
+        _newton_blocks(complex_plane.ravel(), iterations, coefficients, derivative, roots, complex(relaxation), nova,
+                       tolerance, iteration_counts.reshape(-1), root_index.reshape(-1))
+    else:
+        raise ValueError(f"'{engine}' is not a valid value for engine; supported values are "
+                         f"{', '.join(map(repr, ENGINES))}")
+    return iteration_counts, root_index
+
+
+def generate_newton(re_lim: Tuple[float, float], im_lim: Tuple[float, float], iterations: int,
+                    resolution: Union[int, Tuple[int, int]], coefficients: Sequence[complex], relaxation: complex = 1.,
+                    nova: bool = False, tolerance: float = 1e-6, engine: str = 'numpy') -> Tuple[np.ndarray, np.ndarray]:
+    """Generates a Newton (or Nova) fractal, see `newton_escape_time`.
+
+    Parameters
+    ----------
+    re_lim : tuple of float
+        The lower and upper limit of the real axis.
+    im_lim : tuple of float
+        The lower and upper limit of the imaginary axis.
+    iterations : int
+        Maximum number of iterations.
+    resolution : int or tuple of int
+        Number of points along each axis of the complex plane, or (width, height) for a non-square plane.
+    coefficients, relaxation, nova, tolerance, engine
+        See `newton_escape_time`.
+
+    Returns
+    ----------
+    iteration_counts : numpy.ndarray
+        Number of iterations before each point converged, or iterations if it did not.
+    root_index : numpy.ndarray
+        Index of the root that each point converged to, or -1.
+    """
+    re_axis, im_axis = complex_axes(re_lim, im_lim, resolution)
+    return newton_escape_time(re_axis + 1j * im_axis[:, np.newaxis], iterations, coefficients, relaxation, nova,
+                              tolerance, engine)
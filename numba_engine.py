@@ -0,0 +1,260 @@
+import inspect
+import numpy as np
+from numba import njit, prange
+from numba.core.registry import CPUDispatcher
+from numba.typed import List
+from typing import Callable, Dict, Sequence, Tuple
+from formulas import formula_kernels
+
+
+BLOCK_SIZE = 64
+
+
+@njit(parallel=True, nogil=True)
+def _escape_time_blocks(complex_plane: np.ndarray, iterations: int, et_function: Callable, et_f_args: tuple,
+                        iteration_counts: np.ndarray, z_values: np.ndarray):
+    size = complex_plane.size
+    # Small blocks of neighbouring points spread the slow (bounded) regions evenly over the cores
+    for block in prange((size + BLOCK_SIZE - 1) // BLOCK_SIZE):
+        for index in range(block * BLOCK_SIZE, min(block * BLOCK_SIZE + BLOCK_SIZE, size)):
+            c = complex_plane[index]
+            z = c
+            count = iterations
+            for i in range(iterations):
+                if z.real * z.real + z.imag * z.imag >= 4.:
+                    count = i
+                    break
+                z = et_function(z, c, *et_f_args)
+            iteration_counts[index] = count
+            z_values[index] = z
+
+
+@njit(parallel=True, nogil=True)
+def _escape_time_batch_blocks(complex_plane: np.ndarray, iterations: int, et_function: Callable, et_f_args_batch: List,
+                              iteration_counts: np.ndarray, z_values: np.ndarray):
+    size = complex_plane.size
+    blocks = (size + BLOCK_SIZE - 1) // BLOCK_SIZE
+    # The blocks of all frames are spread over the cores together, so that the cores are kept busy even if some frames
+    # have many more bounded points than others
+    for task in prange(len(et_f_args_batch) * blocks):
+        frame = np.int64(task // blocks)
+        block = task % blocks
+        et_f_args = et_f_args_batch[frame]
+        for index in range(block * BLOCK_SIZE, min(block * BLOCK_SIZE + BLOCK_SIZE, size)):
+            c = complex_plane[index]
+            z = c
+            count = iterations
+            for i in range(iterations):
+                if z.real * z.real + z.imag * z.imag >= 4.:
+                    count = i
+                    break
+                z = et_function(z, c, *et_f_args)
+            iteration_counts[frame, index] = count
+            z_values[frame, index] = z
+
+
+@njit(parallel=True, nogil=True)
+def _smooth_escape_time_blocks(complex_plane: np.ndarray, iterations: int, et_function: Callable, et_f_args: tuple,
+                               bailout: float, smooth_values: np.ndarray):
+    size = complex_plane.size
+    bailout_squared = bailout * bailout
+    log_bailout = np.log(bailout)
+    for block in prange((size + BLOCK_SIZE - 1) // BLOCK_SIZE):
+        for index in range(block * BLOCK_SIZE, min(block * BLOCK_SIZE + BLOCK_SIZE, size)):
+            c = complex_plane[index]
+            z = c
+            value = 1.
+            for i in range(iterations):
+                abs_squared = z.real * z.real + z.imag * z.imag
+                if abs_squared >= bailout_squared:
+                    value = min(max((i + 1 - np.log2(0.5 * np.log(abs_squared) / log_bailout)) / iterations, 0.), 1.)
+                    break
+                z = et_function(z, c, *et_f_args)
+            smooth_values[index] = value
+
+
+def positional_args(et_function: Callable, et_f_args: tuple, et_f_kwargs: dict) -> tuple:
+    """Turns the extra arguments of et_function into a tuple of positional arguments, since compiled code does not
+    support keyword arguments.
+
+    Parameters
+    ----------
+    et_function : function
+        The @njit decorated function used to calculate the z values.
+    et_f_args : tuple
+        Extra positional arguments for et_function.
+    et_f_kwargs : dict
+        Extra keyword arguments for et_function.
+
+    Returns
+    ----------
+    args : tuple
+        All extra arguments, in the order et_function expects them after (z, c).
+    """
+    if not et_f_kwargs:
+        return tuple(et_f_args)
+    signature = inspect.signature(et_function.py_func)
+    bound = signature.bind(None, None, *et_f_args, **et_f_kwargs)
+    bound.apply_defaults()
+    return bound.args[2:]
+
+
+def numba_escape_time(complex_plane: np.ndarray, iterations: int, et_function: Callable,
+                      *et_f_args, count_dtype=np.int64, **et_f_kwargs) -> Tuple[np.ndarray, np.ndarray]:
+    """Compiled, multi-core version of the escape time loop. Every pixel is iterated on its own until |z| >= 2,
+    and small blocks of pixels are distributed over all cores.
+
+    Parameters
+    ----------
+    complex_plane : numpy.ndarray
+        The coordinates in the complex plane that will be iterated. Iterated in complex64 if that is the dtype, and in
+        complex128 otherwise.
+    iterations : int
+        Maximum number of iterations.
+    et_function : function
+        An @njit decorated function calculating the next z value of a single point from (z, c, *et_f_args).
+    *et_f_args : any, optional
+        Other input arguments for et_function.
+    count_dtype : numpy.dtype, optional
+        The dtype of the iteration counts. Default is int64.
+    **et_f_kwargs : any, optional
+        Other input keyword arguments for et_function.
+
+    Returns
+    ----------
+    iteration_counts : numpy.ndarray
+        Number of iterations before |z| >= 2. Same shape as complex_plane.
+    z_values : numpy.ndarray
+        The values of the complex numbers right after |z| >= 2. Same shape as complex_plane.
+    """
+    if not isinstance(et_function, CPUDispatcher):
+        raise TypeError(f"engine 'numba' requires an @njit decorated et_function but got {et_function!r}")
+
+    complex_plane = np.asarray(complex_plane)
+    if complex_plane.dtype != np.complex64:
+        complex_plane = complex_plane.astype(np.complex128, copy=False)
+    # Both outputs are C-ordered, so that ravel gives views that the kernel writes into, whatever the layout of
+    # complex_plane (e.g. a transposed meshgrid)
+    iteration_counts = np.empty(complex_plane.shape, dtype=count_dtype)
+    z_values = np.empty(complex_plane.shape, dtype=complex_plane.dtype)
+    args = positional_args(et_function, et_f_args, et_f_kwargs)
+    kernels = formula_kernels(et_function)
+    if kernels is not None:
+        # The kernel of a registered formula has the formula compiled in and is loaded from disk
+        kernels.escape_time_blocks(complex_plane.ravel(), iterations, args, iteration_counts.ravel(), z_values.ravel())
+    else:
+        _escape_time_blocks(complex_plane.ravel(), iterations, et_function, args, iteration_counts.ravel(),
+                            z_values.ravel())
+    return iteration_counts, z_values
+
+
+def _typed_batch(et_f_args_batch: Sequence[tuple]) -> List:
+    # Compiled code needs the arguments of every frame to have the same types, so each argument is converted to the
+    # common numpy type of its values in all frames (e.g. complex if some values are real and others complex)
+    columns = []
+    for values in zip(*et_f_args_batch):
+        array = np.asarray(values)
+        columns.append(array.tolist() if array.ndim == 1 and array.dtype.kind in 'biufc' else values)
+    return List(zip(*columns))
+
+
+def numba_escape_time_batch(complex_plane: np.ndarray, iterations: int, et_function: Callable,
+                            et_f_args_batch: Sequence[tuple], et_f_kwargs_batch: Sequence[Dict] = None,
+                            count_dtype=np.int64) -> Tuple[np.ndarray, np.ndarray]:
+    """Compiled, multi-core version of the escape time loop for a batch of frames, which iterate the same complex plane
+    with different arguments of et_function (e.g. the constant of a Julia set). All frames are computed in one call,
+    with the blocks of pixels of all frames distributed over all cores.
+
+    Parameters
+    ----------
+    complex_plane : numpy.ndarray
+        The coordinates in the complex plane that will be iterated, see `numba_escape_time`.
+    iterations : int
+        Maximum number of iterations.
+    et_function : function
+        An @njit decorated function calculating the next z value of a single point from (z, c, *et_f_args).
+    et_f_args_batch : sequence of tuple
+        The other input arguments for et_function of each frame.
+    et_f_kwargs_batch : sequence of dict, optional
+        The other input keyword arguments for et_function of each frame. Default is none.
+    count_dtype : numpy.dtype, optional
+        The dtype of the iteration counts. Default is int64.
+
+    Returns
+    ----------
+    iteration_counts : numpy.ndarray
+        Number of iterations before |z| >= 2, with shape (frames,) + complex_plane.shape.
+    z_values : numpy.ndarray
+        The values of the complex numbers right after |z| >= 2, with shape (frames,) + complex_plane.shape.
+    """
+    if not isinstance(et_function, CPUDispatcher):
+        raise TypeError(f"engine 'numba' requires an @njit decorated et_function but got {et_function!r}")
+
+    complex_plane = np.asarray(complex_plane)
+    if complex_plane.dtype != np.complex64:
+        complex_plane = complex_plane.astype(np.complex128, copy=False)
+    et_f_kwargs_batch = et_f_kwargs_batch or [{}] * len(et_f_args_batch)
+    args_batch = [positional_args(et_function, et_f_args, et_f_kwargs)
+                  for et_f_args, et_f_kwargs in zip(et_f_args_batch, et_f_kwargs_batch)]
+    frames = len(args_batch)
+    if not frames or not args_batch[0]:
+        # Without arguments, every frame is the same
+        iteration_counts, z_values = numba_escape_time(complex_plane, iterations, et_function, count_dtype=count_dtype)
+        return (np.repeat(iteration_counts[np.newaxis], frames, axis=0),
+                np.repeat(z_values[np.newaxis], frames, axis=0))
+
+    iteration_counts = np.empty((frames,) + complex_plane.shape, dtype=count_dtype)
+    z_values = np.empty((frames,) + complex_plane.shape, dtype=complex_plane.dtype)
+    typed_batch = _typed_batch(args_batch)
+    kernels = formula_kernels(et_function)
+    if kernels is not None:
+        kernels.escape_time_batch_blocks(complex_plane.ravel(), iterations, typed_batch,
+                                         iteration_counts.reshape(frames, -1), z_values.reshape(frames, -1))
+    else:
+        _escape_time_batch_blocks(complex_plane.ravel(), iterations, et_function, typed_batch,
+                                  iteration_counts.reshape(frames, -1), z_values.reshape(frames, -1))
+    return iteration_counts, z_values
+
+
+def numba_smooth_escape_time(complex_plane: np.ndarray, iterations: int, et_function: Callable, *et_f_args,
+                             bailout: float = 2.**8, **et_f_kwargs) -> np.ndarray:
+    """Compiled, multi-core version of `fractal_generator.smooth_escape_time`.
+
+    Parameters
+    ----------
+    complex_plane : numpy.ndarray
+        The coordinates in the complex plane that will be iterated. Iterated in complex64 if that is the dtype, and in
+        complex128 otherwise.
+    iterations : int
+        Maximum number of iterations.
+    et_function : function
+        An @njit decorated function calculating the next z value of a single point from (z, c, *et_f_args).
+    *et_f_args : any, optional
+        Other input arguments for et_function.
+    bailout : float, optional
+        The radius that |z| must reach for a point to escape. Default is 256.
+    **et_f_kwargs : any, optional
+        Other input keyword arguments for et_function.
+
+    Returns
+    ----------
+    smooth_values : numpy.ndarray
+        The escape values normalized by iterations, as float32. Points that did not escape get the value 1.
+        Same shape as complex_plane.
+    """
+    if not isinstance(et_function, CPUDispatcher):
+        raise TypeError(f"engine 'numba' requires an @njit decorated et_function but got {et_function!r}")
+
+    complex_plane = np.asarray(complex_plane)
+    if complex_plane.dtype != np.complex64:
+        complex_plane = complex_plane.astype(np.complex128, copy=False)
+    smooth_values = np.empty(complex_plane.shape, dtype=np.float32)
+    args = positional_args(et_function, et_f_args, et_f_kwargs)
+    kernels = formula_kernels(et_function)
+    if kernels is not None:
+        kernels.smooth_escape_time_blocks(complex_plane.ravel(), iterations, args, float(bailout),
+                                          smooth_values.ravel())
+    else:
+        _smooth_escape_time_blocks(complex_plane.ravel(), iterations, et_function, args, float(bailout),
+                                   smooth_values.ravel())
+    return smooth_values
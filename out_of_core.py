@@ -0,0 +1,237 @@
+import json
+import os
+import time
+import numpy as np
+from typing import Callable, Dict, Sequence, Tuple, Union
+from cache import cache_key
+from files import atomic_write
+from fractal_generator import smooth_escape_values
+from interesting_region import find_interesting_region
+from coloring import colormap_lut, colorize
+from tiled import iter_tiles
+
+
+CHANNELS = ('abs', 'smooth')
+METADATA_FILE = 'render.json'
+PROGRESS_FILE = 'progress.json'
+
+
+def _save_progress(filename: str, progress: dict, arrays: Sequence[np.memmap]):
+    # The tiles are written to disk before they are recorded as done
+    for array in arrays:
+        array.flush()
+    # An interrupted save never destroys the previous progress
+    with atomic_write(filename, 'w') as file:
+        json.dump(progress, file)
+
+
+def render_to_disk(directory: str, re_lim: Tuple[float, float], im_lim: Tuple[float, float], iterations: int,
+                   resolution: Union[int, Tuple[int, int]], et_function: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                   *et_f_args, channel: str = None, tile_size: int = 1024, processes: int = None, engine: str = 'numpy',
+                   checkpoint_interval: float = 60., **et_f_kwargs) -> Dict[str, np.memmap]:
+    """Generates an escape time fractal tile by tile straight into memory-mapped .npy files, so that images larger than
+    the available memory can be rendered.
+
+    The finished tiles are recorded in progress.json in directory every checkpoint_interval seconds. If the render is
+    interrupted, calling this function again with the same arguments continues with the tiles that were not recorded
+    yet, and gives the same arrays as an uninterrupted render. render.json is only written once all tiles are done.
+
+    Parameters
+    ----------
+    directory : str
+        Directory where the arrays are saved. Created if it does not exist.
+    re_lim : tuple of float
+        The lower and upper limit of the real axis.
+    im_lim : tuple of float
+        The lower and upper limit of the imaginary axis.
+    iterations : int
+        Maximum number of iterations.
+    resolution : int or tuple of int
+        Number of points along each axis of the complex plane, or (width, height) for a non-square plane.
+    et_function : function
+        The function used to calculate the z values, see `tiled.iter_tiles`.
+    *et_f_args : any, optional
+        Other input arguments for et_function.
+    channel : str, optional
+        Extra float32 channel that is saved next to the iteration counts:
+        'abs' for |z| or 'smooth' for the continuous escape values (see `fractal_generator.smooth_escape_values`).
+        Default is None, i.e. only the iteration counts are saved.
+    tile_size : int, optional
+        Maximum number of rows and columns of each tile. Default is 1024.
+    processes : int, optional
+        Number of worker processes. Default is the number of cores.
+    engine : str, optional
+        The engine used for the iteration of each tile, see `fractal_generator.escape_time`. Default is 'numpy'.
+    checkpoint_interval : float, optional
+        Seconds between the records of the finished tiles. Default is 60.
+    **et_f_kwargs : any, optional
+        Other input keyword arguments for et_function.
+
+    Returns
+    ----------
+    arrays : dict of numpy.memmap
+        The read-only memory-mapped arrays, see `open_render`.
+    """
+    if channel is not None and channel not in CHANNELS:
+        raise ValueError(f"'{channel}' is not a valid value for channel; supported values are {', '.join(map(repr, CHANNELS))}")
+
+    width, height = (resolution, resolution) if np.isscalar(resolution) else resolution
+    os.makedirs(directory, exist_ok=True)
+    # The render is only continued if it is certainly the same fractal, i.e. et_function and its arguments can be
+    # identified (see `cache.cache_key`)
+    key = cache_key(re_lim, im_lim, iterations, (width, height), et_function, et_f_args, et_f_kwargs, engine)
+    parameters = dict(key=key, iterations=iterations, resolution=[width, height], channel=channel, tile_size=tile_size)
+    progress_filename = os.path.join(directory, PROGRESS_FILE)
+    done = []
+    if key is not None and os.path.exists(progress_filename):
+        with open(progress_filename) as progress_file:
+            progress = json.load(progress_file)
+        if progress['parameters'] == parameters:
+            done = progress['done']
+    if os.path.exists(os.path.join(directory, METADATA_FILE)):
+        os.remove(os.path.join(directory, METADATA_FILE))
+
+    # The smallest unsigned integer type that fits the iteration counts, e.g. uint16 instead of int64.
+    # The arrays of a continued render are opened without clearing the finished tiles
+    mode = 'r+' if done else 'w+'
+    arrays = [np.lib.format.open_memmap(os.path.join(directory, 'iteration_counts.npy'), mode=mode,
+                                        dtype=np.min_scalar_type(iterations), shape=(height, width))]
+    if channel is not None:
+        arrays.append(np.lib.format.open_memmap(os.path.join(directory, f'{channel}.npy'), mode=mode,
+                                                dtype=np.float32, shape=(height, width)))
+    iteration_counts, channel_values = arrays[0], arrays[1] if channel is not None else None
+
+    last_checkpoint = time.time()
+    for tile, tile_counts, tile_z_values in iter_tiles(re_lim, im_lim, iterations, resolution, et_function, *et_f_args,
+                                                       tile_size=tile_size, processes=processes, engine=engine,
+                                                       skip={tuple(start) for start in done}, **et_f_kwargs):
+        iteration_counts[tile] = tile_counts
+        if channel == 'abs':
+            channel_values[tile] = np.abs(tile_z_values)
+        elif channel == 'smooth':
+            channel_values[tile] = smooth_escape_values(tile_counts, tile_z_values, iterations)
+        done.append([tile[0].start, tile[1].start])
+        if key is not None and time.time() - last_checkpoint >= checkpoint_interval:
+            _save_progress(progress_filename, dict(parameters=parameters, done=done), arrays)
+            last_checkpoint = time.time()
+
+    for array in arrays:
+        array.flush()
+    del arrays, iteration_counts, channel_values
+
+    metadata = dict(re_lim=list(re_lim), im_lim=list(im_lim), iterations=iterations, resolution=[width, height],
+                    channel=channel)
+    with open(os.path.join(directory, METADATA_FILE), 'w') as metadata_file:
+        json.dump(metadata, metadata_file)
+    if os.path.exists(progress_filename):
+        os.remove(progress_filename)
+    return open_render(directory)
+
+
+def open_render(directory: str) -> Dict[str, np.memmap]:
+    """Opens the arrays saved by `render_to_disk` without loading them into memory.
+
+    Parameters
+    ----------
+    directory : str
+        Directory where the arrays are saved.
+
+    Returns
+    ----------
+    arrays : dict of numpy.memmap
+        Read-only memory-mapped arrays with shape (height, width). Always contains 'iteration_counts' and contains
+        the extra channel ('abs' or 'smooth') if it was saved.
+    """
+    with open(os.path.join(directory, METADATA_FILE)) as metadata_file:
+        channel = json.load(metadata_file)['channel']
+    names = ['iteration_counts'] + ([channel] if channel is not None else [])
+    return {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in names}
+
+
+def value_range(values: np.ndarray, block_rows: int = 1024) -> Tuple[float, float]:
+    """Calculates the minimum and maximum of an array by reading it a block of rows at a time.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        The array, typically a numpy.memmap.
+    block_rows : int, optional
+        Number of rows that are read at a time. Default is 1024.
+
+    Returns
+    ----------
+    vmin : float
+        The smallest value.
+    vmax : float
+        The largest value.
+    """
+    vmin, vmax = np.inf, -np.inf
+    for row in range(0, values.shape[0], block_rows):
+        block = values[row:row + block_rows]
+        vmin = min(vmin, block.min())
+        vmax = max(vmax, block.max())
+    return vmin, vmax
+
+
+def colorize_to_disk(values: np.ndarray, filename: str, colormap: str, vmin: float = None, vmax: float = None,
+                     block_rows: int = 1024) -> np.memmap:
+    """Colors an array a block of rows at a time and saves the image as a memory-mapped .npy file.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        The values that will be colored, typically a numpy.memmap from `open_render`.
+    filename : str
+        Name of the .npy file with the image.
+    colormap : str
+        Name of the matplotlib colormap.
+    vmin : float, optional
+        The value that is mapped to the first color. Default is the smallest value.
+    vmax : float, optional
+        The value that is mapped to the last color. Default is the largest value.
+    block_rows : int, optional
+        Number of rows that are colored at a time. Default is 1024.
+
+    Returns
+    ----------
+    image : numpy.memmap
+        The RGB image as uint8 with shape values.shape + (3,).
+    """
+    if vmin is None or vmax is None:
+        data_min, data_max = value_range(values, block_rows)
+        vmin = data_min if vmin is None else vmin
+        vmax = data_max if vmax is None else vmax
+
+    lut = colormap_lut(colormap)
+    image = np.lib.format.open_memmap(filename, mode='w+', dtype=np.uint8, shape=values.shape + (3,))
+    for row in range(0, values.shape[0], block_rows):
+        colorize(values[row:row + block_rows], lut, vmin, vmax, out=image[row:row + block_rows])
+    image.flush()
+    return image
+
+
+def find_interesting_region_on_disk(plane: np.ndarray, zoom_factor: float, iterations: int,
+                                    max_size: int = 500) -> np.ndarray:
+    """Runs `interesting_region.find_interesting_region` on an evenly strided subsample of a (memory-mapped) array,
+    so that only the sampled points are read.
+
+    Parameters
+    ----------
+    plane : numpy.ndarray
+        Values that will be examined, typically a numpy.memmap from `open_render`.
+    zoom_factor : float
+        How much smaller the region should be than plane.
+    iterations : int
+        Maximum number of iterations.
+    max_size : int, optional
+        Maximum number of sampled rows and columns. Default is 500.
+
+    Returns
+    ----------
+    segment_index : numpy.ndarray
+        The start and end index of the region in plane, in the same format as `find_interesting_region`.
+    """
+    step = max(1, -(-max(plane.shape) // max_size))
+    sample = np.ascontiguousarray(plane[::step, ::step])
+    segment_index = find_interesting_region(sample, zoom_factor, iterations) * step
+    return np.minimum(segment_index, np.array(plane.shape)[:, np.newaxis] - 1)
@@ -0,0 +1,198 @@
+import numpy as np
+from decimal import Decimal, localcontext
+from numba import njit, prange
+from typing import Callable, Tuple, Union
+
+
+Limit = Union[float, str, Decimal]
+
+
+@njit(cache=True)
+def mandelbrot(z, c):
+    return z * z + c
+
+
+@njit(cache=True)
+def julia(z, c, k):
+    return z * z + k
+
+
+FAMILIES = {mandelbrot: 'mandelbrot', julia: 'julia'}
+
+
+def as_decimal(value: Limit) -> Decimal:
+    """Converts a float (exactly), string or Decimal to a Decimal."""
+    return value if isinstance(value, Decimal) else Decimal(value)
+
+
+def precision(re_lim: Tuple[Limit, Limit], resolution: int) -> int:
+    """Number of decimal digits needed to resolve the pixels of the real axis, with a margin of 20 digits."""
+    spacing = abs(as_decimal(re_lim[1]) - as_decimal(re_lim[0])) / max(resolution - 1, 1)
+    digits = -spacing.adjusted() if spacing else 0
+    return max(digits, 0) + 20
+
+
+def reference_orbit(z0: Tuple[Decimal, Decimal], c: Tuple[Decimal, Decimal], iterations: int,
+                    digits: int) -> np.ndarray:
+    """Calculates the orbit of z -> z**2 + c in high precision.
+
+    Parameters
+    ----------
+    z0 : tuple of Decimal
+        Real and imaginary part of the starting point.
+    c : tuple of Decimal
+        Real and imaginary part of c.
+    iterations : int
+        Maximum number of iterations.
+    digits : int
+        Number of decimal digits used in the calculation.
+
+    Returns
+    ----------
+    orbit : numpy.ndarray
+        The orbit rounded to complex128, until and including the first value with |z| >= 2 (but no longer than
+        iterations + 1 values).
+    """
+    orbit = np.empty(iterations + 1, dtype=np.complex128)
+    with localcontext() as context:
+        context.prec = digits
+        z_re, z_im = z0
+        c_re, c_im = c
+        for n in range(iterations + 1):
+            orbit[n] = complex(float(z_re), float(z_im))
+            if z_re * z_re + z_im * z_im >= 4:
+                return orbit[:n + 1]
+            z_re, z_im = z_re * z_re - z_im * z_im + c_re, 2 * z_re * z_im + c_im
+    return orbit
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def _perturbation_rows(re_offsets: np.ndarray, im_offsets: np.ndarray, iterations: int, orbit: np.ndarray,
+                       start_index: int, rebase_orbit: np.ndarray, add_delta_c: bool) -> Tuple[np.ndarray, np.ndarray]:
+    rows, columns = im_offsets.size, re_offsets.size
+    iteration_counts = np.empty((rows, columns), dtype=np.int64)
+    z_values = np.empty((rows, columns), dtype=np.complex128)
+    for row in prange(rows):
+        for column in range(columns):
+            delta_c = re_offsets[column] + 1j * im_offsets[row]
+            dc_term = delta_c if add_delta_c else 0j
+            reference = orbit
+            m = start_index
+            delta = delta_c
+            count = iterations
+            for i in range(iterations):
+                z = reference[m] + delta
+                z_abs2 = z.real * z.real + z.imag * z.imag
+                if z_abs2 >= 4.:
+                    count = i
+                    break
+                # Glitch detection: once the pixel is closer to 0 than to the reference (or the reference has escaped),
+                # the delta loses its precision, so the pixel is rebased onto the orbit starting at 0
+                if z_abs2 < delta.real * delta.real + delta.imag * delta.imag or m == reference.size - 1:
+                    reference = rebase_orbit
+                    delta = z
+                    m = 0
+                delta = 2 * reference[m] * delta + delta * delta + dc_term
+                m += 1
+            else:
+                z = reference[m] + delta
+            iteration_counts[row, column] = count
+            z_values[row, column] = z
+    return iteration_counts, z_values
+
+
+def perturbation_escape_time(re_lim: Tuple[Limit, Limit], im_lim: Tuple[Limit, Limit], iterations: int,
+                             resolution: Union[int, Tuple[int, int]], et_function: Callable, *et_f_args,
+                             **et_f_kwargs) -> Tuple[np.ndarray, np.ndarray]:
+    """Generates a Mandelbrot or Julia set with perturbation theory, which makes it possible to zoom far deeper than
+    float64 allows. One high precision reference orbit is calculated at the center of the plane and every pixel is
+    iterated as a float64 delta from the reference, rebasing the delta when it is about to lose precision.
+
+    Parameters
+    ----------
+    re_lim : tuple of float, str or Decimal
+        The lower and upper limit of the real axis. Use Decimal or str to give limits with more than float64 precision.
+    im_lim : tuple of float, str or Decimal
+        The lower and upper limit of the imaginary axis.
+    iterations : int
+        Maximum number of iterations.
+    resolution : int or tuple of int
+        Number of points along each axis of the complex plane, or (width, height) for a non-square plane.
+    et_function : function
+        Either `perturbation.mandelbrot` or `perturbation.julia`.
+    *et_f_args : any, optional
+        The constant k of `perturbation.julia`.
+    **et_f_kwargs : any, optional
+        The constant k of `perturbation.julia` as keyword argument.
+
+    Returns
+    ----------
+    iteration_counts : numpy.ndarray
+        Number of iterations before |z| >= 2. Has shape (height, width).
+    z_values : numpy.ndarray
+        The values of the complex numbers right after |z| >= 2. Has shape (height, width).
+    """
+    family = FAMILIES.get(et_function)
+    if family is None:
+        raise ValueError("engine 'perturbation' only supports et_function perturbation.mandelbrot or perturbation.julia")
+
+    width, height = (resolution, resolution) if np.isscalar(resolution) else resolution
+    re_min, re_max = map(as_decimal, re_lim)
+    im_min, im_max = map(as_decimal, im_lim)
+    digits = max(precision((re_min, re_max), width), precision((im_min, im_max), height))
+    with localcontext() as context:
+        context.prec = digits
+        center = ((re_min + re_max) / 2, (im_min + im_max) / 2)
+        re_span = float(re_max - re_min)
+        im_span = float(im_max - im_min)
+    re_offsets = (np.linspace(0, 1, width) - 0.5) * re_span
+    im_offsets = (np.linspace(0, 1, height) - 0.5) * im_span
+
+    zero = (Decimal(0), Decimal(0))
+    if family == 'mandelbrot':
+        # The orbit of the reference starts at 0, so index 1 is the center itself
+        orbit = reference_orbit(zero, center, iterations + 1, digits)
+        iteration_counts, z_values = _perturbation_rows(re_offsets, im_offsets, iterations, orbit, 1, orbit, True)
+    else:
+        k = complex(et_f_args[0] if et_f_args else et_f_kwargs['k'])
+        k = (Decimal(k.real), Decimal(k.imag))
+        orbit = reference_orbit(center, k, iterations, digits)
+        critical_orbit = reference_orbit(zero, k, iterations, digits)
+        iteration_counts, z_values = _perturbation_rows(re_offsets, im_offsets, iterations, orbit, 0, critical_orbit, False)
+    return iteration_counts, z_values
+
+
+def region_limits(re_lim: Tuple[Limit, Limit], im_lim: Tuple[Limit, Limit], resolution: Union[int, Tuple[int, int]],
+                  x_range: np.ndarray, y_range: np.ndarray) -> Tuple[Tuple[Decimal, Decimal], Tuple[Decimal, Decimal]]:
+    """Calculates the limits of a region of the plane in high precision.
+
+    Parameters
+    ----------
+    re_lim : tuple of float, str or Decimal
+        The lower and upper limit of the real axis.
+    im_lim : tuple of float, str or Decimal
+        The lower and upper limit of the imaginary axis.
+    resolution : int or tuple of int
+        Number of points along each axis of the complex plane, or (width, height) for a non-square plane.
+    x_range : numpy.ndarray
+        Start and end row index of the region, as returned by `find_interesting_region`.
+    y_range : numpy.ndarray
+        Start and end column index of the region, as returned by `find_interesting_region`.
+
+    Returns
+    ----------
+    re_lim : tuple of Decimal
+        The lower and upper limit of the real axis of the region.
+    im_lim : tuple of Decimal
+        The lower and upper limit of the imaginary axis of the region.
+    """
+    width, height = (resolution, resolution) if np.isscalar(resolution) else resolution
+    re_min, re_max = map(as_decimal, re_lim)
+    im_min, im_max = map(as_decimal, im_lim)
+    with localcontext() as context:
+        context.prec = max(precision((re_min, re_max), width), precision((im_min, im_max), height))
+        re_step = (re_max - re_min) / (width - 1)
+        im_step = (im_max - im_min) / (height - 1)
+        new_re_lim = tuple(re_min + re_step * int(column) for column in y_range)
+        new_im_lim = tuple(im_min + im_step * int(row) for row in x_range)
+    return new_re_lim, new_im_lim
@@ -0,0 +1,144 @@
+import multiprocessing
+import os
+import pickle
+import queue
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator
+
+
+def _init_worker():
+    # Every process already works on its own tasks, so a parallel engine would only oversubscribe the cores
+    if 'numba' in sys.modules:
+        import numba
+        numba.set_num_threads(1)
+    else:
+        os.environ['NUMBA_NUM_THREADS'] = '1'
+
+
+def process_pool(workers: int = None) -> ProcessPoolExecutor:
+    """Creates a pool of processes whose workers each use 1 thread for the numba engine.
+
+    The workers are started with forkserver (spawn where it is not available) instead of fork: a process that forks
+    after running a parallel numba kernel hangs at exit, because the threads of numba are not copied. The functions and
+    arguments sent to the pool must therefore be importable, and scripts must guard their code with
+    `if __name__ == '__main__':`.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of worker processes. Default is the number of cores.
+
+    Returns
+    ----------
+    executor : concurrent.futures.ProcessPoolExecutor
+        The pool.
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method), initializer=_init_worker)
+
+
+def pool_executor(payload, workers: int) -> Executor:
+    """Creates a process pool (see `process_pool`) if payload can be sent to other processes, otherwise (e.g. for
+    lambdas, or functions defined in a notebook) a thread pool.
+
+    Parameters
+    ----------
+    payload : any
+        Everything that will be sent to the pool, e.g. the arguments including et_function.
+    workers : int
+        Number of workers.
+
+    Returns
+    ----------
+    executor : concurrent.futures.Executor
+        The pool.
+    """
+    try:
+        pickled = pickle.dumps(payload)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return ThreadPoolExecutor(workers)
+    if b'__main__' in pickled and not hasattr(sys.modules['__main__'], '__file__'):
+        # The workers import the main module from its file to load what it defines, which is impossible without one
+        return ThreadPoolExecutor(workers)
+    return process_pool(workers)
+
+
+def ordered_map(function: Callable, arguments: Iterable, executor: Executor, max_pending: int) -> Iterator:
+    """Like map, but computes the results ahead in executor. At most max_pending results are computed ahead, so that
+    the memory used by finished results is bounded.
+
+    Parameters
+    ----------
+    function : function
+        The function that is called with each element of arguments.
+    arguments : iterable
+        The arguments to function.
+    executor : concurrent.futures.Executor
+        The pool that the function calls are run in.
+    max_pending : int
+        Maximum number of results that are computed ahead.
+
+    Returns
+    ----------
+    results : iterator
+        The results of function, in the same order as arguments.
+    """
+    pending = deque()
+    for argument in arguments:
+        pending.append(executor.submit(function, argument))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    for future in pending:
+        yield future.result()
+
+
+class BackgroundEncoder:
+    """Runs an encoding function on a background thread, consuming the submitted frames in order.
+    Use as a context manager; leaving it waits for all frames to be encoded.
+
+    Parameters
+    ----------
+    encode : function
+        Called with the arguments of each `submit` call, in order.
+    max_queued : int, optional
+        Maximum number of frames waiting to be encoded. `submit` blocks while the queue is full. Default is 2.
+    """
+    _STOP = object()
+
+    def __init__(self, encode: Callable, max_queued: int = 2):
+        self.encode = encode
+        self._queue = queue.Queue(max_queued)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while True:
+            arguments = self._queue.get()
+            if arguments is self._STOP:
+                return
+            if self._error is None:
+                try:
+                    self.encode(*arguments)
+                except BaseException as error:
+                    # Kept so that it is raised in the thread submitting the frames; the queue is still emptied so
+                    # that submit never blocks forever
+                    self._error = error
+
+    def submit(self, *arguments):
+        """Queues a frame for encoding. Raises the error of an earlier frame if its encoding failed."""
+        if self._error is not None:
+            raise self._error
+        self._queue.put(arguments)
+
+    def __enter__(self) -> 'BackgroundEncoder':
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._queue.put(self._STOP)
+        self._thread.join()
+        if self._error is not None and exc_type is None:
+            raise self._error
@@ -1,9 +1,215 @@
-# TODO: implement time estimation function decorator
-def timer(function, total):
-    old_time = np.zeros(total)
-    for i in range(total):
-        yield i
-        new_time = time.time()
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, IO, Iterator, Optional, Sequence
+import numpy as np
+
+
+class Timer:
+    """Estimates the remaining time of a loop, e.g. over the frames of an animation, from the durations of its most
+    recent iterations, so that the estimate follows changes in speed (e.g. deeper zooms needing more iterations).
+
+    Parameters
+    ----------
+    total : int
+        Total number of iterations of the loop.
+    window : int, optional
+        Number of recent iterations that the estimate is based on. Default is 10.
+    """
+    def __init__(self, total: int, window: int = 10):
+        self.total = total
+        self.done = 0
+        self._times = deque([time.perf_counter()], maxlen=window + 1)
+
+    def tick(self) -> float:
+        """Marks the end of an iteration.
+
+        Returns
+        ----------
+        eta : float
+            Estimated remaining time in seconds.
+        """
+        self._times.append(time.perf_counter())
+        self.done += 1
+        return self.eta
+
+    @property
+    def last(self) -> float:
+        """Duration of the last iteration in seconds."""
+        return self._times[-1] - self._times[-2] if len(self._times) > 1 else 0.
+
+    @property
+    def eta(self) -> float:
+        """Estimated remaining time in seconds."""
+        if len(self._times) < 2:
+            return float('nan')
+        seconds_per_iteration = (self._times[-1] - self._times[0]) / (len(self._times) - 1)
+        return seconds_per_iteration * (self.total - self.done)
+
+
+def format_eta(eta: float) -> str:
+    """Formats an estimated remaining time, e.g. 'ETA 1:02:03'."""
+    if not np.isfinite(eta):
+        return 'ETA --:--'
+    minutes, seconds = divmod(int(round(eta)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'ETA {hours}:{minutes:02d}:{seconds:02d}' if hours else f'ETA {minutes:02d}:{seconds:02d}'
+
+
+class Instrumentation:
+    """Records where the time of a render goes: the wall time of each stage (e.g. 'compute', 'region search',
+    'colorize', 'encode'), every escape time computation with its number of live pixels per iteration and
+    pixel-iterations per second, and the duration of each frame with the estimated remaining time.
+
+    Enable it with `set_instrumentation`. When it is not enabled, the rendering code only checks that it is None.
+    Stages running on other threads (e.g. `render.auto_zoom(..., pipeline=True)`) are included, so the stage times
+    can add up to more than the wall time. Computations in other processes are not recorded.
+
+    Parameters
+    ----------
+    hooks : sequence of function, optional
+        Called with (event, data) for every recorded event, where event is 'stage', 'escape_time' or 'frame' and data
+        is a dict, see `json_log_hook`.
+    """
+    def __init__(self, hooks: Sequence[Callable[[str, dict], None]] = ()):
+        self.hooks = list(hooks)
+        self.stages = {}
+        self.escape_times = []
+        self.frames = []
+        self._lock = threading.Lock()
+
+    def _emit(self, event: str, data: dict):
+        for hook in self.hooks:
+            hook(event, data)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Context manager recording the time spent in it as stage name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - start)
+
+    def record_stage(self, name: str, seconds: float):
+        """Adds seconds to the time of stage name."""
+        with self._lock:
+            stage = self.stages.setdefault(name, dict(seconds=0., calls=0))
+            stage['seconds'] += seconds
+            stage['calls'] += 1
+        self._emit('stage', dict(name=name, seconds=seconds))
+
+    def record_escape_time(self, engine: str, iteration_counts: np.ndarray, iterations: int, seconds: float):
+        """Records an escape time computation.
+
+        Parameters
+        ----------
+        engine : str
+            The engine that was used.
+        iteration_counts : numpy.ndarray
+            The resulting number of iterations before |z| >= 2 of each point.
+        iterations : int
+            Maximum number of iterations.
+        seconds : float
+            Duration of the computation.
+        """
+        histogram = np.bincount(np.minimum(np.ravel(iteration_counts), iterations).astype(np.intp),
+                                minlength=iterations + 1)
+        # A point is iterated in iteration i if its iteration count is larger than i
+        live_pixels = np.size(iteration_counts) - np.cumsum(histogram[:iterations])
+        pixel_iterations = int(live_pixels.sum())
+        data = dict(engine=engine, pixels=int(np.size(iteration_counts)), iterations=iterations, seconds=seconds,
+                    pixel_iterations=pixel_iterations,
+                    pixel_iterations_per_second=pixel_iterations / seconds if seconds > 0 else float('nan'),
+                    live_pixels=live_pixels.tolist())
+        with self._lock:
+            self.escape_times.append(data)
+        self._emit('escape_time', data)
+
+    def record_frame(self, frame: int, frames: int, seconds: float, eta: float):
+        """Records that frame (counted from 1) of frames took seconds, and the estimated remaining time eta."""
+        data = dict(frame=frame, frames=frames, seconds=seconds, eta=eta)
+        with self._lock:
+            self.frames.append(data)
+        self._emit('frame', data)
+
+    def report(self) -> Dict[str, object]:
+        """Summarizes the recorded events.
+
+        Returns
+        ----------
+        report : dict
+            'stages' with the total seconds and number of calls of each stage, 'escape_time' with the totals of all
+            escape time computations, 'escape_times' with each computation including its live pixels per iteration,
+            and 'frames' with the duration and estimated remaining time after each frame.
+        """
+        with self._lock:
+            seconds = sum(data['seconds'] for data in self.escape_times)
+            pixel_iterations = sum(data['pixel_iterations'] for data in self.escape_times)
+            return dict(stages={name: dict(stage) for name, stage in self.stages.items()},
+                        escape_time=dict(calls=len(self.escape_times), seconds=seconds, pixel_iterations=pixel_iterations,
+                                         pixel_iterations_per_second=pixel_iterations / seconds if seconds > 0
+                                         else float('nan')),
+                        escape_times=list(self.escape_times), frames=list(self.frames))
+
+    def save(self, filename: str):
+        """Saves `report` as a JSON file."""
+        with open(filename, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+
+
+def json_log_hook(file: IO[str]) -> Callable[[str, dict], None]:
+    """Creates a hook for `Instrumentation` writing every event to file as a line of JSON, e.g.
+    {"event": "stage", "time": 1600000000.0, "name": "compute", "seconds": 0.1}.
+
+    Parameters
+    ----------
+    file : file
+        Text file opened for writing.
+
+    Returns
+    ----------
+    hook : function
+        The hook.
+    """
+    lock = threading.Lock()
+
+    def hook(event: str, data: dict):
+        line = json.dumps(dict(event=event, time=time.time(), **data))
+        with lock:
+            file.write(line + '\n')
+            file.flush()
+    return hook
+
+
+_instrumentation = None
+
+
+def set_instrumentation(instrumentation: Optional[Instrumentation]):
+    """Sets the instrumentation that the escape time functions and render functions report to.
+
+    Parameters
+    ----------
+    instrumentation : Instrumentation or None
+        The instrumentation, or None to turn instrumentation off (the default).
+    """
+    global _instrumentation
+    _instrumentation = instrumentation
+
+
+def get_instrumentation() -> Optional[Instrumentation]:
+    """Returns the instrumentation set by `set_instrumentation`."""
+    return _instrumentation
+
+
+_NO_STAGE = nullcontext()
+
+
+def stage(name: str):
+    """Context manager recording the time spent in it as stage name if instrumentation is enabled."""
+    return _NO_STAGE if _instrumentation is None else _instrumentation.stage(name)
 
 
 def print_progressbar(iteration, total, prefix ='', suffix ='', decimals = 1, length = 100, fill ='█', printEnd ="\r"):
@@ -1,80 +1,341 @@
-import matplotlib.pyplot as plt
-from matplotlib import animation
+import inspect
+import json
+import os
+import warnings
 import numpy as np
-from fractal_generator import *
-from progress import *
-from interesting_region import find_interesting_region
-from typing import Iterable
+from cache import cache_key
+from fractal_generator import (generate_escape_time, generate_escape_time_batch, generate_smooth_escape_time,
+                               smooth_escape_values)
+from progress import Timer, format_eta, get_instrumentation, print_progressbar, stage
+from files import atomic_write
+from frame_reuse import Frame, generate_reused_escape_time
+from pipeline import BackgroundEncoder, ordered_map, pool_executor
+from video import RawVideoWriter, concat_videos
+from contextlib import ExitStack, suppress
+from functools import partial
+from typing import Callable, Iterable, Iterator, List, Tuple
 
+# matplotlib and the modules that need numba are imported when they are first used, so that importing this module
+# for writer 'raw' does not pay for them, see the import budgets in benchmark.py
 
-def animate(filename: str, frames: int, colormap: str, iter_args: dict = {}, const_args: dict = {}, factory_args: dict = {},
-            graph_type: str = 'i', dpi: int = 300, anim_kwargs: dict = {'fps': 24}):
 
-    for key, val in iter_args.items():
-        if not isinstance(val, Iterable):
-            raise TypeError(f'{key} must be iterable but got type {type(val)}.')
+def _plane(iter_count: np.ndarray, z_values: np.ndarray, graph_type: str, iterations: int) -> np.ndarray:
+    if graph_type == 'i':
+        return iter_count
+    elif graph_type == 'z':
+        return np.abs(z_values)
+    elif graph_type == 's':
+        return smooth_escape_values(iter_count, z_values, iterations)
+    raise ValueError(f"'{graph_type}' is not a valid value for graph_type; supported values are 'i', 'z', 's'")
+
+
+FRACTALS = ('escape_time', 'newton', 'lyapunov')
+
+
+def _extent(total_args: dict, fractal: str) -> tuple:
+    if fractal == 'lyapunov':
+        return tuple(total_args['a_lim']) + tuple(total_args['b_lim'])
+    return tuple(total_args['re_lim']) + tuple(total_args['im_lim'])
+
+
+def _animation_frame(total_args: dict, graph_type: str, fractal: str = 'escape_time') -> np.ndarray:
+    if fractal == 'lyapunov':
+        from lyapunov import generate_lyapunov
+        if graph_type != 'l':
+            raise ValueError(f"'{graph_type}' is not a valid value for graph_type with fractal 'lyapunov'; "
+                             f"supported values are 'l'")
+        return generate_lyapunov(**total_args)
+    elif fractal == 'newton':
+        from newton import generate_newton
+        iteration_counts, root_index = generate_newton(**total_args)
+        if graph_type == 'i':
+            return iteration_counts
+        elif graph_type == 'r':
+            return root_index
+        raise ValueError(f"'{graph_type}' is not a valid value for graph_type with fractal 'newton'; "
+                         f"supported values are 'i', 'r'")
+    elif fractal != 'escape_time':
+        raise ValueError(f"'{fractal}' is not a valid value for fractal; supported values are "
+                         f"{', '.join(map(repr, FRACTALS))}")
+
+    if graph_type == 's':
+        return generate_smooth_escape_time(**total_args)
+    return _plane(*generate_escape_time(**total_args), graph_type, total_args['iterations'])
+
+
+# The named parameters of generate_escape_time; all other arguments of a frame are arguments of et_function
+_ESCAPE_TIME_PARAMETERS = tuple(name for name, parameter in inspect.signature(generate_escape_time).parameters.items()
+                                if parameter.kind not in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD))
 
+
+def _batched_planes(all_args: List[dict], graph_type: str, batch_size: int) -> Iterator[np.ndarray]:
+    # Computes the frames in batches that share the complex plane, see `generate_escape_time_batch`
+    for start in range(0, len(all_args), batch_size):
+        batch = all_args[start:start + batch_size]
+        shared_args = {key: value for key, value in batch[0].items() if key in _ESCAPE_TIME_PARAMETERS}
+        et_f_kwargs_batch = [{key: value for key, value in total_args.items() if key not in _ESCAPE_TIME_PARAMETERS}
+                             for total_args in batch]
+        iteration_counts, z_values = generate_escape_time_batch(**shared_args, et_f_kwargs_batch=et_f_kwargs_batch)
+        for frame in range(len(batch)):
+            yield _plane(iteration_counts[frame], z_values[frame], graph_type, shared_args['iterations'])
+
+
+def _frame_encoder(stack: ExitStack, writer: str, filename: str, colormap: str, dpi: int,
+                   anim_kwargs: dict) -> Callable[[np.ndarray, tuple], None]:
+    # Opens the video in stack and returns a function adding a frame (plane, extent) to it
+    if writer == 'raw':
+        video = stack.enter_context(RawVideoWriter(filename, colormap, **anim_kwargs))
+        return lambda plane, extent: video.write(plane)
+    elif writer != 'matplotlib':
+        raise ValueError(f"'{writer}' is not a valid value for writer; supported values are 'matplotlib', 'raw'")
+
+    import matplotlib.pyplot as plt
+    from matplotlib import animation
     plt.ioff()
     fig, ax = plt.subplots()
+    stack.callback(plt.close, fig)
     image = ax.imshow(np.zeros((2, 2)), cmap=colormap, origin='lower')
     animation_writer = animation.FFMpegWriter(**anim_kwargs, extra_args=['-vcodec', 'libx264'])
+    stack.enter_context(animation_writer.saving(fig, filename, dpi=dpi))
 
-    with animation_writer.saving(fig, filename, dpi=dpi):
-        for i, parameter_values in enumerate(zip(*iter_args.values())):
-            one_time_args = dict(zip(iter_args.keys(), parameter_values))
-            total_args = {**one_time_args, **const_args}
+    def show(plane: np.ndarray, extent: tuple):
+        with stage('colorize'):
+            image.set_data(plane)
+            image.set_extent(extent)
+            image.autoscale()
+        with stage('encode'):
+            animation_writer.grab_frame()
+    return show
 
-            iter_count, z_values = generate_escape_time(**total_args)
-            if graph_type == 'i':
-                image.set_data(iter_count)
-            elif graph_type == 'z':
-                image.set_data(np.abs(z_values))
-            else:
-                raise ValueError(f"'{graph_type}' is not a valid value for graph_type; supported values are 'i', 'z'")
 
-            image.set_extent(total_args['re_lim'] + total_args['im_lim'])
-            image.autoscale()
+def _finish_frame(timer: Timer, frames: int):
+    # Shows the progress with the estimated remaining time and reports the frame to the instrumentation
+    eta = timer.tick()
+    instrumentation = get_instrumentation()
+    if instrumentation is not None:
+        instrumentation.record_frame(timer.done, frames, timer.last, eta)
+    print_progressbar(timer.done, frames, 'rendering:', format_eta(eta))
 
-            animation_writer.grab_frame()
-            print_progressbar(i + 1, frames, 'rendering:')
+
+def animate(filename: str, frames: int, colormap: str, iter_args: dict = {}, const_args: dict = {}, factory_args: dict = {},
+            graph_type: str = 'i', dpi: int = 300, anim_kwargs: dict = {'fps': 24}, workers: int = 1,
+            max_queued: int = None, writer: str = 'matplotlib', fractal: str = 'escape_time', batch_size: int = 1):
+    """Renders an animation where some arguments of `generate_escape_time` change from frame to frame.
+
+    graph_type selects what is shown: 'i' for the iteration counts, 'z' for |z| right after escaping, and 's' for
+    continuous escape values without bands, see `fractal_generator.generate_smooth_escape_time`.
+
+    With fractal = 'newton', the arguments are those of `newton.generate_newton` instead (e.g. iter_args =
+    {'coefficients': [...]} to animate the polynomial), and graph_type is 'i' for the number of iterations before
+    converging or 'r' for the index of the root. With fractal = 'lyapunov', the arguments are those of
+    `lyapunov.generate_lyapunov` (e.g. iter_args = {'sequence': [...]} or zooming a_lim and b_lim), and graph_type
+    must be 'l' for the Lyapunov exponent.
+
+    With writer = 'matplotlib', each frame is drawn in a matplotlib figure with axes and saved with dpi. With
+    writer = 'raw', the values are colored with a lookup table and streamed straight to ffmpeg, so that the video has
+    one pixel per point at the resolution of the fractal (see `video.RawVideoWriter`). This is much faster.
+
+    If workers > 1, the frames are computed ahead in a pool of processes (threads if et_function cannot be pickled,
+    e.g. a lambda) while they are encoded in order. At most max_queued frames (default 2 * workers) are computed ahead.
+    The video is the same as with workers = 1.
+
+    If batch_size > 1 and only the arguments of et_function change (e.g. the constant of a Julia set), up to batch_size
+    frames are computed at once on the same complex plane with `fractal_generator.generate_escape_time_batch`, unless
+    workers > 1 or graph_type is 's'. The video is the same. A batch keeps all its frames in memory and is not faster
+    with the numpy engines; with engine 'numba', the frames of a batch are spread over all cores together, which only
+    helps when a single frame is too small to keep all cores busy. Default is 1 (no batches).
+
+    The time of each stage and frame is reported to the instrumentation set with `progress.set_instrumentation`.
+    With workers > 1, the stage 'compute' is the time spent waiting for computed frames.
+    """
+    for key, val in iter_args.items():
+        if not isinstance(val, Iterable):
+            raise TypeError(f'{key} must be iterable but got type {type(val)}.')
+
+    all_args = [{**dict(zip(iter_args.keys(), parameter_values)), **const_args}
+                for parameter_values in zip(*iter_args.values())]
+    compute_frame = partial(_animation_frame, graph_type=graph_type, fractal=fractal)
+    with ExitStack() as stack:
+        encode = _frame_encoder(stack, writer, filename, colormap, dpi, anim_kwargs)
+        if workers > 1:
+            executor = stack.enter_context(pool_executor((iter_args, const_args), workers))
+            planes = ordered_map(compute_frame, all_args, executor, max_queued or 2 * workers)
+        elif (batch_size > 1 and fractal == 'escape_time' and graph_type != 's' and all_args and
+              all_args[0].get('engine') != 'perturbation' and
+              not any(key in _ESCAPE_TIME_PARAMETERS for key in iter_args)):
+            planes = _batched_planes(all_args, graph_type, batch_size)
+        else:
+            planes = map(compute_frame, all_args)
+
+        timer = Timer(frames)
+        for total_args in all_args:
+            with stage('compute'):
+                plane = next(planes)
+            encode(plane, _extent(total_args, fractal))
+            _finish_frame(timer, frames)
+
+
+ZOOM_STATE_FILE = 'state.npz'
+
+
+def _save_checkpoint(filename: str, **state):
+    # An interrupted save never destroys the previous checkpoint
+    with atomic_write(filename) as file:
+        np.savez(file, **state)
 
 
 def auto_zoom(re_lim: Tuple[float, float], im_lim: Tuple[float, float], iterations: int, resolution: int,
               et_function: Callable[[np.ndarray, np.ndarray], np.ndarray], filename: str, frames: int, zoom_factor, colormap: str,
-              graph_type: str = 'i', dpi: int = 300, anim_kwargs: dict = {'fps': 24}):
-    plt.ioff()
-    fig, ax = plt.subplots()
-    image = ax.imshow(np.zeros((2, 2)), cmap=colormap, origin='lower')
-    animation_writer = animation.FFMpegWriter(**anim_kwargs, extra_args=['-vcodec', 'libx264'])
+              graph_type: str = 'i', dpi: int = 300, anim_kwargs: dict = {'fps': 24}, engine: str = 'numpy',
+              reuse: bool = False, pipeline: bool = False, max_queued: int = 2, writer: str = 'matplotlib',
+              checkpoint: str = None, checkpoint_frames: int = 100):
+    """Renders an animation that zooms into the most interesting region of each frame.
+    See `animate` for graph_type and writer.
 
-    with animation_writer.saving(fig, filename, dpi=dpi):
-        for i in range(frames):
-            iter_count, z_values = generate_escape_time(re_lim, im_lim, iterations, resolution, et_function)
-            if graph_type == 'i':
-                plane = iter_count
-            elif graph_type == 'z':
-                plane = np.abs(z_values)
-            else:
-                raise ValueError(f"'{graph_type}' is not a valid value for graph_type; supported values are 'i', 'z'")
+    If reuse is True, points in smooth areas of the previous frame are copied instead of computed again (see
+    `frame_reuse.generate_reused_escape_time`). Not supported with engine 'perturbation' or graph_type 's'.
 
-            image.set_data(plane)
-            image.set_extent(re_lim + im_lim)
-            image.autoscale()
+    If pipeline is True, each frame is encoded on a background thread while the next region is searched and computed.
+    At most max_queued frames wait to be encoded. The video is the same as without pipelining.
 
-            animation_writer.grab_frame()
+    If checkpoint is a directory, the video is encoded in segments of checkpoint_frames frames in that directory.
+    After each segment, the limits of the next frame (and the previous frame if reuse is True) are saved, so that
+    calling this function again with the same arguments continues after the last finished segment. At the end, the
+    segments are joined into filename without encoding them again and removed. The video is the same whether or not
+    the render was interrupted, for the same checkpoint_frames (but may differ from a video encoded without segments).
+    If et_function cannot be identified across processes (see `cache.cache_key`), e.g. a lambda, nothing is saved
+    and every call starts from the first frame, with a warning.
+
+    The time of each stage and frame is reported to the instrumentation set with `progress.set_instrumentation`.
+    """
+    from interesting_region import find_interesting_region
+    from perturbation import as_decimal, region_limits
+    if reuse and engine == 'perturbation':
+        raise ValueError("reuse is not supported with engine 'perturbation'")
+    if reuse and graph_type == 's':
+        # Reused frames only keep z right after |z| >= 2, which gives other smooth values than the larger bailout of
+        # generate_smooth_escape_time, so the colors would depend on reuse
+        raise ValueError("reuse is not supported with graph_type 's'")
+    if engine == 'perturbation':
+        # The limits are kept as Decimal so that the zoom is not limited by float64
+        re_lim, im_lim = tuple(map(as_decimal, re_lim)), tuple(map(as_decimal, im_lim))
+
+    frame = None
+    start = 0
+    segment_frames = frames
+    segments = [filename]
+    if checkpoint is not None:
+        os.makedirs(checkpoint, exist_ok=True)
+        segment_frames = checkpoint_frames
+        extension = os.path.splitext(filename)[1]
+        segments = [os.path.join(checkpoint, f'segment_{segment:05d}{extension}')
+                    for segment in range(-(-frames // segment_frames))]
+        state_filename = os.path.join(checkpoint, ZOOM_STATE_FILE)
+        # The zoom is only continued if it is certainly the same fractal, i.e. et_function can be identified (see
+        # `cache.cache_key`)
+        key = cache_key(re_lim, im_lim, iterations, resolution, et_function, engine=engine)
+        resumable = key is not None
+        if not resumable:
+            warnings.warn(f'et_function {et_function!r} cannot be identified across processes (see cache.cache_key), '
+                          f'so the zoom cannot be continued from checkpoint {checkpoint}', RuntimeWarning, stacklevel=2)
+        # Everything that changes the video, with the limits as str so that Decimal limits are saved exactly
+        parameters = json.dumps(dict(re_lim=list(map(str, re_lim)), im_lim=list(map(str, im_lim)),
+                                     iterations=iterations, resolution=resolution, frames=frames,
+                                     zoom_factor=zoom_factor, colormap=colormap, graph_type=graph_type, dpi=dpi,
+                                     anim_kwargs=anim_kwargs, engine=engine, reuse=reuse, writer=writer,
+                                     checkpoint_frames=checkpoint_frames, fractal=key),
+                                sort_keys=True, default=str)
+        if resumable and os.path.exists(state_filename):
+            with np.load(state_filename) as state:
+                if str(state['parameters']) != parameters:
+                    raise ValueError(f'the checkpoint {checkpoint} was made with other parameters: '
+                                     f'{state["parameters"]}')
+                start = int(state['done'])
+                limit_type = as_decimal if engine == 'perturbation' else np.float64
+                re_lim = tuple(limit_type(str(value)) for value in state['re_lim'])
+                im_lim = tuple(limit_type(str(value)) for value in state['im_lim'])
+                if 'iteration_counts' in state:
+                    frame = Frame(state['re_axis'], state['im_axis'], state['iteration_counts'], state['z_values'],
+                                  float(state['reused']))
+
+    timer = Timer(frames)
+    timer.done = start
+    for segment_start in range(start, frames, segment_frames):
+        with ExitStack() as stack:
+            encode = _frame_encoder(stack, writer, segments[segment_start // segment_frames], colormap, dpi,
+                                    anim_kwargs)
+            if pipeline:
+                encode = stack.enter_context(BackgroundEncoder(encode, max_queued)).submit
+            for i in range(segment_start, min(segment_start + segment_frames, frames)):
+                with stage('compute'):
+                    if reuse:
+                        # Points in smooth areas of the previous frame are copied instead of computed again
+                        frame = generate_reused_escape_time(frame, re_lim, im_lim, iterations, resolution,
+                                                            et_function, engine=engine)
+                        plane = _plane(frame.iteration_counts, frame.z_values, graph_type, iterations)
+                        iter_count = frame.iteration_counts
+                    elif graph_type == 's':
+                        plane = generate_smooth_escape_time(re_lim, im_lim, iterations, resolution, et_function,
+                                                            engine=engine)
+                        # The region search only needs approximate iteration counts
+                        iter_count = (plane * iterations).astype(int)
+                    else:
+                        iter_count, z_values = generate_escape_time(re_lim, im_lim, iterations, resolution,
+                                                                    et_function, engine=engine)
+                        plane = _plane(iter_count, z_values, graph_type, iterations)
+
+                if engine == 'perturbation':
+                    # Deep zoom limits cannot be told apart as floats, so the extent is relative to the lower limits
+                    encode(plane, (0., float(re_lim[1] - re_lim[0]), 0., float(im_lim[1] - im_lim[0])))
+                else:
+                    encode(plane, re_lim + im_lim)
 
-            if i < frames-1:
-                complex_plane = np.linspace(*re_lim, resolution) + 1j * np.linspace(*im_lim, resolution)[:, np.newaxis]
-                x_range, y_range = find_interesting_region(iter_count, zoom_factor, iterations)
-                re_lim = (complex_plane[x_range[0], y_range[0]].real, complex_plane[x_range[1], y_range[1]].real)
-                im_lim = (complex_plane[x_range[0], y_range[0]].imag, complex_plane[x_range[1], y_range[1]].imag)
+                with stage('region search'):
+                    if i < frames-1 and engine == 'perturbation':
+                        x_range, y_range = find_interesting_region(iter_count, zoom_factor, iterations)
+                        re_lim, im_lim = region_limits(re_lim, im_lim, resolution, x_range, y_range)
+                    elif i < frames-1:
+                        complex_plane = (np.linspace(*re_lim, resolution) +
+                                         1j * np.linspace(*im_lim, resolution)[:, np.newaxis])
+                        x_range, y_range = find_interesting_region(iter_count, zoom_factor, iterations)
+                        re_lim = (complex_plane[x_range[0], y_range[0]].real, complex_plane[x_range[1], y_range[1]].real)
+                        im_lim = (complex_plane[x_range[0], y_range[0]].imag, complex_plane[x_range[1], y_range[1]].imag)
 
-            print_progressbar(i + 1, frames, 'rendering:')
+                _finish_frame(timer, frames)
+
+        if checkpoint is not None and resumable:
+            # Saved once the segment is completely encoded
+            frame_state = {} if frame is None else dict(re_axis=frame.re_axis, im_axis=frame.im_axis,
+                                                        iteration_counts=frame.iteration_counts,
+                                                        z_values=frame.z_values, reused=frame.reused)
+            _save_checkpoint(state_filename, parameters=parameters, done=i + 1, re_lim=list(map(str, re_lim)),
+                             im_lim=list(map(str, im_lim)), **frame_state)
+
+    if checkpoint is not None:
+        if writer == 'raw':
+            ffmpeg_path = anim_kwargs.get('ffmpeg_path', 'ffmpeg')
+        else:
+            import matplotlib
+            ffmpeg_path = matplotlib.rcParams['animation.ffmpeg_path']
+        concat_videos(segments, filename, ffmpeg_path)
+        for name in segments + ([state_filename] if resumable else []):
+            os.remove(name)
+        with suppress(OSError):
+            # Only removed if nothing else is in it
+            os.rmdir(checkpoint)
 
 
 def snapshot(re_lim: Tuple[float, float], im_lim: Tuple[float, float], iterations: int, resolution: int,
              et_function: Callable[[np.ndarray, np.ndarray], np.ndarray], filename: str, colormap: str,
              graph_type: str = 'i', dpi: int = 300, *et_f_args, **et_f_kwargs):
+    import matplotlib.pyplot as plt
+    if graph_type == 's':
+        smooth_values = generate_smooth_escape_time(re_lim, im_lim, iterations, resolution, et_function, *et_f_args,
+                                                    **et_f_kwargs)
+        plt.imshow(smooth_values, cmap=colormap, extent=re_lim + im_lim, origin='lower')
+        plt.savefig(filename, dpi=dpi)
+        return
+
     iter_count, z_values = generate_escape_time(re_lim, im_lim, iterations, resolution, et_function, *et_f_args, **et_f_kwargs)
 
     if graph_type == 'i':
@@ -83,3 +344,27 @@ def snapshot(re_lim: Tuple[float, float], im_lim: Tuple[float, float], iteration
         plt.imshow(z_values, cmap=colormap, extent=re_lim + im_lim, origin='lower')
 
     plt.savefig(filename, dpi=dpi)
+
+
+def snapshot_fractal(filename: str, colormap: str, args: dict, fractal: str = 'escape_time', graph_type: str = 'i',
+                     dpi: int = 300):
+    """Saves an image of any of the fractals that `animate` supports.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the image file.
+    colormap : str
+        Name of the matplotlib colormap.
+    args : dict
+        The keyword arguments of `generate_escape_time`, `newton.generate_newton` or `lyapunov.generate_lyapunov`.
+    fractal : str, optional
+        'escape_time', 'newton' or 'lyapunov'. Default is 'escape_time'.
+    graph_type : str, optional
+        What is shown, see `animate`. Default is 'i'.
+    dpi : int, optional
+        Resolution of the image. Default is 300.
+    """
+    import matplotlib.pyplot as plt
+    plt.imshow(_animation_frame(args, graph_type, fractal), cmap=colormap, extent=_extent(args, fractal), origin='lower')
+    plt.savefig(filename, dpi=dpi)
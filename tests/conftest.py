@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import pytest
+
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The modules of the repository are imported by their names, like in the scripts
+if REPOSITORY not in sys.path:
+    sys.path.insert(0, REPOSITORY)
+
+# Stands in for ffmpeg: saves the raw frames from stdin as the video, and joins videos by concatenating their bytes
+FAKE_FFMPEG = '''\
+import sys
+if 'concat' in sys.argv:
+    with open(sys.argv[sys.argv.index('-i') + 1]) as list_file:
+        names = [line[len("file '"):-len("'")] for line in list_file.read().splitlines()]
+    data = b''
+    for name in names:
+        with open(name, 'rb') as video:
+            data += video.read()
+else:
+    data = sys.stdin.buffer.read()
+with open(sys.argv[-1], 'wb') as video:
+    video.write(data)
+'''
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path) -> str:
+    """An executable that behaves like ffmpeg for the raw writer and `video.concat_videos`, without encoding."""
+    ffmpeg = tmp_path / 'ffmpeg'
+    ffmpeg.write_text(f'#!{sys.executable}\n{FAKE_FFMPEG}')
+    ffmpeg.chmod(0o755)
+    return str(ffmpeg)
+
+
+@pytest.fixture
+def run_script(tmp_path):
+    """Runs Python source as a script in tmp_path, with this repository on the path."""
+    def run(source: str, timeout: float = 300.) -> subprocess.CompletedProcess:
+        script = tmp_path / 'script.py'
+        script.write_text(source)
+        environment = dict(os.environ,
+                           PYTHONPATH=os.pathsep.join(filter(None, [REPOSITORY, os.environ.get('PYTHONPATH')])))
+        return subprocess.run([sys.executable, str(script)], cwd=tmp_path, env=environment, capture_output=True,
+                              text=True, timeout=timeout)
+    return run
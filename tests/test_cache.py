@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+import cache
+from cache import EscapeTimeCache, cache_key, set_default_cache
+from fractal_generator import generate_escape_time
+
+
+POWER = 2
+ARGS = ((-2., 1.), (-1.5, 1.5), 40, 32)
+
+
+def power_mandelbrot(z, c):
+    return z ** POWER + c
+
+
+def recursive_mandelbrot(z, c, depth=0):
+    return z * z + c if depth else recursive_mandelbrot(z, c, depth + 1)
+
+
+class Unstable:
+    pass
+
+
+UNSTABLE = Unstable()
+
+
+def uses_unstable_global(z, c):
+    return z * z + c if UNSTABLE else c
+
+
+@pytest.fixture
+def default_cache(tmp_path):
+    set_default_cache(EscapeTimeCache(str(tmp_path)))
+    yield
+    set_default_cache(None)
+
+
+def test_cache_key_depends_on_globals(monkeypatch):
+    key = cache_key(*ARGS, power_mandelbrot)
+    assert cache_key(*ARGS, power_mandelbrot) == key
+    monkeypatch.setitem(globals(), 'POWER', 3)
+    assert cache_key(*ARGS, power_mandelbrot) != key
+
+
+def test_changed_global_is_not_loaded_from_cache(default_cache, monkeypatch):
+    iteration_counts, _ = generate_escape_time(*ARGS, power_mandelbrot)
+    monkeypatch.setitem(globals(), 'POWER', 3)
+    cached_counts, _ = generate_escape_time(*ARGS, power_mandelbrot)
+    set_default_cache(None)
+    expected_counts, _ = generate_escape_time(*ARGS, power_mandelbrot)
+    np.testing.assert_array_equal(cached_counts, expected_counts)
+    assert not np.array_equal(cached_counts, iteration_counts)
+
+
+def test_cache_key_of_recursive_function():
+    assert cache_key(*ARGS, recursive_mandelbrot) == cache_key(*ARGS, recursive_mandelbrot) is not None
+
+
+def test_functions_with_unstable_globals_are_not_cached():
+    assert cache_key(*ARGS, uses_unstable_global) is None
+    with pytest.raises(TypeError):
+        cache._stable_bytes(uses_unstable_global)
+
+
+def test_cache_key_depends_on_engine_and_precision():
+    keys = {cache_key(*ARGS, power_mandelbrot, engine=engine) for engine in ('numpy', 'compact', 'numba')}
+    keys.add(cache_key(*ARGS, power_mandelbrot, precision='single'))
+    assert len(keys) == 4
+
+
+def test_engines_are_cached_separately(default_cache, tmp_path):
+    generate_escape_time(*ARGS, power_mandelbrot)
+    generate_escape_time(*ARGS, power_mandelbrot, engine='compact')
+    assert len(list(tmp_path.glob('*.npz'))) == 2
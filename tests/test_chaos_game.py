@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from chaos_game import chaos_game, polygon
+
+
+@pytest.mark.parametrize('chains, batch_size', [(1, 2**26), (3, 2**26), (4, 10007), (5, 3)])
+def test_histogram_counts_every_point(chains, batch_size):
+    # The attractor of the polygon maps lies inside the unit circle, so every point falls in the image
+    matrices, translations, allowed = polygon(3)
+    histogram = chaos_game(matrices, translations, (-1.1, 1.1), (-1.1, 1.1), (40, 30), 100003, allowed=allowed,
+                           chains=chains, batch_size=batch_size, seed=0)
+    assert histogram.dtype == np.uint64 and histogram.shape == (30, 40)
+    assert histogram.sum() == 100003
+
+
+def test_points_outside_the_image_are_not_counted():
+    matrices, translations, _ = polygon(4, forbidden=(0,))
+    full = chaos_game(matrices, translations, (-1.1, 1.1), (-1.1, 1.1), 40, 50000, chains=2, seed=1)
+    # The right half of the image is the same view of the right half of the attractor
+    half = chaos_game(matrices, translations, (0., 1.1), (-1.1, 1.1), (20, 40), 50000, chains=2, seed=1)
+    assert 0 < half.sum() < 50000
+    np.testing.assert_array_equal(half, full[:, 20:])
+
+
+def test_sierpinski_triangle_has_an_empty_center():
+    matrices, translations, _ = polygon(3)
+    histogram = chaos_game(matrices, translations, (-1., 1.), (-1., 1.), 64, 200000, chains=2, seed=2)
+    # The triangle of the midpoints of the sides, around the origin, is never visited
+    assert histogram[30:34, 30:34].sum() == 0
+    assert histogram.sum() == 200000
+
+
+def test_same_seed_gives_same_histogram():
+    matrices, translations, _ = polygon(5, scale=0.6)
+    args = (matrices, translations, (-1., 1.), (-1., 1.), 32, 20000)
+    np.testing.assert_array_equal(chaos_game(*args, chains=3, seed=3), chaos_game(*args, chains=3, seed=3))
+
+
+def test_invalid_maps():
+    matrices, translations, _ = polygon(3)
+    with pytest.raises(ValueError):
+        chaos_game(matrices, translations[:2], (-1., 1.), (-1., 1.), 8, 100)
+    with pytest.raises(ValueError):
+        chaos_game(matrices, translations, (-1., 1.), (-1., 1.), 8, 100, allowed=np.zeros((3, 3), dtype=bool))
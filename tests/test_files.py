@@ -0,0 +1,25 @@
+import json
+import numpy as np
+import pytest
+from files import atomic_write
+
+
+def test_atomic_write_replaces_file(tmp_path):
+    filename = tmp_path / 'state.npz'
+    filename.write_bytes(b'old')
+    with atomic_write(str(filename)) as file:
+        np.savez(file, values=np.arange(3))
+    with np.load(filename) as state:
+        np.testing.assert_array_equal(state['values'], [0, 1, 2])
+    assert [path.name for path in tmp_path.iterdir()] == ['state.npz']
+
+
+def test_interrupted_atomic_write_keeps_previous_file(tmp_path):
+    filename = tmp_path / 'progress.json'
+    filename.write_text('{"done": [1]}')
+    with pytest.raises(KeyboardInterrupt):
+        with atomic_write(str(filename), 'w') as file:
+            file.write('{"done": [1, 2')
+            raise KeyboardInterrupt
+    assert json.loads(filename.read_text()) == {'done': [1]}
+    assert [path.name for path in tmp_path.iterdir()] == ['progress.json']
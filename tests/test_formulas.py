@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+import formulas
+from formulas import Formula, formula, register
+from fractal_generator import generate_escape_time
+
+
+@pytest.fixture(autouse=True)
+def formula_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv(formulas.FORMULA_DIR_VARIABLE, str(tmp_path))
+    registry = formulas.registered_formulas()
+    yield tmp_path
+    formulas._registry.clear()
+    formulas._registry.update(registry)
+
+
+@pytest.mark.parametrize('parameters', [
+    ('k=__import__("os").system("touch injected")',),
+    ('k=(lambda: 0)()',),
+    ('k=2\nimport os',),
+    ('k="text"',),
+    ('k=True',),
+    ('k; import os',),
+    ('z',),
+    ('k', 'k'),
+])
+def test_invalid_parameters_are_rejected(parameters, formula_directory):
+    with pytest.raises(ValueError):
+        register('unsafe', 'z * z + c', parameters)
+    with pytest.raises(ValueError):
+        Formula('unsafe', 'z * z + c', parameters)
+    assert not list(formula_directory.iterdir())
+
+
+@pytest.mark.parametrize('expression', [
+    'z.__class__',
+    'z.conjugate() + c',
+    '(z * z + c).__class__.__mro__',
+    'np.exp(z) + c',
+    'open("file") and c',
+    '"text" and c',
+    '(z * z + c if """\nimport os\n""" else c)',
+    'sqrt(z, out=z) + c',
+    '[z for z in (c,)][0]',
+    '(lambda z: z)(c)',
+    'z[0] + c',
+])
+def test_invalid_expressions_are_rejected(expression, formula_directory):
+    with pytest.raises(ValueError):
+        register('unsafe', expression)
+    assert not list(formula_directory.iterdir())
+
+
+def test_valid_formulas_are_accepted():
+    register('cubic', 'z ** 3 + k * c', ('k=1.5',))
+    register('conditional', '(z * z + c if z.real > 0 else conj(z) ** 2 + c)')
+    register('multiline', '(abs(z.real)\n + 1j * abs(z.imag)) ** 2 + c')
+    assert set(formulas.BUILTIN_FORMULAS) <= set(formulas.registered_formulas())
+
+
+def test_numpy_and_numba_versions_agree():
+    current = register('cubic', 'z ** 3 + k * c', ('k=1.5',))
+    args = ((-1.5, 1.5), (-1.5, 1.5), 50, 40)
+    expected = generate_escape_time(*args, current.numpy)
+    result = generate_escape_time(*args, current.numba, engine='numba')
+    np.testing.assert_array_equal(result[0], expected[0])
+    np.testing.assert_allclose(result[1], expected[1])
+    assert '\n# Generated by formulas.py from the formula cubic: z ** 3 + k * c\n' in '\n' + current.source
+    assert formula('cubic') is current
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from numba import njit
+from fractal import EscapeTimeFractal
+
+
+def julia(z, c, k):
+    return z * z + k
+
+
+@njit
+def julia_numba(z, c, k):
+    return z * z + k
+
+
+K = -0.8 + 0.156j
+
+
+def generated(iterations: int, et_function=julia, engine: str = 'numpy') -> EscapeTimeFractal:
+    fractal = EscapeTimeFractal((-1.6, 1.6), (-1., 1.), 64, iterations, et_function, engine=engine)
+    fractal.generate_escape_time((K,), {})
+    return fractal
+
+
+def test_deepen_uses_arguments_of_generate_escape_time():
+    fractal = generated(40)
+    iteration_counts, z_values = fractal.deepen(100)
+    expected_counts, expected_z_values = generated(100).generate_escape_time((K,), {})
+    np.testing.assert_array_equal(iteration_counts, expected_counts)
+    np.testing.assert_allclose(z_values, expected_z_values)
+    assert fractal.iterations == 100
+
+
+def test_deepen_after_engine_numba():
+    fractal = generated(40, julia_numba, 'numba')
+    iteration_counts, _ = fractal.deepen(100)
+    np.testing.assert_array_equal(iteration_counts, generated(100).iteration_counts)
+
+
+@pytest.mark.parametrize('iterations', [40, 20])
+def test_deepen_to_fewer_iterations_raises(iterations):
+    fractal = generated(40)
+    with pytest.raises(ValueError):
+        fractal.deepen(iterations)
+    assert fractal.iterations == 40
+
+
+def test_save_and_load_continues_deepening(tmp_path):
+    fractal = generated(40)
+    fractal.save(str(tmp_path / 'fractal.npz'))
+    loaded = EscapeTimeFractal.load(str(tmp_path / 'fractal.npz'), julia, (K,))
+    np.testing.assert_array_equal(loaded.deepen(100)[0], fractal.deepen(100)[0])
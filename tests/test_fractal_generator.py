@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from numba import njit
+from fractal_generator import generate_escape_time, generate_escape_time_progressive, generate_smooth_escape_time
+
+
+def mandelbrot(z, c):
+    return z * z + c
+
+
+@pytest.mark.parametrize('count_dtype', [int, None])
+@pytest.mark.parametrize('precision', ['double', 'single'])
+def test_last_progressive_pass_matches_generate_escape_time(count_dtype, precision):
+    args = ((-2., 1.), (-1.5, 1.5), 80, (50, 40), mandelbrot)
+    passes = list(generate_escape_time_progressive(*args, count_dtype=count_dtype, precision=precision))
+    iteration_counts, z_values = generate_escape_time(*args, count_dtype=count_dtype, precision=precision)
+    assert [stride for _, _, stride in passes] == [4, 2, 1]
+    assert passes[-1][0].dtype == iteration_counts.dtype
+    np.testing.assert_array_equal(passes[-1][0], iteration_counts)
+    np.testing.assert_array_equal(passes[-1][1], z_values)
+
+
+def julia(z, c, k):
+    return z * z + k
+
+
+@pytest.mark.parametrize('et_function, kwargs', [(mandelbrot, {}), (julia, {'k': -0.8 + 0.156j})])
+def test_compact_matches_numpy(et_function, kwargs):
+    args = ((-2., 1.), (-1.5, 1.5), 80, (90, 70), et_function)
+    iteration_counts, z_values = generate_escape_time(*args, **kwargs)
+    compact_counts, compact_z_values = generate_escape_time(*args, engine='compact', **kwargs)
+    assert compact_counts.dtype == iteration_counts.dtype
+    np.testing.assert_array_equal(compact_counts, iteration_counts)
+    np.testing.assert_array_equal(compact_z_values, z_values)
+
+
+def test_compact_smooth_values_match_numpy():
+    args = ((-2., 1.), (-1.5, 1.5), 80, (90, 70), mandelbrot)
+    np.testing.assert_array_equal(generate_smooth_escape_time(*args, engine='compact'),
+                                  generate_smooth_escape_time(*args))
+
+
+
+@pytest.mark.parametrize('engine', ['numpy', 'compact', 'numba'])
+def test_single_precision_is_close_to_double(engine):
+    et_function = njit(mandelbrot) if engine == 'numba' else mandelbrot
+    args = ((-2., 1.), (-1.5, 1.5), 100, (120, 90), et_function)
+    iteration_counts, _ = generate_escape_time(*args)
+    single_counts, single_z_values = generate_escape_time(*args, engine=engine, precision='single')
+    assert single_z_values.dtype == np.complex64
+    # Only points close to the edge of the set escape at another iteration
+    assert np.mean(single_counts != iteration_counts) < 0.005
+
+
+def test_single_precision_falls_back_to_double_when_zoomed_in():
+    args = ((-0.7436, -0.7436 + 1e-5), (0.1318, 0.1318 + 1e-5), 100, (50, 50), mandelbrot)
+    with pytest.warns(RuntimeWarning, match='too small for single precision') as record:
+        iteration_counts, z_values = generate_escape_time(*args, precision='single')
+    assert record[0].filename == __file__
+    assert z_values.dtype == np.complex128
+    expected_counts, expected_z_values = generate_escape_time(*args)
+    np.testing.assert_array_equal(iteration_counts, expected_counts)
+    np.testing.assert_array_equal(z_values, expected_z_values)
+
+
+def test_count_dtype():
+    args = ((-2., 1.), (-1.5, 1.5), 200, (30, 20), mandelbrot)
+    iteration_counts, _ = generate_escape_time(*args, count_dtype=None)
+    assert iteration_counts.dtype == np.uint8
+    np.testing.assert_array_equal(iteration_counts, generate_escape_time(*args)[0])
+    with pytest.raises(ValueError):
+        generate_escape_time(*args, count_dtype=np.int8)
+    with pytest.raises(TypeError):
+        generate_escape_time(*args, count_dtype=float)
+    with pytest.raises(ValueError):
+        generate_escape_time(*args, precision='half')
@@ -0,0 +1,45 @@
+import numpy as np
+from fractal_generator import generate_escape_time
+from frame_reuse import generate_reused_escape_time, uniform_cells
+
+
+def mandelbrot(z, c):
+    return z * z + c
+
+
+CENTER = -0.7436438870371587 + 0.1318259042553419j
+
+
+def zoom_limits(frames, zoom_factor=1.25):
+    for frame in range(frames):
+        half_width = 1.5 / zoom_factor ** frame
+        yield ((CENTER.real - half_width, CENTER.real + half_width),
+               (CENTER.imag - 0.75 * half_width, CENTER.imag + 0.75 * half_width))
+
+
+def test_uniform_cells():
+    iteration_counts = np.zeros((6, 6), dtype=int)
+    iteration_counts[0, 0] = 1
+    np.testing.assert_array_equal(uniform_cells(iteration_counts, 0)[0], [False, True, True, True, True])
+    np.testing.assert_array_equal(uniform_cells(iteration_counts, 1)[0], [False, False, True, True, True])
+    assert uniform_cells(iteration_counts, 1)[2:].all()
+
+
+def test_first_frame_is_computed():
+    (re_lim, im_lim), = zoom_limits(1)
+    frame = generate_reused_escape_time(None, re_lim, im_lim, 100, (80, 60), mandelbrot)
+    iteration_counts, z_values = generate_escape_time(re_lim, im_lim, 100, (80, 60), mandelbrot)
+    assert frame.reused == 0
+    np.testing.assert_array_equal(frame.iteration_counts, iteration_counts)
+    np.testing.assert_array_equal(frame.z_values, z_values)
+
+
+def test_reused_zoom_matches_full_render():
+    frame = None
+    reused = []
+    for re_lim, im_lim in zoom_limits(8):
+        frame = generate_reused_escape_time(frame, re_lim, im_lim, 200, (200, 150), mandelbrot)
+        iteration_counts, _ = generate_escape_time(re_lim, im_lim, 200, (200, 150), mandelbrot)
+        reused.append(frame.reused)
+        assert np.mean(frame.iteration_counts != iteration_counts) <= 1e-4
+    assert min(reused[1:]) > 0.4
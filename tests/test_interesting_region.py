@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from fractal_generator import generate_escape_time
+from interesting_region import (find_interesting_region, find_interesting_region_brute_force, max_var_segment,
+                                max_var_segment_brute_force)
+
+
+def mandelbrot(z, c):
+    return z * z + c
+
+
+def planes():
+    iteration_counts, _ = generate_escape_time((-2., 1.), (-1.5, 1.5), 60, (50, 40), mandelbrot)
+    random = np.random.default_rng(0).integers(0, 20, (37, 45))
+    flat = np.full((40, 50), 7)
+    one_pixel = flat.copy()
+    one_pixel[31, 4] = 8
+    bounded = np.full((40, 50), 60)
+    bounded[:3, -2:] = 59
+    return {'mandelbrot': iteration_counts, 'random': random, 'flat': flat, 'one_pixel': one_pixel,
+            'bounded': bounded}
+
+
+@pytest.mark.parametrize('name', list(planes()))
+@pytest.mark.parametrize('zoom_factor', [1.5, 3.])
+def test_find_interesting_region_matches_brute_force(name, zoom_factor):
+    plane = planes()[name]
+    np.testing.assert_array_equal(find_interesting_region(plane, zoom_factor, 60),
+                                  find_interesting_region_brute_force(plane, zoom_factor, 60))
+
+
+@pytest.mark.parametrize('name', list(planes()))
+@pytest.mark.parametrize('zoom_factor', [1.5, 3.])
+def test_max_var_segment_matches_brute_force(name, zoom_factor):
+    plane = planes()[name]
+    np.testing.assert_array_equal(max_var_segment(plane, zoom_factor), max_var_segment_brute_force(plane, zoom_factor))
+
+
+def test_flat_plane_has_no_interesting_region():
+    plane = np.full((300, 300), 100)
+    np.testing.assert_array_equal(find_interesting_region(plane, 1.5, 100), -np.ones((2, 2)))
+    np.testing.assert_array_equal(max_var_segment(plane, 1.5), -np.ones((2, 2)))
+
+
+@pytest.mark.parametrize('stride', [2, 5])
+def test_stride_finds_window_of_the_right_shape(stride):
+    plane = planes()['mandelbrot']
+    for x_range, y_range in (find_interesting_region(plane, 1.5, 60, stride), max_var_segment(plane, 1.5, stride)):
+        assert x_range[1] - x_range[0] == 27 and y_range[1] - y_range[0] == 33
+        assert 0 <= x_range[0] and x_range[1] < 40 and 0 <= y_range[0] and y_range[1] < 50
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from lyapunov import generate_lyapunov
+
+
+def lyapunov_exponent(a, b, sequence, iterations, warmup=200, x0=0.5):
+    # Straightforward version of the exponent, with a logarithm in every iteration
+    rs = [b if character == 'B' else a for character in sequence]
+    x = x0
+    for i in range(warmup):
+        x = rs[i % len(rs)] * x * (1 - x)
+    total = 0.
+    for i in range(warmup, warmup + iterations):
+        r = rs[i % len(rs)]
+        total += np.log(abs(r * (1 - 2 * x)))
+        x = r * x * (1 - x)
+    return total / iterations
+
+
+def exponent(r, **kwargs):
+    # With a = b = r the sequence does not matter and the map is the logistic map with parameter r
+    return generate_lyapunov((r, r), (r, r), 2000, 1, **kwargs)[0, 0]
+
+
+def test_stable_fixed_point():
+    # The fixed point 1 - 1 / r attracts for 1 < r < 3, with exponent log|2 - r|
+    assert exponent(2.5) == pytest.approx(np.log(0.5), abs=1e-6)
+    assert exponent(2.8) == pytest.approx(np.log(0.8), abs=1e-3)
+
+
+@pytest.mark.parametrize('r', [3.2, 3.5, 3.83])
+def test_stable_cycles(r):
+    # Period 2, period 4 and the period 3 window
+    assert exponent(r) < 0
+
+
+@pytest.mark.parametrize('r', [3.7, 3.9, 3.99])
+def test_chaotic(r):
+    assert exponent(r) > 0
+
+
+def test_matches_straightforward_calculation():
+    a_axis, b_axis = np.linspace(2.5, 4., 7), np.linspace(2.5, 4., 5)
+    exponents = generate_lyapunov((2.5, 4.), (2.5, 4.), 500, (7, 5), sequence='AABAB')
+    expected = [[lyapunov_exponent(a, b, 'AABAB', 500) for a in a_axis] for b in b_axis]
+    np.testing.assert_allclose(exponents, expected, rtol=1e-9, atol=1e-12)
+
+
+def test_tolerance_keeps_the_sign():
+    exponents = generate_lyapunov((2.5, 4.), (2.5, 4.), 20000, (20, 15), tolerance=1e-4)
+    full = generate_lyapunov((2.5, 4.), (2.5, 4.), 20000, (20, 15))
+    np.testing.assert_array_equal(np.sign(exponents), np.sign(full))
+    assert np.abs(exponents - full).max() < 0.1
+
+
+def test_invalid_sequence():
+    with pytest.raises(ValueError):
+        generate_lyapunov((2., 4.), (2., 4.), 100, 10, sequence='ABC')
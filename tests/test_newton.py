@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from newton import generate_newton, newton_escape_time
+
+ARGS = ((-2., 2.), (-1.5, 1.5), 60, (120, 90))
+
+
+@pytest.mark.parametrize('kwargs', [dict(coefficients=[1, 0, 0, -1]),
+                                    dict(coefficients=[1, 0, 0, -1], relaxation=1.5),
+                                    dict(coefficients=[1, 0, -2, 2]),
+                                    dict(coefficients=[1, 0, 0, -1], nova=True),
+                                    dict(coefficients=[1, 0, 0, -1], relaxation=0.8 + 0.2j, nova=True)])
+def test_numba_matches_numpy(kwargs):
+    iteration_counts, root_index = generate_newton(*ARGS, **kwargs)
+    numba_counts, numba_root_index = generate_newton(*ARGS, engine='numba', **kwargs)
+    np.testing.assert_array_equal(numba_counts, iteration_counts)
+    np.testing.assert_array_equal(numba_root_index, root_index)
+    assert root_index.dtype == np.int16 and iteration_counts.shape == (90, 120)
+
+
+@pytest.mark.parametrize('engine', ['numpy', 'numba'])
+def test_newton_converges_to_nearest_root(engine):
+    coefficients = [1, 0, 0, -1]
+    roots = np.roots(coefficients)
+    # Points close to a root converge to it in a few iterations, and 0 (where p' is 0) never converges
+    points = np.concatenate([roots * 1.1, [0j]])
+    iteration_counts, root_index = newton_escape_time(points, 50, coefficients, engine=engine)
+    np.testing.assert_array_equal(root_index, [0, 1, 2, -1])
+    assert iteration_counts[:3].max() < 10 and iteration_counts[3] == 50
+
+
+@pytest.mark.parametrize('engine', ['numpy', 'numba'])
+def test_nova_has_no_root_index(engine):
+    iteration_counts, root_index = generate_newton(*ARGS, [1, 0, 0, -1], nova=True, engine=engine)
+    assert np.all(root_index == -1)
+    assert 0 < iteration_counts.min() and np.any(iteration_counts < 60)
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        newton_escape_time(np.zeros(3), 10, [0, 0, 1])
+    with pytest.raises(ValueError, match='engine'):
+        newton_escape_time(np.zeros(3), 10, [1, 0, -1], engine='compact')
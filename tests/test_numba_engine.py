@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from numba import njit
+from fractal_generator import (complex_axes, escape_time, escape_time_batch, generate_escape_time,
+                               generate_smooth_escape_time)
+from numba_engine import numba_escape_time
+
+
+def mandelbrot(z, c):
+    return z * z + c
+
+
+def julia(z, c, k):
+    return z * z + k
+
+
+mandelbrot_numba = njit(mandelbrot)
+julia_numba = njit(julia)
+ARGS = ((-2., 1.), (-1.5, 1.5), 100, (90, 70))
+
+
+def test_numba_matches_numpy():
+    iteration_counts, z_values = generate_escape_time(*ARGS, mandelbrot)
+    numba_counts, numba_z_values = generate_escape_time(*ARGS, mandelbrot_numba, engine='numba')
+    np.testing.assert_array_equal(numba_counts, iteration_counts)
+    np.testing.assert_allclose(numba_z_values, z_values, rtol=1e-6)
+
+
+def test_numba_keyword_arguments():
+    k = -0.8 + 0.156j
+    iteration_counts, _ = generate_escape_time(*ARGS, julia, k=k)
+    numba_counts, _ = generate_escape_time(*ARGS, julia_numba, engine='numba', k=k)
+    np.testing.assert_array_equal(numba_counts, iteration_counts)
+
+
+@pytest.mark.parametrize('layout', ['transposed', 'fortran', 'strided'])
+def test_numba_with_non_contiguous_plane(layout):
+    re_axis, im_axis = complex_axes((-2., 1.), (-1.5, 1.5), (90, 70))
+    plane = re_axis + 1j * im_axis[:, np.newaxis]
+    if layout == 'transposed':
+        real, imag = np.meshgrid(re_axis, im_axis, indexing='ij')
+        plane = (real + 1j * imag).T
+    elif layout == 'fortran':
+        plane = np.asfortranarray(plane)
+    else:
+        plane = np.repeat(plane, 2, axis=1)[:, ::2]
+    assert not plane.flags.c_contiguous
+    expected_counts, expected_z_values = escape_time(np.ascontiguousarray(plane), 100, mandelbrot)
+    for iteration_counts, z_values in (numba_escape_time(plane, 100, mandelbrot_numba),
+                                       escape_time(plane, 100, mandelbrot_numba, engine='numba')):
+        np.testing.assert_array_equal(iteration_counts, expected_counts)
+        np.testing.assert_allclose(z_values, expected_z_values, rtol=1e-6)
+
+
+def test_numba_batch_matches_single_frames():
+    re_axis, im_axis = complex_axes((-1.6, 1.6), (-1., 1.), (64, 40))
+    plane = re_axis + 1j * im_axis[:, np.newaxis]
+    constants = [(-0.8 + 0.156j,), (0.285 + 0.01j,), (-0.4 + 0.6j,)]
+    iteration_counts, z_values = escape_time_batch(plane, 80, julia_numba, constants, [{}] * 3, engine='numba')
+    for frame, k in enumerate(constants):
+        expected_counts, expected_z_values = escape_time(plane, 80, julia, *k)
+        np.testing.assert_array_equal(iteration_counts[frame], expected_counts)
+        np.testing.assert_allclose(z_values[frame], expected_z_values, rtol=1e-6)
+
+
+def test_numba_smooth_values_match_numpy():
+    smooth_values = generate_smooth_escape_time(*ARGS, mandelbrot)
+    numba_smooth_values = generate_smooth_escape_time(*ARGS, mandelbrot_numba, engine='numba')
+    assert numba_smooth_values.dtype == np.float32
+    np.testing.assert_allclose(numba_smooth_values, smooth_values, atol=1e-5)
+    assert 0 <= smooth_values.min() and smooth_values.max() == 1
+
+
+def test_numba_requires_njit_function():
+    with pytest.raises(TypeError):
+        generate_escape_time(*ARGS, mandelbrot, engine='numba')
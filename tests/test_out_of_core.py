@@ -0,0 +1,52 @@
+import json
+import os
+import numpy as np
+import pytest
+import tiled
+from fractal_generator import generate_escape_time, smooth_escape_values
+from out_of_core import METADATA_FILE, PROGRESS_FILE, open_render, render_to_disk
+
+
+def mandelbrot(z, c):
+    return z * z + c
+
+
+ARGS = ((-2., 1.), (-1.5, 1.5), 60, (70, 50), mandelbrot)
+
+
+def test_render_to_disk_matches_generate_escape_time(tmp_path):
+    arrays = render_to_disk(str(tmp_path), *ARGS, channel='smooth', tile_size=16, processes=1)
+    iteration_counts, z_values = generate_escape_time(*ARGS)
+    np.testing.assert_array_equal(arrays['iteration_counts'], iteration_counts)
+    np.testing.assert_array_equal(arrays['smooth'], smooth_escape_values(iteration_counts, z_values, 60))
+    assert sorted(os.listdir(tmp_path)) == ['iteration_counts.npy', METADATA_FILE, 'smooth.npy']
+
+
+def test_interrupted_render_to_disk_resumes(tmp_path, monkeypatch):
+    render_tile = tiled._render_tile
+    rendered = []
+
+    def interrupted_render_tile(*args):
+        if len(rendered) == 7:
+            raise KeyboardInterrupt
+        rendered.append(args)
+        return render_tile(*args)
+
+    monkeypatch.setattr(tiled, '_render_tile', interrupted_render_tile)
+    with pytest.raises(KeyboardInterrupt):
+        render_to_disk(str(tmp_path), *ARGS, channel='abs', tile_size=16, processes=1, checkpoint_interval=0)
+    assert not os.path.exists(tmp_path / METADATA_FILE)
+    with open(tmp_path / PROGRESS_FILE) as progress_file:
+        assert len(json.load(progress_file)['done']) == 7
+
+    rendered.clear()
+    monkeypatch.setattr(tiled, '_render_tile', lambda *args: rendered.append(args) or render_tile(*args))
+    render_to_disk(str(tmp_path), *ARGS, channel='abs', tile_size=16, processes=1)
+    # 5 x 4 tiles, of which 7 were done before the interruption
+    assert len(rendered) == 13
+    assert not os.path.exists(tmp_path / PROGRESS_FILE)
+
+    arrays = open_render(str(tmp_path))
+    iteration_counts, z_values = generate_escape_time(*ARGS)
+    np.testing.assert_array_equal(arrays['iteration_counts'], iteration_counts)
+    np.testing.assert_array_equal(arrays['abs'], np.abs(z_values).astype(np.float32))
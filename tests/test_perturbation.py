@@ -0,0 +1,54 @@
+from decimal import Decimal
+import numpy as np
+import pytest
+import perturbation
+from fractal_generator import generate_escape_time, generate_smooth_escape_time, smooth_escape_values
+
+
+def mandelbrot(z, c):
+    return z * z + c
+
+
+def julia(z, c, k):
+    return z * z + k
+
+
+@pytest.mark.parametrize('re_lim, im_lim', [((-2., 1.), (-1.5, 1.5)), ((-0.75, -0.73), (0.1, 0.12))])
+def test_perturbation_matches_numpy_mandelbrot(re_lim, im_lim):
+    iteration_counts, z_values = generate_escape_time(re_lim, im_lim, 200, (120, 90), mandelbrot)
+    perturbation_counts, perturbation_z_values = generate_escape_time(re_lim, im_lim, 200, (120, 90),
+                                                                      perturbation.mandelbrot, engine='perturbation')
+    np.testing.assert_array_equal(perturbation_counts, iteration_counts)
+    escaped = iteration_counts < 200
+    np.testing.assert_allclose(perturbation_z_values[escaped], z_values[escaped], rtol=1e-3)
+
+
+def test_perturbation_matches_numpy_julia():
+    args = ((-1.6, 1.6), (-1., 1.), 200, (120, 90))
+    iteration_counts, z_values = generate_escape_time(*args, julia, k=-0.8 + 0.156j)
+    perturbation_counts, perturbation_z_values = generate_escape_time(*args, perturbation.julia, -0.8 + 0.156j,
+                                                                      engine='perturbation')
+    np.testing.assert_array_equal(perturbation_counts, iteration_counts)
+    escaped = iteration_counts < 200
+    np.testing.assert_allclose(perturbation_z_values[escaped], z_values[escaped], rtol=1e-3)
+
+
+def test_perturbation_smooth_values_match_numpy():
+    # The perturbation engine uses bailout radius 2, so its smooth values are those of smooth_escape_values
+    args = ((-2., 1.), (-1.5, 1.5), 100, (60, 60))
+    iteration_counts, z_values = generate_escape_time(*args, mandelbrot)
+    np.testing.assert_allclose(generate_smooth_escape_time(*args, perturbation.mandelbrot, engine='perturbation'),
+                               smooth_escape_values(iteration_counts, z_values, 100), atol=1e-5)
+
+
+def test_perturbation_accepts_decimal_limits():
+    args = (200, (40, 30), perturbation.mandelbrot)
+    float_counts, _ = generate_escape_time((-0.75, -0.73), (0.1, 0.12), *args, engine='perturbation')
+    decimal_counts, _ = generate_escape_time((Decimal(-0.75), Decimal(-0.73)), ('0.1', '0.12'), *args,
+                                             engine='perturbation')
+    np.testing.assert_array_equal(decimal_counts, float_counts)
+
+
+def test_perturbation_rejects_other_functions():
+    with pytest.raises(ValueError):
+        generate_escape_time((-2., 1.), (-1.5, 1.5), 50, 20, mandelbrot, engine='perturbation')
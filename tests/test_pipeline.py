@@ -0,0 +1,59 @@
+import numba
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pipeline import ordered_map, pool_executor, process_pool
+
+
+# A pool that forks after a parallel numba kernel has run used to hang when the script exits
+NUMBA_THEN_ANIMATE = '''
+import os
+import numpy as np
+from numba import njit
+import fractal_generator
+import render
+
+
+@njit
+def julia(z, c, k):
+    return z * z + k
+
+
+if __name__ == '__main__':
+    fractal_generator.generate_escape_time((-2., 1.), (-1.5, 1.5), 50, 64, julia, 0.3j, engine='numba')
+    anim_kwargs = {'fps': 24, 'ffmpeg_path': os.path.abspath('ffmpeg')}
+    const_args = dict(re_lim=(-1.6, 1.6), im_lim=(-1., 1.), iterations=50, resolution=48, et_function=julia,
+                      engine='numba')
+    iter_args = {'k': np.linspace(-0.8, -0.7, 5) + 0.156j}
+    for workers in (1, 2):
+        render.animate(f'{workers}.bin', 5, 'magma', iter_args, const_args, writer='raw', anim_kwargs=anim_kwargs,
+                       workers=workers, batch_size=1)
+    with open('1.bin', 'rb') as serial, open('2.bin', 'rb') as parallel:
+        print(serial.read() == parallel.read())
+'''
+
+
+def square(value: int) -> int:
+    return value * value
+
+
+def test_ordered_map_keeps_order():
+    with process_pool(2) as executor:
+        assert list(ordered_map(square, range(10), executor, 3)) == [value * value for value in range(10)]
+
+
+def test_process_pool_workers_use_one_numba_thread():
+    with process_pool(2) as executor:
+        assert executor.submit(numba.get_num_threads).result() == 1
+
+
+def test_pool_executor_falls_back_to_threads():
+    with pool_executor(square, 2) as executor:
+        assert isinstance(executor, ProcessPoolExecutor)
+    with pool_executor(lambda value: value, 2) as executor:
+        assert isinstance(executor, ThreadPoolExecutor)
+
+
+def test_animate_with_workers_after_numba_exits(run_script, fake_ffmpeg):
+    # The script runs in the directory of fake_ffmpeg
+    result = run_script(NUMBA_THEN_ANIMATE)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-1] == 'True'
@@ -0,0 +1,66 @@
+import io
+import json
+import numpy as np
+import pytest
+import render
+from fractal_generator import generate_escape_time
+from progress import Instrumentation, Timer, json_log_hook, set_instrumentation
+
+
+def mandelbrot(z, c):
+    return z * z + c
+
+
+@pytest.fixture
+def instrumentation():
+    log = io.StringIO()
+    instrumentation = Instrumentation(hooks=[json_log_hook(log)])
+    instrumentation.log = log
+    set_instrumentation(instrumentation)
+    yield instrumentation
+    set_instrumentation(None)
+
+
+@pytest.mark.parametrize('engine', ['numpy', 'compact'])
+def test_escape_time_totals(instrumentation, engine):
+    iteration_counts, _ = generate_escape_time((-2., 1.), (-1.5, 1.5), 50, (60, 40), mandelbrot, engine=engine)
+    report = instrumentation.report()
+    assert report['escape_time']['calls'] == 1
+    # Every point is iterated as many times as its iteration count
+    assert report['escape_time']['pixel_iterations'] == iteration_counts.sum()
+    live_pixels = report['escape_times'][0]['live_pixels']
+    assert len(live_pixels) == 50 and live_pixels[0] == np.sum(iteration_counts > 0)
+    assert live_pixels[-1] == np.sum(iteration_counts == 50)
+    assert np.all(np.diff(live_pixels) <= 0)
+
+
+def test_stage_totals(instrumentation):
+    for _ in range(3):
+        with instrumentation.stage('compute'):
+            pass
+    instrumentation.record_stage('encode', 0.25)
+    instrumentation.record_stage('encode', 0.5)
+    stages = instrumentation.report()['stages']
+    assert stages['compute']['calls'] == 3 and stages['compute']['seconds'] >= 0
+    assert stages['encode'] == dict(seconds=0.75, calls=2)
+    events = [json.loads(line) for line in instrumentation.log.getvalue().splitlines()]
+    assert [event['name'] for event in events] == ['compute'] * 3 + ['encode'] * 2
+
+
+def test_auto_zoom_totals(instrumentation, tmp_path, fake_ffmpeg):
+    render.auto_zoom((-2., 1.), (-1.5, 1.5), 60, 40, mandelbrot, str(tmp_path / 'zoom.bin'), 5, 1.5, 'magma',
+                     writer='raw', anim_kwargs={'fps': 24, 'ffmpeg_path': fake_ffmpeg})
+    report = instrumentation.report()
+    assert [frame['frame'] for frame in report['frames']] == [1, 2, 3, 4, 5]
+    assert report['escape_time']['calls'] == 5
+    for name in ('compute', 'region search', 'colorize', 'encode'):
+        assert report['stages'][name]['calls'] == 5
+    assert sum(frame['seconds'] for frame in report['frames']) >= report['stages']['compute']['seconds']
+
+
+def test_timer_eta():
+    timer = Timer(10, window=3)
+    assert np.isnan(timer.eta)
+    for _ in range(4):
+        timer.tick()
+    assert timer.done == 4 and timer.eta >= 0 and timer.last >= 0
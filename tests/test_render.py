@@ -0,0 +1,150 @@
+import numpy as np
+import pytest
+import render
+from numba import njit
+
+
+def mandelbrot(z, c):
+    return z * z + c
+
+
+def test_auto_zoom_rejects_reuse_with_smooth_values(tmp_path):
+    with pytest.raises(ValueError, match="graph_type 's'"):
+        render.auto_zoom((-2., 1.), (-1.5, 1.5), 50, 32, mandelbrot, str(tmp_path / 'zoom.mp4'), 3, 0.5, 'magma',
+                         graph_type='s', reuse=True, writer='raw')
+    assert not list(tmp_path.iterdir())
+
+
+def zoom(filename: str, ffmpeg: str, **kwargs):
+    render.auto_zoom((-2., 1.), (-1.5, 1.5), 80, 48, mandelbrot, filename, 9, 1.5, 'magma', writer='raw',
+                     anim_kwargs={'fps': 24, 'ffmpeg_path': ffmpeg}, **kwargs)
+    with open(filename, 'rb') as video:
+        return video.read()
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'reuse': True}, {'graph_type': 's', 'pipeline': True}])
+def test_interrupted_auto_zoom_resumes(tmp_path, fake_ffmpeg, monkeypatch, kwargs):
+    checkpoint = tmp_path / 'checkpoint'
+    uninterrupted = zoom(str(tmp_path / 'uninterrupted.bin'), fake_ffmpeg, checkpoint=str(checkpoint),
+                         checkpoint_frames=4, **kwargs)
+    assert not checkpoint.exists()
+
+    name = ('generate_reused_escape_time' if kwargs.get('reuse') else
+            'generate_smooth_escape_time' if kwargs.get('graph_type') == 's' else 'generate_escape_time')
+    generate = getattr(render, name)
+    computed = []
+
+    def interrupted_generate(*args, **generate_kwargs):
+        # Interrupted in the third segment, after frames 0 to 5
+        if len(computed) == 6:
+            raise KeyboardInterrupt
+        computed.append(args)
+        return generate(*args, **generate_kwargs)
+
+    monkeypatch.setattr(render, name, interrupted_generate)
+    with pytest.raises(KeyboardInterrupt):
+        zoom(str(tmp_path / 'resumed.bin'), fake_ffmpeg, checkpoint=str(checkpoint), checkpoint_frames=4, **kwargs)
+    assert (checkpoint / render.ZOOM_STATE_FILE).exists()
+
+    computed.clear()
+    monkeypatch.setattr(render, name, lambda *args, **generate_kwargs: computed.append(args) or
+                        generate(*args, **generate_kwargs))
+    resumed = zoom(str(tmp_path / 'resumed.bin'), fake_ffmpeg, checkpoint=str(checkpoint), checkpoint_frames=4,
+                   **kwargs)
+    # Continued at frame 4, after the first segment
+    assert len(computed) == 5
+    assert resumed == uninterrupted
+    assert not checkpoint.exists()
+    # The fake ffmpeg does not encode, so the frames are the same as those of a video without segments
+    monkeypatch.setattr(render, name, generate)
+    assert zoom(str(tmp_path / 'plain.bin'), fake_ffmpeg, **kwargs) == uninterrupted
+
+
+def test_checkpoint_with_other_parameters_is_rejected(tmp_path, fake_ffmpeg, monkeypatch):
+    checkpoint = tmp_path / 'checkpoint'
+    generate = render.generate_escape_time
+
+    def interrupted_generate(*args, **kwargs):
+        if args[0] != (-2., 1.):
+            raise KeyboardInterrupt
+        return generate(*args, **kwargs)
+
+    monkeypatch.setattr(render, 'generate_escape_time', interrupted_generate)
+    with pytest.raises(KeyboardInterrupt):
+        zoom(str(tmp_path / 'zoom.bin'), fake_ffmpeg, checkpoint=str(checkpoint), checkpoint_frames=1)
+    with pytest.raises(ValueError, match='other parameters'):
+        zoom(str(tmp_path / 'zoom.bin'), fake_ffmpeg, checkpoint=str(checkpoint), checkpoint_frames=2)
+
+
+class Unidentifiable:
+    pass
+
+
+UNIDENTIFIABLE = Unidentifiable()
+
+
+def unidentifiable_mandelbrot(z, c):
+    # The instance in its globals cannot be identified across processes, so cache_key gives None
+    return z * z + c if UNIDENTIFIABLE else c
+
+
+def test_checkpoint_of_unidentifiable_function_is_not_resumed(tmp_path, fake_ffmpeg, monkeypatch):
+    checkpoint = tmp_path / 'checkpoint'
+    generate = render.generate_escape_time
+    computed = []
+
+    def interrupted_generate(*args, **kwargs):
+        # Interrupted in the third segment, after frames 0 to 5
+        if len(computed) == 6:
+            raise KeyboardInterrupt
+        computed.append(args)
+        return generate(*args, **kwargs)
+
+    def unidentifiable_zoom(filename):
+        with pytest.warns(RuntimeWarning, match='cannot be continued'):
+            render.auto_zoom((-2., 1.), (-1.5, 1.5), 80, 48, unidentifiable_mandelbrot, filename, 9, 1.5, 'magma',
+                             writer='raw', anim_kwargs={'fps': 24, 'ffmpeg_path': fake_ffmpeg},
+                             checkpoint=str(checkpoint), checkpoint_frames=4)
+
+    monkeypatch.setattr(render, 'generate_escape_time', interrupted_generate)
+    with pytest.raises(KeyboardInterrupt):
+        unidentifiable_zoom(str(tmp_path / 'zoom.bin'))
+    assert not (checkpoint / render.ZOOM_STATE_FILE).exists()
+
+    computed.clear()
+    monkeypatch.setattr(render, 'generate_escape_time', lambda *args, **kwargs: computed.append(args) or
+                        generate(*args, **kwargs))
+    unidentifiable_zoom(str(tmp_path / 'zoom.bin'))
+    # Started again from the first frame
+    assert len(computed) == 9
+    assert not checkpoint.exists()
+    monkeypatch.setattr(render, 'generate_escape_time', generate)
+    assert (tmp_path / 'zoom.bin').read_bytes() == zoom(str(tmp_path / 'plain.bin'), fake_ffmpeg)
+
+def julia(z, c, k):
+    return z * z + k
+
+
+@pytest.mark.parametrize('engine, graph_type', [('numpy', 'i'), ('compact', 'z'), ('numba', 'i'), ('numba', 'z')])
+def test_batched_animate_matches_unbatched(tmp_path, fake_ffmpeg, engine, graph_type):
+    const_args = dict(re_lim=(-1.6, 1.6), im_lim=(-1., 1.), iterations=60, resolution=(48, 30),
+                      et_function=njit(julia) if engine == 'numba' else julia, engine=engine)
+    iter_args = {'k': np.linspace(-0.8, -0.7, 7) + 0.156j}
+    videos = []
+    for batch_size in (1, 3):
+        filename = str(tmp_path / f'{batch_size}.bin')
+        render.animate(filename, 7, 'magma', iter_args, const_args, graph_type=graph_type, writer='raw',
+                       anim_kwargs={'fps': 24, 'ffmpeg_path': fake_ffmpeg}, batch_size=batch_size)
+        with open(filename, 'rb') as video:
+            videos.append(video.read())
+    assert len(videos[0]) == 7 * 48 * 30 * 3
+    assert videos[0] == videos[1]
+
+
+def test_animate_does_not_batch_by_default(tmp_path, fake_ffmpeg, monkeypatch):
+    def no_batches(*args, **kwargs):
+        raise AssertionError('frames were batched')
+    monkeypatch.setattr(render, 'generate_escape_time_batch', no_batches)
+    render.animate(str(tmp_path / 'video.bin'), 3, 'magma', {'k': [-0.8 + 0.156j, -0.7 + 0.156j, -0.6 + 0.156j]},
+                   dict(re_lim=(-1.6, 1.6), im_lim=(-1., 1.), iterations=30, resolution=16, et_function=julia),
+                   writer='raw', anim_kwargs={'ffmpeg_path': fake_ffmpeg})
@@ -0,0 +1,40 @@
+import numpy as np
+from fractal_generator import generate_escape_time
+from tiled import render_tiled
+
+# A pool that forks after a parallel numba kernel has run used to hang when the script exits
+NUMBA_THEN_POOL = '''
+from numba import njit
+import fractal_generator
+import tiled
+
+
+@njit
+def mandelbrot(z, c):
+    return z * z + c
+
+
+if __name__ == '__main__':
+    fractal_generator.generate_escape_time((-2., 1.), (-1.5, 1.5), 50, 64, mandelbrot, engine='numba')
+    tiles = list(tiled.iter_tiles((-2., 1.), (-1.5, 1.5), 50, 64, mandelbrot, tile_size=32, processes=2,
+                                  engine='numba'))
+    print(len(tiles))
+'''
+
+
+def mandelbrot(z, c):
+    return z * z + c
+
+
+def test_render_tiled_matches_generate_escape_time():
+    iteration_counts, z_values = generate_escape_time((-2., 1.), (-1.5, 1.5), 50, (70, 50), mandelbrot)
+    tiled_counts, tiled_z_values = render_tiled((-2., 1.), (-1.5, 1.5), 50, (70, 50), mandelbrot, tile_size=16,
+                                                processes=2)
+    np.testing.assert_array_equal(tiled_counts, iteration_counts)
+    np.testing.assert_array_equal(tiled_z_values, z_values)
+
+
+def test_process_pool_after_numba_exits(run_script):
+    result = run_script(NUMBA_THEN_POOL)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ['4']
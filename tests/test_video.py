@@ -0,0 +1,55 @@
+import sys
+import numpy as np
+import pytest
+from matplotlib import colormaps
+from matplotlib.colors import Normalize
+from video import RawVideoWriter
+
+
+def expected_pixels(values, colormap, vmin=None, vmax=None):
+    # The colors imshow(values, origin='lower') gives, from the top row of the image down
+    norm = Normalize(values.min() if vmin is None else vmin, values.max() if vmax is None else vmax)
+    return colormaps[colormap](norm(values[::-1]), bytes=True)[..., :3]
+
+
+def test_raw_video_writer_streams_frames(fake_ffmpeg, tmp_path):
+    frames = [np.arange(20).reshape(4, 5) * (frame + 1) for frame in range(3)]
+    filename = str(tmp_path / 'video.mp4')
+    with RawVideoWriter(filename, 'magma', ffmpeg_path=fake_ffmpeg) as writer:
+        for values in frames[:2]:
+            writer.write(values)
+        writer.write(frames[2], vmin=0, vmax=20)
+    data = np.fromfile(filename, dtype=np.uint8).reshape(3, 4, 5, 3)
+    np.testing.assert_array_equal(data[0], expected_pixels(frames[0], 'magma'))
+    np.testing.assert_array_equal(data[1], expected_pixels(frames[1], 'magma'))
+    np.testing.assert_array_equal(data[2], expected_pixels(frames[2], 'magma', 0, 20))
+
+
+def test_raw_video_writer_command():
+    writer = RawVideoWriter('video.mp4', 'viridis', fps=30, bitrate=800, metadata={'title': 'zoom'})
+    command = writer._command(5, 4)
+    assert command[command.index('-s') + 1] == '5x4'
+    assert command[command.index('-r') + 1] == '30'
+    assert command[command.index('-b:v') + 1] == '800k'
+    assert 'title=zoom' in command and command[-1] == 'video.mp4'
+    # yuv420p needs an even width and height
+    assert 'pad=ceil(iw/2)*2:ceil(ih/2)*2' in command
+    assert 'pad=ceil(iw/2)*2:ceil(ih/2)*2' not in writer._command(6, 4)
+
+
+def test_raw_video_writer_rejects_other_shapes(fake_ffmpeg, tmp_path):
+    with pytest.raises(ValueError):
+        with RawVideoWriter(str(tmp_path / 'video.mp4'), 'magma', ffmpeg_path=fake_ffmpeg) as writer:
+            writer.write(np.zeros((4, 5)))
+            writer.write(np.zeros((5, 4)))
+
+
+def test_raw_video_writer_reports_ffmpeg_errors(tmp_path):
+    ffmpeg = tmp_path / 'ffmpeg'
+    ffmpeg.write_text(f'#!{sys.executable}\nimport sys\nsys.stderr.write("no encoder")\nsys.exit(1)\n')
+    ffmpeg.chmod(0o755)
+    with pytest.raises(RuntimeError, match='ffmpeg exited'):
+        with RawVideoWriter(str(tmp_path / 'video.mp4'), 'magma', ffmpeg_path=str(ffmpeg)) as writer:
+            for _ in range(100):
+                writer.write(np.zeros((200, 200)))
+
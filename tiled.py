@@ -0,0 +1,126 @@
+import os
+import numpy as np
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Callable, Container, Iterator, Tuple, Union
+from fractal_generator import complex_axes, escape_time
+from pipeline import process_pool
+
+
+def tile_slices(shape: Tuple[int, int], tile_size: int) -> Iterator[Tuple[slice, slice]]:
+    """Splits an array shape into tiles.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        (height, width) of the whole image.
+    tile_size : int
+        Maximum number of rows and columns of each tile.
+
+    Returns
+    ----------
+    tiles : iterator of tuple of slice
+        The (row, column) slices of each tile, row by row.
+    """
+    height, width = shape
+    for row in range(0, height, tile_size):
+        for column in range(0, width, tile_size):
+            yield slice(row, min(row + tile_size, height)), slice(column, min(column + tile_size, width))
+
+
+def _render_tile(re_axis: np.ndarray, im_axis: np.ndarray, iterations: int, et_function: Callable, et_f_args: tuple,
+                 engine: str, et_f_kwargs: dict) -> Tuple[np.ndarray, np.ndarray]:
+    complex_plane = re_axis + 1j * im_axis[:, np.newaxis]
+    return escape_time(complex_plane, iterations, et_function, *et_f_args, engine=engine, **et_f_kwargs)
+
+
+def iter_tiles(re_lim: Tuple[float, float], im_lim: Tuple[float, float], iterations: int,
+               resolution: Union[int, Tuple[int, int]], et_function: Callable[[np.ndarray, np.ndarray], np.ndarray],
+               *et_f_args, tile_size: int = 512, processes: int = None, engine: str = 'numpy',
+               skip: Container[Tuple[int, int]] = (),
+               **et_f_kwargs) -> Iterator[Tuple[Tuple[slice, slice], np.ndarray, np.ndarray]]:
+    """Generates an escape time fractal tile by tile in a pool of processes.
+    The tiles are yielded as soon as they are done, so they do not arrive in order.
+
+    Parameters
+    ----------
+    re_lim : tuple of float
+        The lower and upper limit of the real axis.
+    im_lim : tuple of float
+        The lower and upper limit of the imaginary axis.
+    iterations : int
+        Maximum number of iterations.
+    resolution : int or tuple of int
+        Number of points along each axis of the complex plane, or (width, height) for a non-square plane.
+    et_function : function
+        The function used to calculate the z values, see `generate_escape_time`.
+        Must be picklable and importable (e.g. defined at module level of a module or script, not in a notebook) if
+        more than 1 process is used, see `pipeline.process_pool`.
+    *et_f_args : any, optional
+        Other input arguments for et_function.
+    tile_size : int, optional
+        Maximum number of rows and columns of each tile. Bounds the memory used by each process. Default is 512.
+    processes : int, optional
+        Number of worker processes. Default is the number of cores. If 1, the tiles are rendered in this process.
+    engine : str, optional
+        The engine used for the iteration of each tile, see `fractal_generator.escape_time`. Default is 'numpy'.
+    skip : container of tuple of int, optional
+        The (row, column) of the first point of tiles that are not rendered, e.g. the tiles that an interrupted render
+        already finished. Default is none.
+    **et_f_kwargs : any, optional
+        Other input keyword arguments for et_function.
+
+    Returns
+    ----------
+    tiles : iterator
+        Tuples of the (row, column) slices of the tile in the full image, the iteration counts and the z values of the tile.
+    """
+    re_axis, im_axis = complex_axes(re_lim, im_lim, resolution)
+    tiles = [(rows, columns) for rows, columns in tile_slices((im_axis.size, re_axis.size), tile_size)
+             if (rows.start, columns.start) not in skip]
+
+    if processes == 1:
+        for rows, columns in tiles:
+            yield (rows, columns), *_render_tile(re_axis[columns], im_axis[rows], iterations, et_function, et_f_args,
+                                                 engine, et_f_kwargs)
+        return
+
+    processes = processes or os.cpu_count()
+    with process_pool(processes) as executor:
+        # Only keep a few tiles per process in flight so that finished tiles do not pile up in memory
+        max_pending = 2 * processes
+        pending = {}
+        for rows, columns in tiles:
+            future = executor.submit(_render_tile, re_axis[columns], im_axis[rows], iterations, et_function, et_f_args,
+                                     engine, et_f_kwargs)
+            pending[future] = (rows, columns)
+            if len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), *future.result()
+        for future in list(pending):
+            yield pending.pop(future), *future.result()
+
+
+def render_tiled(re_lim: Tuple[float, float], im_lim: Tuple[float, float], iterations: int,
+                 resolution: Union[int, Tuple[int, int]], et_function: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                 *et_f_args, tile_size: int = 512, processes: int = None, engine: str = 'numpy',
+                 **et_f_kwargs) -> Tuple[np.ndarray, np.ndarray]:
+    """Generates an escape time fractal by splitting it into tiles that are rendered in a pool of processes.
+    Gives the same result as `generate_escape_time`, see `iter_tiles` for a description of the parameters.
+
+    Returns
+    ----------
+    iteration_counts : numpy.ndarray
+        Number of iterations before |z| >= 2. Has shape (height, width).
+    z_values : numpy.ndarray
+        The values of the complex numbers right after |z| >= 2. Has shape (height, width).
+    """
+    width, height = (resolution, resolution) if np.isscalar(resolution) else resolution
+    iteration_counts = np.empty((height, width), dtype=int)
+    z_values = np.empty((height, width), dtype=complex)
+    for tile, tile_counts, tile_z_values in iter_tiles(re_lim, im_lim, iterations, resolution, et_function, *et_f_args,
+                                                       tile_size=tile_size, processes=processes, engine=engine,
+                                                       **et_f_kwargs):
+        iteration_counts[tile] = tile_counts
+        z_values[tile] = tile_z_values
+    return iteration_counts, z_values
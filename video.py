@@ -0,0 +1,146 @@
+import os
+import subprocess
+import numpy as np
+from typing import Dict, Sequence
+from coloring import colormap_lut, colorize
+from progress import stage
+
+
+class RawVideoWriter:
+    """Writes a video by coloring each frame with a colormap lookup table and streaming the raw RGB pixels to ffmpeg.
+    No matplotlib figure is involved, so every value becomes exactly one pixel of the video and encoding a frame costs
+    little more than coloring it. Frames are shown the same way as `imshow(values, origin='lower')`, i.e. the first
+    row of values is the bottom row of the video.
+
+    Use as a context manager. ffmpeg is started by the first call to `write`, since the size of the video is the shape
+    of the first frame.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the video file.
+    colormap : str
+        Name of the matplotlib colormap.
+    fps : int, optional
+        Frames per second. Default is 24.
+    codec : str, optional
+        The video codec. Default is 'libx264'.
+    bitrate : int, optional
+        Bitrate of the video in kbps. Default is chosen by ffmpeg.
+    extra_args : sequence of str, optional
+        Extra arguments for ffmpeg, placed before filename.
+    metadata : dict, optional
+        Metadata of the video, e.g. {'title': 'Mandelbrot zoom'}.
+    ffmpeg_path : str, optional
+        The ffmpeg executable. Default is 'ffmpeg'.
+    """
+    def __init__(self, filename: str, colormap: str, fps: int = 24, codec: str = 'libx264', bitrate: int = None,
+                 extra_args: Sequence[str] = None, metadata: Dict[str, str] = None, ffmpeg_path: str = 'ffmpeg'):
+        self.filename = filename
+        self.lut = colormap_lut(colormap)
+        self.fps = fps
+        self.codec = codec
+        self.bitrate = bitrate
+        self.extra_args = list(extra_args or [])
+        self.metadata = metadata or {}
+        self.ffmpeg_path = ffmpeg_path
+        self._process = None
+        self._buffer = None
+
+    def _command(self, width: int, height: int) -> list:
+        command = [self.ffmpeg_path, '-y', '-loglevel', 'error',
+                   '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', str(self.fps), '-i', '-',
+                   '-vcodec', self.codec]
+        if self.codec == 'libx264':
+            command += ['-pix_fmt', 'yuv420p']
+            if width % 2 or height % 2:
+                # yuv420p requires an even width and height
+                command += ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+        if self.bitrate is not None:
+            command += ['-b:v', f'{self.bitrate}k']
+        for key, value in self.metadata.items():
+            command += ['-metadata', f'{key}={value}']
+        return command + self.extra_args + [self.filename]
+
+    def write(self, values: np.ndarray, vmin: float = None, vmax: float = None):
+        """Colors values and adds them to the video as a frame.
+
+        Parameters
+        ----------
+        values : numpy.ndarray
+            The frame, e.g. iteration counts or |z|, with shape (height, width). All frames must have the same shape.
+        vmin : float, optional
+            The value that is mapped to the first color. Default is the minimum of values, like imshow.
+        vmax : float, optional
+            The value that is mapped to the last color. Default is the maximum of values, like imshow.
+        """
+        if values.ndim != 2:
+            raise ValueError(f'frames must have 2 dimensions but got shape {values.shape}')
+        if self._process is None:
+            self._buffer = np.empty(values.shape + (3,), dtype=np.uint8)
+            self._process = subprocess.Popen(self._command(values.shape[1], values.shape[0]), stdin=subprocess.PIPE,
+                                             stderr=subprocess.PIPE)
+        elif values.shape != self._buffer.shape[:2]:
+            raise ValueError(f'all frames must have the same shape; expected {self._buffer.shape[:2]} '
+                             f'but got {values.shape}')
+
+        with stage('colorize'):
+            colorize(values[::-1], self.lut, values.min() if vmin is None else vmin,
+                     values.max() if vmax is None else vmax, out=self._buffer)
+        try:
+            with stage('encode'):
+                self._process.stdin.write(self._buffer.data)
+        except BrokenPipeError:
+            self._finish()
+            raise RuntimeError('ffmpeg exited before all frames were written')
+
+    def _finish(self):
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass
+        error = self._process.stderr.read()
+        if self._process.wait() != 0:
+            raise RuntimeError(f'ffmpeg exited with code {self._process.returncode}: {error.decode(errors="replace")}')
+
+    def close(self):
+        """Finishes the video and waits for ffmpeg to exit."""
+        if self._process is not None and self._process.returncode is None:
+            self._finish()
+
+    def __enter__(self) -> 'RawVideoWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._process is not None:
+            self._process.kill()
+            self._process.wait()
+
+
+def concat_videos(filenames: Sequence[str], filename: str, ffmpeg_path: str = 'ffmpeg'):
+    """Joins videos that were encoded with the same settings into one video, without encoding them again.
+
+    Parameters
+    ----------
+    filenames : sequence of str
+        Names of the videos, in order.
+    filename : str
+        Name of the joined video.
+    ffmpeg_path : str, optional
+        The ffmpeg executable. Default is 'ffmpeg'.
+    """
+    # The list of the concat demuxer, next to the joined video. Quotes in the names are escaped as '\''
+    list_filename = f'{filename}.concat.txt'
+    with open(list_filename, 'w') as list_file:
+        for name in filenames:
+            escaped_name = os.path.abspath(name).replace("'", "'\\''")
+            list_file.write(f"file '{escaped_name}'\n")
+    try:
+        result = subprocess.run([ffmpeg_path, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                                 '-i', list_filename, '-c', 'copy', filename], stderr=subprocess.PIPE)
+    finally:
+        os.remove(list_filename)
+    if result.returncode != 0:
+        raise RuntimeError(f'ffmpeg exited with code {result.returncode}: {result.stderr.decode(errors="replace")}')